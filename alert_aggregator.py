@@ -0,0 +1,303 @@
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+from alert_dispatcher import AlertJob, get_alert_dispatcher
+from config import CFG
+from event_store import get_event_store
+import metrics
+
+
+class _Item:
+    def __init__(self, cam_id, label, conf, snapshot, xyxy, phones, detected_at, track_id, run_id):
+        self.cam_id = cam_id
+        self.label = label
+        self.conf = conf
+        self.snapshot = snapshot
+        self.xyxy = tuple(float(v) for v in xyxy)
+        self.phones = list(phones)
+        self.detected_at = detected_at
+        self.track_id = track_id
+        self.run_id = run_id
+
+
+class _Digest:
+    def __init__(self, deadline):
+        self.alert_id = uuid.uuid4().hex
+        self.deadline = deadline
+        self.items = []
+
+
+# Every camera offers its alerts here instead of to the dispatcher. The
+# cooldown is per camera and class, shared by all threads of the process and
+# saved to ALERT_STATE_PATH, so stopping or reconfiguring a camera does not
+# reset it. An accepted alert opens a digest (or joins the open one); when
+# the digest's window ends, all of its alerts go to the dispatcher as one
+# job: the snapshot itself for a single alert, otherwise a contact sheet,
+# sent to the union of the alerts' phones. Every alert of a digest shares the
+# digest's alert_id, so the event store updates all of them together. Their
+# "queued" events are recorded here, right before the job is handed to the
+# dispatcher, so they are always in the store ahead of the outcome update.
+#
+# Worker processes (CAMERA_MODE=process) keep the cooldowns of their own
+# cameras, merged into the shared state file when saving it, but `forward`
+# the alerts they accept to the GUI process, whose aggregator digests the
+# alerts of every camera together (see camera_process.py).
+class AlertAggregator:
+    def __init__(self, dispatcher=None, events=None, window=CFG.ALERT_DIGEST_WINDOW, cooldown=CFG.ALERT_COOLDOWN,
+                 state_path=CFG.ALERT_STATE_PATH, max_tiles=CFG.ALERT_DIGEST_MAX_TILES,
+                 tile_width=CFG.ALERT_DIGEST_TILE_WIDTH, forward=None):
+        self.dispatcher = dispatcher
+        self.events = events
+        self.forward = forward
+        self.window = window
+        self.cooldown = cooldown
+        self.state_path = state_path
+        self.max_tiles = max(1, int(max_tiles))
+        self.tile_width = tile_width
+        self.offered = 0
+        self.accepted = 0
+        self.digests = 0
+        self.uploads_saved = 0
+        self.messages_saved = 0
+        self._cooldowns = self._read_state()
+        self._digest = None
+        self._dirty = False
+        self._stopping = False
+        self._wake = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="AlertAggregator", daemon=True)
+        self._thread.start()
+
+    # Returns the alert_id the alert will be sent under, or None while the
+    # camera and class are in cooldown. The frame is copied only if accepted.
+    # A forwarding aggregator does not know the alert_id and returns True.
+    def offer(self, cam_id, label, conf, frame, xyxy, phones, detected_at, track_id=None, run_id=None):
+        key = f"{cam_id}|{label}"
+        ts = detected_at.timestamp()
+        with self._wake:
+            self.offered += 1
+            last = self._cooldowns.get(key)
+            if last is not None and ts - last < self.cooldown:
+                return None
+            self._cooldowns[key] = ts
+            self._dirty = True
+        item = _Item(cam_id, label, conf, _snapshot(frame, xyxy, label, conf), xyxy, phones, detected_at,
+                     track_id, run_id)
+        if self.forward is not None:
+            with self._wake:
+                self.accepted += 1
+            self.forward(item)
+            return True
+        return self.add(item)
+
+    # Adds an accepted alert to the open digest (opening one if needed) and
+    # returns the digest's alert_id; also takes alerts forwarded by workers.
+    def add(self, item):
+        with self._wake:
+            self.accepted += 1
+            if self.window <= 0:
+                digest = _Digest(0.0)
+                digest.items.append(item)
+                self._wake.notify()
+            else:
+                digest = self._digest
+                if digest is None:
+                    digest = self._digest = _Digest(time.monotonic() + self.window)
+                    self._wake.notify()
+                digest.items.append(item)
+                return digest.alert_id
+        self._send(digest)
+        return digest.alert_id
+
+    # Sends the open digest now instead of at the end of its window.
+    def flush(self):
+        with self._wake:
+            if self._digest is not None:
+                self._digest.deadline = 0.0
+                self._wake.notify()
+
+    def get_stats(self):
+        with self._wake:
+            return {
+                "offered": self.offered,
+                "accepted": self.accepted,
+                "digests": self.digests,
+                "pending": len(self._digest.items) if self._digest else 0,
+                "uploads_saved": self.uploads_saved,
+                "messages_saved": self.messages_saved,
+            }
+
+    def stop(self):
+        with self._wake:
+            self._stopping = True
+            self._wake.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while not self._stopping:
+                    if self._digest is not None:
+                        timeout = self._digest.deadline - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    elif self._dirty:
+                        break
+                    else:
+                        timeout = None
+                    self._wake.wait(timeout)
+                digest, self._digest = self._digest, None
+                stopping = self._stopping
+            if digest is not None:
+                self._send(digest)
+            self._write_state()
+            if stopping:
+                return
+
+    def _send(self, digest):
+        items = digest.items
+        phones = sorted({phone for item in items for phone in item.phones})
+        if len(items) == 1:
+            frame, label, xyxy = items[0].snapshot, items[0].label, items[0].xyxy
+        else:
+            frame, label, xyxy = self._contact_sheet(items), _summary(items), None
+        cameras = sorted({str(item.cam_id) for item in items})
+        job = AlertJob(",".join(cameras), label, max(item.conf for item in items), frame, phones,
+                       items[0].detected_at, xyxy=xyxy)
+        job.alert_id = digest.alert_id
+        if self.events is None and CFG.EVENT_STORE_ENABLED:
+            self.events = get_event_store()
+        if self.events is not None:
+            for item in items:
+                self.events.record(item.cam_id, item.label, item.conf, item.xyxy, item.track_id, "queued",
+                                   digest.alert_id, item.detected_at, run_id=item.run_id)
+        if self.dispatcher is None:
+            self.dispatcher = get_alert_dispatcher()
+        self.dispatcher.submit(job)
+        uploads_saved = len(items) - 1
+        messages_saved = sum(len(item.phones) for item in items) - len(phones)
+        metrics.ALERT_DIGESTS.labels().inc()
+        metrics.ALERT_IO_SAVED.labels("upload").inc(uploads_saved)
+        metrics.ALERT_IO_SAVED.labels("message").inc(messages_saved)
+        with self._wake:
+            self.digests += 1
+            self.uploads_saved += uploads_saved
+            self.messages_saved += messages_saved
+        if len(items) > 1:
+            print(f"[AlertAggregator] Sending {len(items)} alerts as one digest ({label}): "
+                  f"{uploads_saved} uploads and {messages_saved} messages saved.")
+
+    def _contact_sheet(self, items):
+        items = sorted(items, key=lambda item: -item.conf)[:self.max_tiles]
+        tiles = []
+        for item in items:
+            h, w = item.snapshot.shape[:2]
+            width = min(self.tile_width, w)
+            tile = cv2.resize(item.snapshot, (width, max(1, h * width // w)), interpolation=cv2.INTER_AREA)
+            caption = f"camera {item.cam_id} | {item.label} {item.conf:.2f} | {item.detected_at:%H:%M:%S}"
+            cv2.rectangle(tile, (0, 0), (width, 22), (0, 0, 0), -1)
+            cv2.putText(tile, caption, (5, 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            tiles.append(tile)
+        cols = math.ceil(math.sqrt(len(tiles)))
+        rows = math.ceil(len(tiles) / cols)
+        cell_h = max(t.shape[0] for t in tiles)
+        cell_w = max(t.shape[1] for t in tiles)
+        sheet = np.zeros((rows * cell_h, cols * cell_w, 3), np.uint8)
+        for i, tile in enumerate(tiles):
+            y, x = (i // cols) * cell_h, (i % cols) * cell_w
+            sheet[y:y + tile.shape[0], x:x + tile.shape[1]] = tile
+        return sheet
+
+    def _read_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return {str(k): float(v) for k, v in state.get("cooldowns", {}).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"[AlertAggregator] Ignoring unreadable {self.state_path}: {e}")
+            return {}
+
+    # Merges with what other processes saved, keeps the newest time per key,
+    # drops expired entries and replaces the file atomically.
+    def _write_state(self):
+        with self._wake:
+            if not self._dirty:
+                return
+            self._dirty = False
+            cooldowns = dict(self._cooldowns)
+        for key, ts in self._read_state().items():
+            if ts > cooldowns.get(key, 0.0):
+                cooldowns[key] = ts
+        now = time.time()
+        cooldowns = {k: ts for k, ts in cooldowns.items() if now - ts < self.cooldown}
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"cooldowns": cooldowns}, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"[AlertAggregator] Could not save {self.state_path}: {e}")
+        with self._wake:
+            for key, ts in cooldowns.items():
+                if ts > self._cooldowns.get(key, 0.0):
+                    self._cooldowns[key] = ts
+
+
+def _snapshot(frame, xyxy, label, conf):
+    snapshot = frame.copy()
+    x1, y1, x2, y2 = (int(v) for v in xyxy)
+    cv2.rectangle(snapshot, (x1, y1), (x2, y2), (255, 0, 0), 2)
+    cv2.putText(snapshot, f"{label} {conf:.2f}", (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+    return snapshot
+
+
+# "tank (cameras 0, 2), apc (camera 1)"
+def _summary(items):
+    cameras = {}
+    for item in items:
+        cameras.setdefault(item.label, set()).add(str(item.cam_id))
+    parts = []
+    for label, cams in cameras.items():
+        noun = "camera" if len(cams) == 1 else "cameras"
+        parts.append(f"{label} ({noun} {', '.join(sorted(cams))})")
+    return ", ".join(parts)
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_alert_aggregator():
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = AlertAggregator()
+        return _aggregator
+
+
+# Called first thing in a camera worker process: the process's aggregator
+# passes the alerts it accepts to `forward` instead of digesting them.
+def forward_alerts(forward):
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = AlertAggregator(forward=forward)
+        return _aggregator
+
+
+# Sends the open digest to the dispatcher and saves the cooldowns; call it
+# before shutting the dispatcher down.
+def shutdown_alert_aggregator():
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is not None:
+            _aggregator.stop()
+            _aggregator = None
@@ -0,0 +1,232 @@
+import queue
+import threading
+import time
+import uuid
+
+from config import CFG
+from event_store import get_event_store
+import metrics
+from snapshot_store import SnapshotStore, encode
+
+
+class AlertJob:
+    def __init__(self, cam_id, label, conf, frame, phones, detected_at, track_id=None, xyxy=None):
+        self.cam_id = cam_id
+        self.label = label
+        self.conf = conf
+        self.frame = frame
+        self.phones = list(phones)
+        self.detected_at = detected_at
+        self.track_id = None if track_id is None else int(track_id)
+        # Box of the detection, for the snapshot store's crop tier.
+        self.xyxy = xyxy
+        self.enqueued_at = None
+        self.jpeg = None
+        self.file_path = None
+        self.url = None
+        self.s3_key = None
+        self.notified = set()
+        self.attempts = 0
+        self.alert_id = uuid.uuid4().hex
+
+
+class AlertDispatcher:
+    POLICIES = ("drop_new", "drop_oldest", "block")
+
+    def __init__(self, workers=CFG.ALERT_WORKERS, queue_size=CFG.ALERT_QUEUE_SIZE,
+                 policy=CFG.ALERT_QUEUE_POLICY, max_retries=CFG.ALERT_MAX_RETRIES,
+                 retry_backoff=CFG.ALERT_RETRY_BACKOFF, save_dir=CFG.SNAPSHOT_DIR,
+                 bucket_name=CFG.S3_BUCKET, upload=None, send=None,
+                 save_local=CFG.SAVE_LOCAL_FRAMES, event_store=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown alert queue policy: {policy}")
+        self.policy = policy
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.save_dir = save_dir
+        self.bucket_name = bucket_name
+        self.upload = upload
+        self.send = send
+        self.save_local = save_local
+        self.event_store = event_store
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.max_queue_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        metrics.ALERT_QUEUE_DEPTH.labels().set_function(self._queue.qsize)
+        self._stats_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.snapshots = SnapshotStore(save_dir) if save_local else None
+        self._workers = [
+            threading.Thread(target=self._work, name=f"AlertWorker-{i}", daemon=True)
+            for i in range(max(1, int(workers)))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, job):
+        if self._stop_event.is_set():
+            return False
+        job.enqueued_at = time.monotonic()
+        try:
+            if self.policy == "block":
+                self._queue.put(job, timeout=CFG.ALERT_BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait(job)
+        except queue.Full:
+            if self.policy != "drop_oldest":
+                self._count_dropped(job)
+                return False
+            try:
+                self._count_dropped(self._queue.get_nowait())
+                self._queue.task_done()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._count_dropped(job)
+                return False
+        metrics.ALERTS.labels("submitted").inc()
+        with self._stats_lock:
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return True
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def get_stats(self):
+        with self._stats_lock:
+            done = self.completed + self.failed
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "retries": self.retries,
+                "last_latency": self.last_latency,
+                "max_latency": self.max_latency,
+                "avg_latency": self.total_latency / done if done else 0.0,
+            }
+
+    def join(self):
+        self._queue.join()
+
+    def stop(self, drain=True):
+        if drain:
+            self._queue.join()
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join()
+        if self.snapshots is not None:
+            self.snapshots.close()
+
+    def _count_dropped(self, job):
+        metrics.ALERTS.labels("dropped").inc()
+        if self.event_store:
+            self.event_store.update_alert(job.alert_id, "dropped")
+        with self._stats_lock:
+            self.dropped += 1
+        print(f"[AlertDispatcher] Queue full, dropped alert \"{job.label}\" from camera {job.cam_id}.")
+
+    def _work(self):
+        while not self._stop_event.is_set():
+            try:
+                job = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                ok = self._dispatch_with_retry(job)
+            finally:
+                self._queue.task_done()
+            latency = time.monotonic() - job.enqueued_at
+            metrics.ALERTS.labels("completed" if ok else "failed").inc()
+            if self.event_store:
+                self.event_store.update_alert(job.alert_id, "sent" if ok else "failed", job.file_path, job.s3_key)
+            metrics.ALERT_LATENCY.labels().observe(latency)
+            with self._stats_lock:
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self.total_latency += latency
+
+    def _dispatch_with_retry(self, job):
+        while True:
+            job.attempts += 1
+            try:
+                self._dispatch(job)
+                return True
+            except Exception as e:
+                if job.attempts > self.max_retries or self._stop_event.is_set():
+                    print(f"[AlertDispatcher] Alert \"{job.label}\" failed after {job.attempts} attempts: {e}")
+                    return False
+                delay = self.retry_backoff * 2 ** (job.attempts - 1)
+                print(f"[AlertDispatcher] Alert \"{job.label}\" attempt {job.attempts} failed: {e}. "
+                      f"Retrying in {delay:.1f}s.")
+                metrics.ALERTS.labels("retried").inc()
+                with self._stats_lock:
+                    self.retries += 1
+                if self._stop_event.wait(delay):
+                    return False
+
+    # boto3 and twilio are imported on the first alert, not at startup.
+    def _resolve_clients(self):
+        if self.upload is None:
+            from s3 import upload_bytes_and_get_temporary_url
+            self.upload = upload_bytes_and_get_temporary_url
+        if self.send is None:
+            from twilio_messages import send_warning
+            self.send = send_warning
+
+    # Each step remembers its outcome on the job, so a retry resumes where the
+    # previous attempt failed instead of re-uploading or re-messaging.
+    def _dispatch(self, job):
+        self._resolve_clients()
+        if job.jpeg is None:
+            job.jpeg = encode(job.frame, "jpg", CFG.ALERT_JPEG_QUALITY)
+            if self.snapshots is not None:
+                # The local tiers are encoded and written by the snapshot
+                # store's own worker; the upload does not wait for them.
+                job.file_path = self.snapshots.save(job.alert_id, job.detected_at, job.frame, job.xyxy,
+                                                    job.jpeg, CFG.ALERT_JPEG_QUALITY)
+            job.frame = None
+        if job.url is None:
+            with metrics.UPLOAD_SECONDS.labels().time():
+                job.url, job.s3_key = self.upload(job.jpeg, self.bucket_name, CFG.S3_URL_EXPIRATION)
+        for phone in job.phones:
+            if phone not in job.notified:
+                self.send(job.url, phone, job.label)
+                job.notified.add(phone)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_alert_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            event_store = get_event_store() if CFG.EVENT_STORE_ENABLED else None
+            _dispatcher = AlertDispatcher(event_store=event_store)
+        return _dispatcher
+
+
+def shutdown_alert_dispatcher(drain=False):
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop(drain)
+            _dispatcher = None
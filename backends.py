@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from config import CFG
+
+BACKENDS = ("pytorch", "onnx", "int8")
+
+
+def weights_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def export_path(weights, backend):
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    suffix = ".int8.onnx" if backend == "int8" else ".onnx"
+    return os.path.join(CFG.EXPORT_CACHE_DIR, weights_hash(weights), stem + suffix)
+
+
+# Returns the file to load for `backend`, exporting it on first use. Exports
+# are cached under EXPORT_CACHE_DIR/<hash of the weights>/, so retrained
+# weights get a fresh export and unchanged ones are never re-exported.
+# Every export is built in its own temporary directory next to the target
+# and moved into place with os.replace, so camera worker processes starting
+# together never write the same file; the last one to finish replaces an
+# identical export.
+def ensure_export(weights, backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    if backend == "pytorch":
+        return weights
+    target = export_path(weights, backend)
+    if os.path.exists(target):
+        return target
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    onnx_path = ensure_export(weights, "onnx") if backend == "int8" else None
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(target), prefix=".export-") as tmp_dir:
+        if backend == "onnx":
+            exported = _export_onnx(weights, tmp_dir)
+        else:
+            exported = _quantize_int8(onnx_path, tmp_dir)
+        os.replace(exported, target)
+    print(f"[Backends] Cached {backend} export: {target}")
+    return target
+
+
+# Ultralytics writes the export next to the weights, so it exports a copy
+# of them in `tmp_dir`.
+def _export_onnx(weights, tmp_dir):
+    from ultralytics import YOLO
+    print(f"[Backends] Exporting {weights} to ONNX...")
+    copy = shutil.copy2(weights, tmp_dir)
+    # Dynamic axes so the inference server can send batches of any size.
+    return YOLO(copy).export(format="onnx", imgsz=CFG.IMGSZ, dynamic=True, verbose=False)
+
+
+def _quantize_int8(onnx_path, tmp_dir):
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    print(f"[Backends] Quantizing {onnx_path} to INT8...")
+    quantized_path = os.path.join(tmp_dir, "quantized.onnx")
+    quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QUInt8)
+    # Ultralytics reads class names, stride and imgsz from the ONNX metadata;
+    # keep it so the quantized model reports the same model.names.
+    source = onnx.load(onnx_path, load_external_data=False)
+    quantized = onnx.load(quantized_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    result = os.path.join(tmp_dir, "model.int8.onnx")
+    onnx.save(quantized, result)
+    return result
+
+
+def warmup(model, imgsz=CFG.IMGSZ, runs=2):
+    frame = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(runs):
+        model(frame, verbose=False)
+
+
+# ONNX Runtime sizes its intra-op thread pool per session, and Ultralytics
+# creates the session without options on the first prediction. Sessions
+# created inside this context get `threads` intra-op threads instead of one
+# per core.
+@contextlib.contextmanager
+def _ort_threads(threads):
+    import onnxruntime
+    session_class = onnxruntime.InferenceSession
+
+    def create_session(path, sess_options=None, *args, **kwargs):
+        if sess_options is None:
+            sess_options = onnxruntime.SessionOptions()
+            sess_options.intra_op_num_threads = threads
+        return session_class(path, sess_options, *args, **kwargs)
+
+    onnxruntime.InferenceSession = create_session
+    try:
+        yield
+    finally:
+        onnxruntime.InferenceSession = session_class
+
+
+# `threads` caps the intra-op threads of the model (torch for the pytorch
+# backend, the ONNX Runtime session otherwise), so several processes can
+# share the cores. With ONNX Runtime the model is always warmed up then,
+# since the warmup is what creates the session.
+def load_model(weights=CFG.WEIGHTS, backend=CFG.BACKEND, warm=True, threads=None):
+    from ultralytics import YOLO
+    path = ensure_export(weights, backend)
+    if threads and backend == "pytorch":
+        import torch
+        torch.set_num_threads(threads)
+    model = YOLO(path, task="detect")
+    if threads and backend != "pytorch":
+        with _ort_threads(threads):
+            warmup(model)
+    elif warm:
+        warmup(model)
+    return model
+
+
+def parity_check(data, weights=CFG.WEIGHTS, backends=("onnx", "int8"), imgsz=CFG.IMGSZ):
+    from ultralytics import YOLO
+    rows = []
+    for backend in ("pytorch",) + tuple(b for b in backends if b != "pytorch"):
+        metrics = YOLO(ensure_export(weights, backend), task="detect").val(
+            data=data, imgsz=imgsz, batch=1, plots=False, verbose=False
+        )
+        rows.append((backend, float(metrics.box.map50), float(metrics.box.map)))
+    _, ref50, ref = rows[0]
+    print(f"{'backend':<10}{'mAP50':>10}{'mAP50-95':>12}{'diff mAP50-95':>16}")
+    for backend, map50, map5095 in rows:
+        print(f"{backend:<10}{map50:>10.4f}{map5095:>12.4f}{map5095 - ref:>+16.4f}")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export inference backends and compare their accuracy.")
+    parser.add_argument("--export", nargs="*", choices=BACKENDS, help="Build cached exports for these backends")
+    parser.add_argument("--parity", metavar="DATA_YAML", help="Validate every backend on this dataset")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["onnx", "int8"])
+    parser.add_argument("--weights", default=CFG.WEIGHTS)
+    args = parser.parse_args(argv)
+    for backend in args.export or []:
+        print(ensure_export(args.weights, backend))
+    if args.parity:
+        parity_check(args.parity, args.weights, tuple(args.backends))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import argparse
+import csv
+import gzip
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from backends import BACKENDS, ensure_export, load_model
+from config import CFG
+from detections import Detections
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv")
+
+_model = None
+
+
+def _init_worker(weights, backend, threads):
+    global _model
+    # Each process gets its share of the cores instead of every process
+    # spawning one intra-op thread per core.
+    _model = load_model(weights, backend, threads=threads)
+
+
+def collect_videos(paths):
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.append(os.path.join(path, name))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            print(f"[BatchProcess] Skipping missing path: {path}")
+    return videos
+
+
+def split_video(path, chunk_frames):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"[BatchProcess] Could not open video: {path}")
+        return []
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    if total_frames <= 0:
+        # Unknown length (some containers do not report it): one worker reads to the end.
+        return [(path, 0, None, fps)]
+    return [
+        (path, start, min(start + chunk_frames, total_frames), fps)
+        for start in range(0, total_frames, chunk_frames)
+    ]
+
+
+def process_range(path, start, end, fps, conf, stride, batch_size):
+    started = time.perf_counter()
+    cap = cv2.VideoCapture(path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    rows = []
+    frames_read = 0
+    pending = []
+    index = start
+
+    def flush():
+        results = _model([frame for _, frame in pending], conf=conf, verbose=False)
+        for (frame_index, _), result in zip(pending, results):
+            detections = Detections.from_result(result)
+            timestamp = frame_index / fps
+            for (x1, y1, x2, y2), score, cls_id in zip(detections.xyxy, detections.conf, detections.cls):
+                rows.append((
+                    frame_index, round(timestamp, 3), _model.names[int(cls_id)], round(float(score), 3),
+                    round(float(x1), 1), round(float(y1), 1), round(float(x2), 1), round(float(y2), 1)
+                ))
+        pending.clear()
+
+    while end is None or index < end:
+        if index % stride:
+            if not cap.grab():
+                break
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            pending.append((index, frame))
+            if len(pending) >= batch_size:
+                flush()
+        frames_read += 1
+        index += 1
+    if pending:
+        flush()
+    cap.release()
+    return path, start, rows, frames_read, time.perf_counter() - started
+
+
+def _open_output(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def run_batch(videos, output, workers, chunk_frames, conf, stride, batch_size, weights, backend):
+    chunks = [chunk for video in videos for chunk in split_video(video, chunk_frames)]
+    if not chunks:
+        print("[BatchProcess] Nothing to process.")
+        return
+    workers = max(1, min(workers, len(chunks)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # Export once up front instead of racing the export in every worker.
+    ensure_export(weights, backend)
+    print(f"[BatchProcess] {len(videos)} videos, {len(chunks)} chunks, {workers} workers.")
+
+    started = time.perf_counter()
+    total_frames = 0
+    total_detections = 0
+    per_video = {}
+    # Chunks finish out of order; buffer them so the output stays sorted by video and frame.
+    order = [(path, start) for path, start, _, _ in chunks]
+    finished = {}
+    next_chunk = 0
+    with _open_output(output) as f, ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(weights, backend, threads)) as pool:
+        writer = csv.writer(f)
+        writer.writerow(["video", "frame", "timestamp", "class", "confidence", "x1", "y1", "x2", "y2"])
+        futures = [
+            pool.submit(process_range, path, start, end, fps, conf, stride, batch_size)
+            for path, start, end, fps in chunks
+        ]
+        for future in as_completed(futures):
+            path, start, rows, frames_read, elapsed = future.result()
+            finished[(path, start)] = rows
+            total_frames += frames_read
+            total_detections += len(rows)
+            per_video[path] = per_video.get(path, 0) + frames_read
+            print(f"[BatchProcess] {os.path.basename(path)} from frame {start}: "
+                  f"{frames_read} frames in {elapsed:.1f}s ({frames_read / max(elapsed, 1e-9):.1f} fps)")
+            while next_chunk < len(order) and order[next_chunk] in finished:
+                key = order[next_chunk]
+                writer.writerows((key[0],) + row for row in finished.pop(key))
+                next_chunk += 1
+
+    elapsed = time.perf_counter() - started
+    print(f"[BatchProcess] Done: {total_frames} frames, {total_detections} detections "
+          f"in {elapsed:.1f}s ({total_frames / max(elapsed, 1e-9):.1f} frames/s overall).")
+    for path, frames in per_video.items():
+        print(f"  {path}: {frames} frames")
+    print(f"[BatchProcess] Detections written to {output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run detection over pre-recorded videos without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="Video files and/or directories with videos")
+    parser.add_argument("-o", "--output", default="detections.csv", help="CSV output (.csv or .csv.gz)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-frames", type=int, default=CFG.BATCH_CHUNK_FRAMES,
+                        help="Frames per work item; long videos are split into ranges of this size")
+    parser.add_argument("--stride", type=int, default=1, help="Run detection on every N-th frame")
+    parser.add_argument("--batch-size", type=int, default=CFG.INFERENCE_MAX_BATCH)
+    parser.add_argument("--conf", type=float, default=CFG.CONFIDENCE)
+    parser.add_argument("--weights", default=CFG.WEIGHTS)
+    parser.add_argument("--backend", choices=BACKENDS, default=CFG.BACKEND)
+    args = parser.parse_args(argv)
+
+    videos = collect_videos(args.inputs)
+    if not videos:
+        print("[BatchProcess] No videos found.")
+        return 1
+    run_batch(videos, args.output, args.workers, max(1, args.chunk_frames), args.conf,
+              max(1, args.stride), max(1, args.batch_size), args.weights, args.backend)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from stub_endpoints import start_stub_server
+
+# Alerts go to the local S3/Twilio stand-ins, and events, cooldowns and
+# snapshots to a temporary directory deleted at the end, here and in the
+# worker processes (which inherit the environment and re-read the config).
+# Metrics are on so the stage timings of both modes can be compared. Spawned
+# workers import this module too (as __mp_main__) and must not redo this.
+if __name__ == "__main__":
+    os.environ["DETECTION_METRICS"] = "1"
+    _RUN_DIR = tempfile.mkdtemp(prefix="camera_scaling_")
+    os.environ["DETECTION_EVENT_DB"] = os.path.join(_RUN_DIR, "events.db")
+    os.environ["DETECTION_ALERT_STATE"] = os.path.join(_RUN_DIR, "alert_state.json")
+    os.environ["DETECTION_SNAPSHOT_DIR"] = os.path.join(_RUN_DIR, "saved_frames")
+    _stub_server, _stub_state = start_stub_server()
+    _stub_url = f"http://127.0.0.1:{_stub_server.server_address[1]}"
+    os.environ.setdefault("S3_ENDPOINT_URL", _stub_url)
+    os.environ.setdefault("TWILIO_API_URL", _stub_url)
+    for _key, _value in (("AWS_ACCESS_KEY_ID", "stub"), ("AWS_SECRET_ACCESS_KEY", "stub"),
+                         ("AWS_DEFAULT_REGION", "us-east-1")):
+        os.environ.setdefault(_key, _value)
+
+from alert_aggregator import shutdown_alert_aggregator
+from alert_dispatcher import shutdown_alert_dispatcher
+from benchmarks.synthetic_video import generate_video
+from camera_process import CameraProcessPool
+from event_store import shutdown_event_store
+import metrics
+
+# Compares camera pipeline throughput with 1..N cameras as CameraThreads in
+# one process (CAMERA_MODE=thread) and as worker processes
+# (CAMERA_MODE=process). Each camera reads its own copy of a synthetic video
+# at the video's frame rate and analyzes frames back to back (interval 0):
+#
+#   python benchmarks/camera_scaling.py --cameras 1 2 4 8 --duration 20
+
+ALERT_CLASSES = ["apc", "army-truck", "bmp", "imv", "missile", "mt-lb", "rocket", "rocket-artillery", "tank"]
+STAGES = ("capture", "preprocess", "inference", "postprocess", "annotate", "alert")
+
+
+def _camera_sources(video, count, directory):
+    sources = []
+    for i in range(count):
+        path = os.path.join(directory, f"camera{i}{os.path.splitext(video)[1]}")
+        if not os.path.exists(path):
+            shutil.copyfile(video, path)
+        sources.append(path)
+    return sources
+
+
+# (seconds, count) per stage over all cameras. In process mode the GUI
+# process has the workers' metrics as of their last heartbeat.
+def _stage_totals(sources):
+    totals = {}
+    for stage in STAGES:
+        children = [metrics.STAGE_SECONDS.labels(f"camera{source}", stage) for source in sources]
+        totals[stage] = (sum(child.sum for child in children), sum(child.count for child in children))
+    return totals
+
+
+def _stage_means(before, after):
+    means = {}
+    for stage in STAGES:
+        count = after[stage][1] - before[stage][1]
+        if count:
+            means[stage] = round(1000 * (after[stage][0] - before[stage][0]) / count, 3)
+    return means
+
+
+def _wait_until(predicate, timeout, poll=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if poll:
+            poll()
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def run_threads(sources, duration, warmup_timeout):
+    from camera_thread import CameraThread
+    threads = []
+    for source in sources:
+        thread = CameraThread(source, ALERT_CLASSES, [])
+        thread.interval = 0.0
+        threads.append(thread)
+    for thread in threads:
+        thread.start()
+    try:
+        if not _wait_until(lambda: all(t.frames_analyzed for t in threads), warmup_timeout):
+            raise RuntimeError("Cameras did not start analyzing in time")
+        before, stages_before = [t.frames_analyzed for t in threads], _stage_totals(sources)
+        time.sleep(duration)
+        after, stages_after = [t.frames_analyzed for t in threads], _stage_totals(sources)
+        latency = [t.get_stats()["avg_latency"] for t in threads]
+    finally:
+        for thread in threads:
+            thread.stop()
+        for thread in threads:
+            thread.wait()
+    return [b - a for a, b in zip(before, after)], latency, _stage_means(stages_before, stages_after)
+
+
+def run_processes(sources, duration, warmup_timeout, cameras_per_process):
+    pool = CameraProcessPool(cameras_per_process)
+    for source in sources:
+        pool.add_camera(source, ALERT_CLASSES, [], interval=0.0)
+
+    def analyzed():
+        return [pool.camera_stats(source).get("analyzed", 0) for source in sources]
+
+    try:
+        if not _wait_until(lambda: all(analyzed()), warmup_timeout, pool.poll):
+            raise RuntimeError("Camera workers did not start analyzing in time")
+        before, stages_before = analyzed(), _stage_totals(sources)
+        _wait_until(lambda: False, duration, pool.poll)
+        after, stages_after = analyzed(), _stage_totals(sources)
+        latency = [pool.camera_stats(source).get("avg_latency", 0.0) for source in sources]
+        restarts = pool.restarts
+    finally:
+        pool.shutdown()
+    if restarts:
+        print(f"[Bench] {restarts} worker restarts during the run")
+    return [b - a for a, b in zip(before, after)], latency, _stage_means(stages_before, stages_after)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Camera throughput in thread mode vs process mode.")
+    parser.add_argument("--cameras", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=("thread", "process"), default=["thread", "process"])
+    parser.add_argument("--per-process", type=int, default=1, help="Cameras per worker process")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per run")
+    parser.add_argument("--warmup-timeout", type=float, default=180.0)
+    parser.add_argument("--video", help="Clip to use instead of synthetic footage")
+    parser.add_argument("--out", default="camera_scaling.json")
+    args = parser.parse_args(argv)
+    try:
+        return _run(args)
+    finally:
+        shutdown_alert_aggregator()
+        shutdown_alert_dispatcher(drain=True)
+        shutdown_event_store()
+        _stub_server.shutdown()
+        shutil.rmtree(_RUN_DIR, ignore_errors=True)
+
+
+def _run(args):
+    directory = os.path.join(tempfile.gettempdir(), "bench_cameras")
+    os.makedirs(directory, exist_ok=True)
+    video = args.video
+    if not video:
+        video = os.path.join(directory, "synthetic_640x360.avi")
+        if not os.path.exists(video):
+            generate_video(video, 300, 640, 360)
+    sources = _camera_sources(video, max(args.cameras), directory)
+
+    results = []
+    for mode in args.modes:
+        for count in args.cameras:
+            if mode == "thread":
+                frames, latency, stages = run_threads(sources[:count], args.duration, args.warmup_timeout)
+            else:
+                frames, latency, stages = run_processes(sources[:count], args.duration, args.warmup_timeout,
+                                                args.per_process)
+            total = sum(frames) / args.duration
+            row = {
+                "mode": mode,
+                "cameras": count,
+                "fps_total": round(total, 2),
+                "fps_per_camera": round(total / count, 2),
+                "avg_latency_ms": round(1000 * sum(latency) / len(latency), 1),
+                "stage_mean_ms": stages,
+            }
+            results.append(row)
+            print(f"[Bench] {mode:<8} {count:>3} cameras: {row['fps_total']:>8.2f} fps total, "
+                  f"{row['fps_per_camera']:>7.2f} per camera, {row['avg_latency_ms']:>7.1f} ms avg latency")
+            print("         " + ", ".join(f"{stage} {ms:.1f} ms" for stage, ms in stages.items()))
+
+    by_key = {(r["mode"], r["cameras"]): r for r in results}
+    print(f"{'cameras':>8}{'thread fps':>12}{'process fps':>13}{'speedup':>9}")
+    for count in args.cameras:
+        thread, process = by_key.get(("thread", count)), by_key.get(("process", count))
+        if thread and process and thread["fps_total"]:
+            print(f"{count:>8}{thread['fps_total']:>12.2f}{process['fps_total']:>13.2f}"
+                  f"{process['fps_total'] / thread['fps_total']:>8.2f}x")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"per_process": args.per_process, "duration": args.duration, "results": results}, f, indent=2)
+    print(f"[Bench] Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from stub_endpoints import start_stub_server
+
+# The stage timings are read from the pipelines' own metrics, and alerts go
+# to the local S3/Twilio stand-ins, so both must be set up before the
+# pipeline modules read their configuration.
+os.environ["DETECTION_METRICS"] = "1"
+_stub_server, _stub_state = start_stub_server()
+_stub_url = f"http://127.0.0.1:{_stub_server.server_address[1]}"
+os.environ.setdefault("S3_ENDPOINT_URL", _stub_url)
+os.environ.setdefault("TWILIO_API_URL", _stub_url)
+for _key, _value in (("AWS_ACCESS_KEY_ID", "stub"), ("AWS_SECRET_ACCESS_KEY", "stub"),
+                     ("AWS_DEFAULT_REGION", "us-east-1")):
+    os.environ.setdefault(_key, _value)
+
+from config import CFG
+
+# Events, cooldowns and snapshots of a run are kept out of the working tree;
+# the detection cache is off so every run does the same work.
+_RUN_DIR = tempfile.mkdtemp(prefix="pipeline_bench_")
+CFG.EVENT_DB_PATH = os.path.join(_RUN_DIR, "events.db")
+CFG.ALERT_STATE_PATH = os.path.join(_RUN_DIR, "alert_state.json")
+CFG.SNAPSHOT_DIR = os.path.join(_RUN_DIR, "saved_frames")
+CFG.DETECTION_CACHE_ENABLED = False
+
+import numpy as np
+
+from alert_aggregator import get_alert_aggregator, shutdown_alert_aggregator
+from alert_dispatcher import get_alert_dispatcher, shutdown_alert_dispatcher
+from camera_thread import CameraThread
+from event_store import shutdown_event_store
+import metrics
+from model_registry import get_server, shutdown_servers
+from video_worker import VideoWorker
+from benchmarks.synthetic_video import generate_video
+
+# Runs the real camera and player pipelines (CameraThread, VideoWorker)
+# headless on CPU over deterministic synthetic footage (or recorded clips)
+# and writes per-stage timings, end-to-end latency percentiles and memory use
+# as JSON:
+#
+#   python benchmarks/pipeline_bench.py --cameras 4 --out bench_results.json
+#   python benchmarks/pipeline_bench.py --compare bench_results.json
+
+# "preprocess" is the model's own share of "inference"; "annotate" is drawing
+# boxes (on the grid previews for cameras); the player's "render" is scaling
+# the annotated frame to the display size.
+CAMERA_STAGES = ("capture", "preprocess", "inference", "postprocess", "annotate", "alert")
+PLAYER_STAGES = ("capture", "preprocess", "inference", "postprocess", "annotate", "render")
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values, dtype=np.float64) * 1000.0
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+# Summary of one or more children of a metrics histogram (e.g. one stage of
+# every camera). Percentiles are interpolated within the histogram buckets.
+def histogram_percentiles(children):
+    buckets = children[0].buckets
+    counts = [sum(c) for c in zip(*(child.counts for child in children))]
+    count = sum(child.count for child in children)
+    if not count:
+        return {"count": 0}
+    total = sum(child.sum for child in children)
+
+    def quantile(q):
+        rank = q * count
+        cumulative = 0
+        lower = 0.0
+        for bound, n in zip(buckets + (None,), counts):
+            if n and cumulative + n >= rank:
+                if bound is None:
+                    return lower
+                return lower + (bound - lower) * (rank - cumulative) / n
+            cumulative += n
+            lower = bound if bound is not None else lower
+        return lower
+
+    return {
+        "count": count,
+        "mean_ms": round(total / count * 1000.0, 3),
+        "p50_ms": round(quantile(0.50) * 1000.0, 3),
+        "p95_ms": round(quantile(0.95) * 1000.0, 3),
+        "p99_ms": round(quantile(0.99) * 1000.0, 3),
+    }
+
+
+def _stage_summary(sources, stages):
+    return {
+        stage: histogram_percentiles([metrics.STAGE_SECONDS.labels(source, stage) for source in sources])
+        for stage in stages
+    }
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def summary(self):
+        with self._lock:
+            return {stage: percentiles(values) for stage, values in self.samples.items()}
+
+
+class MemorySampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_rss = 0
+        self.start_rss = self._rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _rss():
+        try:
+            import psutil
+            return psutil.Process().memory_info().rss
+        except ImportError:
+            import resource
+            # ru_maxrss is the peak, in KiB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self._rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, self._rss())
+
+
+# Same conversion as VideoPlayerWidget.update_frame: VideoWorker has already
+# scaled the frame to the display size (VideoWorker._to_display, timed in the
+# player's "render" stage), so it is wrapped as BGR888 without cvtColor and
+# QPixmap.fromImage makes the only copy; only a frame larger than the label
+# is scaled, with the fast transformation. Without PyQt5 the stage measures
+# that one copy.
+class DisplayConverter:
+    def __init__(self, size):
+        self.size = size
+        self.qt = False
+        try:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            from PyQt5.QtGui import QGuiApplication
+            self._app = QGuiApplication.instance() or QGuiApplication([])
+            self.qt = True
+        except ImportError:
+            print("[Bench] PyQt5 not available, display stage measures the frame copy only.")
+
+    def convert(self, frame):
+        if not self.qt:
+            return frame.copy()
+        from PyQt5.QtCore import QSize, Qt
+        from PyQt5.QtGui import QImage, QPixmap
+        h, w = frame.shape[:2]
+        image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        pixmap = QPixmap.fromImage(image)
+        if w > self.size[0] or h > self.size[1]:
+            pixmap = pixmap.scaled(QSize(*self.size), Qt.KeepAspectRatio, Qt.FastTransformation)
+        return pixmap
+
+
+# Every camera reads its own copy of a video, as separate cameras would.
+def _camera_sources(videos, count):
+    sources = []
+    for i in range(count):
+        video = videos[i % len(videos)]
+        path = os.path.join(_RUN_DIR, f"camera{i}{os.path.splitext(video)[1]}")
+        shutil.copyfile(video, path)
+        sources.append(path)
+    return sources
+
+
+def _wait_until(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+# CameraThreads on file sources (read at the file's frame rate, like a live
+# camera) analyze frames back to back until each has analyzed `max_frames`.
+def run_cameras(sources, server, phones, max_frames, timeout):
+    labels = list(server.names.values())
+    threads = [CameraThread(source, labels, phones, interval=0.0) for source in sources]
+    for thread in threads:
+        # Thumbnails as with the "Cameras" tab open, so their boxes are drawn.
+        thread.set_preview(CFG.GRID_FPS)
+    batches_before, frames_before = server.batches_run, server.frames_run
+    wall = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        if not _wait_until(lambda: all(t.frames_analyzed >= max_frames for t in threads), timeout):
+            print(f"[Bench] Cameras did not analyze {max_frames} frames within {timeout:.0f} s.")
+    finally:
+        for thread in threads:
+            thread.stop()
+        for thread in threads:
+            thread.wait()
+    wall = time.perf_counter() - wall
+    stats = [thread.get_stats() for thread in threads]
+    metric_sources = [f"camera{source}" for source in sources]
+    batches = server.batches_run - batches_before
+    analyzed = sum(s["analyzed"] for s in stats)
+    return {
+        "cameras": len(sources),
+        "frames": analyzed,
+        "captured": sum(s["captured"] for s in stats),
+        "dropped": sum(s["dropped"] for s in stats),
+        "skipped_static": sum(s["skipped"] for s in stats),
+        "wall_s": round(wall, 3),
+        "fps": round(analyzed / wall, 2) if wall else 0.0,
+        "avg_batch_size": round((server.frames_run - frames_before) / batches, 2) if batches else 0.0,
+        "stages": _stage_summary(metric_sources, CAMERA_STAGES),
+        "latency": histogram_percentiles([metrics.FRAME_LATENCY.labels(s) for s in metric_sources]),
+    }
+
+
+# A VideoWorker plays the file while this thread stands in for the GUI: it
+# takes each published frame, converts it for display and hands it back.
+def run_player(video, server, display_size, detection_interval, speed, max_frames, timeout):
+    labels = list(server.names.values())
+    worker = VideoWorker(video, 1.0 / 30, labels, labels)
+    worker.detection_interval = detection_interval
+    worker.set_speed(speed)
+    worker.set_display_size(*display_size)
+    converter = DisplayConverter(display_size)
+    timer = StageTimer()
+    displayed = 0
+    deadline = time.monotonic() + timeout
+    wall = time.perf_counter()
+    worker.start()
+    try:
+        while worker.isRunning() and worker.current_frame < max_frames and time.monotonic() < deadline:
+            frame = worker.take_frame()
+            if frame is None:
+                time.sleep(0.001)
+                continue
+            with timer.stage("display_conversion"):
+                converter.convert(frame)
+            worker.recycle(frame)
+            displayed += 1
+    finally:
+        worker.stop()
+        worker.wait()
+    wall = time.perf_counter() - wall
+    stages = _stage_summary(["player"], PLAYER_STAGES)
+    stages.update(timer.summary())
+    return {
+        "frames": worker.current_frame,
+        "published": worker.frames_published,
+        "displayed": displayed,
+        "skipped_to_keep_up": worker.frames_skipped,
+        "max_behind_s": round(worker.max_behind_seconds, 3),
+        "wall_s": round(wall, 3),
+        "fps": round(worker.current_frame / wall, 2) if wall else 0.0,
+        "stages": stages,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(videos, cameras, max_frames, stub_latency, display_size, detection_interval, speed, timeout,
+                  trace_python):
+    _stub_state.latency = stub_latency
+    server = get_server()
+    started = time.perf_counter()
+    server.wait_ready()
+    model_load = time.perf_counter() - started
+    if trace_python:
+        tracemalloc.start()
+    report = {}
+
+    with MemorySampler() as memory:
+        sources = _camera_sources(videos, cameras)
+        report["camera"] = run_cameras(sources, server, ["380000000000"], max_frames, timeout)
+        # Open digests are sent and every queued alert delivered before the stats are taken.
+        aggregator = get_alert_aggregator()
+        shutdown_alert_aggregator()
+        aggregator_stats = aggregator.get_stats()
+        dispatcher = get_alert_dispatcher()
+        dispatcher.join()
+        report["camera"]["alerts"] = dict(aggregator_stats, **dispatcher.get_stats())
+        report["player"] = run_player(videos[0], server, display_size, detection_interval, speed, max_frames,
+                                      timeout)
+
+    shutdown_alert_dispatcher(drain=True)
+    shutdown_event_store()
+    report["memory"] = {
+        "rss_start_mb": round(memory.start_rss / 2 ** 20, 1),
+        "rss_peak_mb": round(memory.peak_rss / 2 ** 20, 1),
+    }
+    if trace_python:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["memory"]["python_peak_mb"] = round(peak / 2 ** 20, 1)
+    report["meta"] = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "backend": server.backend,
+        "weights": server.weights,
+        "model_load_s": round(model_load, 3),
+        "videos": videos,
+        "max_batch": CFG.INFERENCE_MAX_BATCH,
+        "tracking": CFG.TRACKING_ENABLED,
+        "motion_gate": CFG.MOTION_GATE_ENABLED,
+        "alert_digest_window": CFG.ALERT_DIGEST_WINDOW,
+        "playback_speed": speed,
+    }
+    return report
+
+
+def print_report(report):
+    for name in ("camera", "player"):
+        section = report[name]
+        line = f"[Bench] {name}: {section['frames']} frames, {section['fps']} fps"
+        latency = section.get("latency")
+        if latency:
+            line += (f", latency p50/p95/p99 = "
+                     f"{latency.get('p50_ms')}/{latency.get('p95_ms')}/{latency.get('p99_ms')} ms")
+        print(line)
+        for stage, stats in section["stages"].items():
+            if stats["count"]:
+                print(f"    {stage:<22} n={stats['count']:<6} mean={stats['mean_ms']:>9.3f} ms  "
+                      f"p95={stats['p95_ms']:>9.3f} ms")
+    print(f"[Bench] alerts: {report['camera']['alerts']}")
+    print(f"[Bench] memory: {report['memory']}")
+
+
+def compare(report, baseline):
+    print(f"[Bench] Compared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for name in ("camera", "player"):
+        old, new = baseline.get(name), report.get(name)
+        if not old or not new:
+            continue
+        line = f"  {name}: fps {old['fps']} -> {new['fps']}"
+        if old.get("latency") and new.get("latency"):
+            line += f", p95 latency {old['latency'].get('p95_ms')} -> {new['latency'].get('p95_ms')} ms"
+        print(line)
+        for stage, stats in new["stages"].items():
+            before = old["stages"].get(stage)
+            if before and before.get("count") and stats.get("count"):
+                change = (stats["mean_ms"] - before["mean_ms"]) / max(before["mean_ms"], 1e-9)
+                print(f"    {stage:<22} {before['mean_ms']:>9.3f} -> {stats['mean_ms']:>9.3f} ms ({change:+.0%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless CPU benchmark of the camera and player pipelines.")
+    parser.add_argument("--video", action="append", help="Recorded clip(s) to use instead of synthetic footage")
+    parser.add_argument("--frames", type=int, default=300, help="Frames per camera and for the player")
+    parser.add_argument("--size", default="1280x720", help="Synthetic video size, WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cameras", type=int, default=1, help="Camera pipelines run concurrently")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0, help="Simulated S3/Twilio latency")
+    parser.add_argument("--display", default="960x540", help="Display label size, WIDTHxHEIGHT")
+    parser.add_argument("--detection-interval", type=int, default=15)
+    parser.add_argument("--speed", type=float, default=1.0, help="Player playback speed")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Longest run of each pipeline, seconds")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also measure Python heap peak (slower)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    args = parser.parse_args(argv)
+
+    videos = args.video
+    if not videos:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+        path = os.path.join(tempfile.gettempdir(), f"bench_{width}x{height}_{args.frames}_{args.seed}.avi")
+        if not os.path.exists(path):
+            generate_video(path, args.frames, width, height, seed=args.seed)
+        videos = [path]
+    display_size = tuple(int(v) for v in args.display.lower().split("x"))
+
+    try:
+        report = run_benchmark(videos, max(1, args.cameras), args.frames, args.stub_latency_ms / 1000.0,
+                               display_size, args.detection_interval, args.speed, args.timeout, args.tracemalloc)
+    finally:
+        shutdown_servers()
+        _stub_server.shutdown()
+        shutil.rmtree(_RUN_DIR, ignore_errors=True)
+    print_report(report)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[Bench] Results written to {args.out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
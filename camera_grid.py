@@ -0,0 +1,157 @@
+import math
+import time
+
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QComboBox, QGridLayout, QHBoxLayout, QLabel, QVBoxLayout, QWidget
+
+from config import CFG
+import metrics
+
+
+class CameraTile(QLabel):
+    clicked = pyqtSignal(object)
+
+    def __init__(self, cam_id, name, parent=None):
+        super().__init__(name, parent)
+        self.cam_id = cam_id
+        self.name = name
+        self.last_rendered = 0.0
+        self.setAlignment(Qt.AlignCenter)
+        self.setMinimumSize(160, 90)
+        self.setStyleSheet("background-color: #000000; color: #ffffff;")
+
+    def mousePressEvent(self, event):
+        self.clicked.emit(self.cam_id)
+        super().mousePressEvent(event)
+
+
+# Live view of every running camera. Camera threads send small thumbnails at
+# the rate picked in the toolbar, and only the focused camera sends full
+# resolution. Incoming frames only replace the pending frame of their tile;
+# a render timer paints pending tiles, least recently painted first, and stops
+# once GRID_RENDER_BUDGET_MS is used up. Tiles left over keep their newest
+# frame for the next tick, so the GUI cost stays bounded however many cameras
+# there are.
+class CameraGridWidget(QWidget):
+    focus_changed = pyqtSignal(object)
+    rate_changed = pyqtSignal(float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tiles = {}
+        self.focused = None
+        self.frames_received = 0
+        self.frames_rendered = 0
+        self.frames_coalesced = 0
+        self._pending = {}
+        self._m_render = metrics.STAGE_SECONDS.labels("grid", "render")
+
+        self.rate_combo = QComboBox()
+        for fps in CFG.GRID_FPS_CHOICES:
+            self.rate_combo.addItem(f"{fps:g} fps", fps)
+        self.rate_combo.setCurrentIndex(max(0, self.rate_combo.findData(CFG.GRID_FPS)))
+        self.rate_combo.currentIndexChanged.connect(lambda _: self.rate_changed.emit(self.thumbnail_fps()))
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(QLabel("Thumbnails:", self))
+        toolbar.addWidget(self.rate_combo)
+        toolbar.addStretch(1)
+
+        self.focus_tile = CameraTile(None, "Click a camera to focus it", self)
+        self.focus_tile.setMinimumSize(320, 180)
+        self.focus_tile.clicked.connect(lambda _: self.set_focus(None))
+        self.focus_tile.hide()
+        self.grid = QGridLayout()
+        self.grid.setSpacing(4)
+        layout = QVBoxLayout()
+        layout.addLayout(toolbar)
+        layout.addWidget(self.focus_tile, stretch=3)
+        layout.addLayout(self.grid, stretch=2)
+        self.setLayout(layout)
+
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.render_pending)
+        self.render_timer.start(CFG.GRID_RENDER_INTERVAL_MS)
+
+    def thumbnail_fps(self):
+        return float(self.rate_combo.currentData())
+
+    def add_camera(self, cam_id, name):
+        if cam_id in self.tiles:
+            return
+        tile = CameraTile(cam_id, name, self)
+        tile.clicked.connect(self.set_focus)
+        self.tiles[cam_id] = tile
+        self._relayout()
+
+    def remove_camera(self, cam_id):
+        tile = self.tiles.pop(cam_id, None)
+        self._pending.pop(cam_id, None)
+        if tile is None:
+            return
+        self.grid.removeWidget(tile)
+        tile.deleteLater()
+        if self.focused == cam_id:
+            self.set_focus(None)
+        self._relayout()
+
+    def set_focus(self, cam_id):
+        cam_id = None if cam_id == self.focused else cam_id
+        self.focused = cam_id
+        if cam_id is None:
+            self.focus_tile.hide()
+        else:
+            self.focus_tile.setText(self.tiles[cam_id].name)
+            self.focus_tile.show()
+        self.focus_changed.emit(cam_id)
+
+    def on_camera_event(self, cam_id, frame):
+        if cam_id not in self.tiles:
+            return
+        self.frames_received += 1
+        if self._pending.get(cam_id) is not None:
+            self.frames_coalesced += 1
+        self._pending[cam_id] = frame
+
+    def render_pending(self):
+        if not self._pending or not self.isVisible():
+            return
+        started = time.perf_counter()
+        budget = CFG.GRID_RENDER_BUDGET_MS / 1000.0
+        # The focused camera first, then the tiles that waited longest.
+        order = sorted(self._pending, key=lambda c: (c != self.focused, self._tile(c).last_rendered))
+        for cam_id in order:
+            if time.perf_counter() - started >= budget:
+                break
+            frame = self._pending.pop(cam_id)
+            with self._m_render.time():
+                self._show(self._tile(cam_id), frame)
+            self.frames_rendered += 1
+
+    def get_stats(self):
+        return {
+            "cameras": len(self.tiles),
+            "received": self.frames_received,
+            "rendered": self.frames_rendered,
+            "coalesced": self.frames_coalesced,
+            "pending": len(self._pending),
+        }
+
+    def _tile(self, cam_id):
+        return self.focus_tile if cam_id == self.focused else self.tiles[cam_id]
+
+    def _show(self, tile, frame):
+        h, w = frame.shape[:2]
+        image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        pixmap = QPixmap.fromImage(image)
+        if w > tile.width() or h > tile.height():
+            pixmap = pixmap.scaled(tile.size(), Qt.KeepAspectRatio, Qt.FastTransformation)
+        tile.setPixmap(pixmap)
+        tile.last_rendered = time.monotonic()
+
+    def _relayout(self):
+        for tile in self.tiles.values():
+            self.grid.removeWidget(tile)
+        columns = max(1, math.ceil(math.sqrt(len(self.tiles))))
+        for i, tile in enumerate(self.tiles.values()):
+            self.grid.addWidget(tile, i // columns, i % columns)
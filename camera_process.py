@@ -0,0 +1,325 @@
+import multiprocessing
+import queue
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from alert_aggregator import get_alert_aggregator
+from config import CFG
+import metrics
+from shm_ring import FrameRing
+
+
+# Runs in the worker process. Cameras are ordinary CameraThreads sharing the
+# process's inference server; their previews go into the camera's ring
+# instead of a Qt signal, and their counters plus a heartbeat are published
+# in the ring's stats every WORKER_HEARTBEAT_INTERVAL. Alerts the cameras
+# accept are put on `reports` and digested and sent by the GUI process, so
+# alerts from cameras in different workers still share digests; with metrics
+# on, the cameras' metrics follow them every heartbeat.
+def _worker_main(control, reports):
+    from PyQt5.QtCore import Qt
+    from alert_aggregator import forward_alerts, shutdown_alert_aggregator
+    from camera_thread import CameraThread
+    from event_store import shutdown_event_store
+    from model_registry import shutdown_servers
+
+    forward_alerts(lambda item: reports.put(("alert", item)))
+    cameras = {}
+
+    def add(config):
+        thread = CameraThread(
+            config["cam_id"], config["enabled_alerts"], config["phones"],
+            motion_sensitivity=config.get("motion_sensitivity", CFG.MOTION_SENSITIVITY),
+            tile_size=config.get("tile_size"),
+            tile_overlap=config.get("tile_overlap", CFG.TILE_OVERLAP),
+            source=config.get("source"),
+            max_width=config.get("max_width"),
+            max_fps=config.get("max_fps"),
+            interval=config.get("interval", 1.0),
+            confidence=config.get("confidence", CFG.CONFIDENCE),
+        )
+        ring = FrameRing.attach(config["ring"])
+        thread.camera_event.connect(
+            lambda _, frame, r=ring: r.write(frame), Qt.DirectConnection
+        )
+        thread.set_preview(*config["preview"])
+        cameras[config["cam_id"]] = (thread, ring)
+        thread.start()
+
+    def remove(cam_id):
+        thread, ring = cameras.pop(cam_id)
+        thread.stop()
+        thread.wait()
+        ring.close()
+
+    try:
+        while True:
+            try:
+                message = control.get(timeout=CFG.WORKER_HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                message = None
+            if message is not None:
+                kind = message[0]
+                if kind == "stop":
+                    break
+                if kind == "add":
+                    add(message[1])
+                elif kind == "remove" and message[1] in cameras:
+                    remove(message[1])
+                elif kind == "preview" and message[1] in cameras:
+                    cameras[message[1]][0].set_preview(message[2], message[3])
+                elif kind == "configure" and message[1] in cameras:
+                    try:
+                        cameras[message[1]][0].reconfigure(**message[2])
+                    except ValueError as e:
+                        print(f"[CameraWorker] Camera {message[1]}: {e}")
+            now = time.time()
+            for thread, ring in cameras.values():
+                stats = thread.get_stats()
+                ring.stats[:] = (stats["captured"], stats["analyzed"], stats["dropped"],
+                                 stats["avg_latency"], stats["connected"], stats["reconnects"], now)
+            if metrics.ENABLED and cameras:
+                reports.put(("metrics", metrics.snapshot(thread.metrics_source for thread, _ in cameras.values())))
+    finally:
+        for cam_id in list(cameras):
+            remove(cam_id)
+        shutdown_alert_aggregator()
+        shutdown_event_store()
+        shutdown_servers()
+
+
+class _WorkerProcess:
+    def __init__(self, index, context):
+        self.index = index
+        self.context = context
+        self.cameras = {}
+        self.process = None
+        self.control = None
+        self.reports = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.restart_at = None
+
+    def start(self):
+        self.control = self.context.Queue()
+        self.reports = self.context.Queue()
+        self.process = self.context.Process(
+            target=_worker_main, args=(self.control, self.reports), name=f"CameraWorker-{self.index}", daemon=True
+        )
+        self.process.start()
+        self.started_at = time.time()
+        self.restart_at = None
+        for config in self.cameras.values():
+            self.control.put(("add", config))
+
+    def send(self, message):
+        self.control.put(message)
+
+    def take_reports(self):
+        reports = []
+        while True:
+            try:
+                reports.append(self.reports.get_nowait())
+            except queue.Empty:
+                return reports
+
+    # Returns the reports the worker sent until it exited. They are taken
+    # while waiting, since a process cannot exit while its queue's pipe is
+    # full.
+    def stop(self, timeout=10.0):
+        if self.process is None:
+            return []
+        reports = []
+        if self.process.is_alive():
+            self.send(("stop",))
+            deadline = time.monotonic() + timeout
+            while self.process.is_alive() and time.monotonic() < deadline:
+                reports.extend(self.take_reports())
+                self.process.join(0.05)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            else:
+                reports.extend(self.take_reports())
+        self.close_queues()
+        self.process = None
+        return reports
+
+    def close_queues(self):
+        self.control.close()
+        self.reports.close()
+
+
+# GUI-side owner of the worker processes and of one FrameRing per camera.
+# Cameras are packed CAMERAS_PER_PROCESS to a process; workers left without
+# cameras stay up with their model loaded and take the next camera added.
+# `poll` must be called regularly: it returns new previews, hands the
+# workers' alerts to this process's AlertAggregator, merges their metrics
+# into this process's and restarts workers that died or stopped sending
+# heartbeats. Alerts still in the queue of a worker that crashed or was
+# killed are lost with it.
+class CameraProcessPool:
+    def __init__(self, cameras_per_process=CFG.CAMERAS_PER_PROCESS):
+        self.cameras_per_process = max(1, int(cameras_per_process))
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = []
+        self.rings = {}
+        self.restarts = 0
+        self._owner = {}
+        self._last_check = 0.0
+
+    def add_camera(self, cam_id, enabled_alerts=None, phones=None, **options):
+        ring = FrameRing.create()
+        config = dict(options, cam_id=cam_id, enabled_alerts=list(enabled_alerts or []),
+                      phones=list(phones or []), ring=ring.name, preview=(0, False))
+        candidates = [w for w in self.workers if len(w.cameras) < self.cameras_per_process]
+        worker = min(candidates, key=lambda w: len(w.cameras), default=None)
+        self.rings[cam_id] = ring
+        if worker is None:
+            worker = _WorkerProcess(len(self.workers), self.context)
+            self.workers.append(worker)
+            worker.cameras[cam_id] = config
+            worker.start()
+        else:
+            worker.cameras[cam_id] = config
+            if worker.restart_at is None:
+                worker.send(("add", config))
+        self._owner[cam_id] = worker
+
+    def remove_camera(self, cam_id):
+        worker = self._owner.pop(cam_id, None)
+        if worker is None:
+            return
+        del worker.cameras[cam_id]
+        if worker.restart_at is None:
+            worker.send(("remove", cam_id))
+        self.rings.pop(cam_id).close()
+
+    def set_preview(self, cam_id, fps, full_resolution=False):
+        worker = self._owner.get(cam_id)
+        if worker is None:
+            return
+        worker.cameras[cam_id]["preview"] = (fps, full_resolution)
+        if worker.restart_at is None:
+            worker.send(("preview", cam_id, fps, full_resolution))
+
+    # Sends CameraSettings changes to the running camera; they are also kept
+    # in the camera's config, so a restarted worker starts with them.
+    def configure(self, cam_id, changes):
+        worker = self._owner.get(cam_id)
+        if worker is None:
+            return
+        worker.cameras[cam_id].update(changes)
+        if worker.restart_at is None:
+            worker.send(("configure", cam_id, changes))
+
+    def camera_stats(self, cam_id):
+        ring = self.rings.get(cam_id)
+        return ring.stats_dict() if ring is not None else {}
+
+    def poll(self):
+        for worker in self.workers:
+            if worker.restart_at is None and worker.process is not None:
+                self._handle_reports(worker.take_reports())
+        updates = []
+        for cam_id, ring in self.rings.items():
+            item = ring.read_latest()
+            if item is not None:
+                _, _, frame = item
+                updates.append((cam_id, frame))
+        now = time.time()
+        if now - self._last_check >= CFG.WORKER_HEARTBEAT_INTERVAL:
+            self._last_check = now
+            self._check_workers(now)
+        return updates
+
+    def shutdown(self):
+        for worker in self.workers:
+            self._handle_reports(worker.stop())
+        self.workers = []
+        for ring in self.rings.values():
+            ring.close()
+        self.rings = {}
+        self._owner = {}
+
+    @staticmethod
+    def _handle_reports(reports):
+        for kind, payload in reports:
+            if kind == "alert":
+                get_alert_aggregator().add(payload)
+            elif kind == "metrics":
+                metrics.merge(payload)
+
+    def _check_workers(self, now):
+        for worker in self.workers:
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    worker.start()
+                    worker.restarts += 1
+                    self.restarts += 1
+                continue
+            if worker.process.is_alive():
+                if not worker.cameras:
+                    continue
+                beats = [self.rings[c].stats[-1] for c in worker.cameras if c in self.rings]
+                last = max(beats + [worker.started_at])
+                if now - last <= CFG.WORKER_HANG_TIMEOUT:
+                    continue
+                print(f"[CameraProcessPool] Worker {worker.index} sent no heartbeat for "
+                      f"{now - last:.0f} s, killing it.")
+                worker.process.kill()
+                worker.process.join()
+            # A worker that ran for a while before dying starts over at the
+            # shortest delay; one that keeps crashing backs off.
+            if now - worker.started_at > 60.0:
+                worker.restarts = 0
+            delay = min(CFG.WORKER_MAX_RESTART_BACKOFF, CFG.WORKER_RESTART_BACKOFF * 2 ** worker.restarts)
+            print(f"[CameraProcessPool] Worker {worker.index} exited with code {worker.process.exitcode}; "
+                  f"restarting in {delay:.0f} s.")
+            worker.close_queues()
+            worker.restart_at = now + delay
+
+
+# Stands in for a CameraThread in MainWindow when CAMERA_MODE is "process":
+# same constructor, signal and start/stop/wait/set_preview/reconfigure/get_stats, backed
+# by a camera in a CameraProcessPool. MainWindow delivers the pool's previews
+# through `camera_event`.
+class CameraProcessProxy(QObject):
+    camera_event = pyqtSignal(object, object)
+
+    def __init__(self, pool, cam_id, enabled_alerts=None, phones=None, parent=None, **options):
+        super().__init__(parent)
+        self.pool = pool
+        self.cam_id = cam_id
+        self.enabled_alerts = list(enabled_alerts or [])
+        self.phones = list(phones or [])
+        self.options = options
+
+    def start(self):
+        self.pool.add_camera(self.cam_id, self.enabled_alerts, self.phones, **self.options)
+
+    def stop(self):
+        self.pool.remove_camera(self.cam_id)
+
+    def wait(self, *args):
+        return True
+
+    def set_preview(self, fps, full_resolution=False):
+        self.pool.set_preview(self.cam_id, fps, full_resolution)
+
+    def reconfigure(self, **changes):
+        for name, value in changes.items():
+            if name == "enabled_alerts":
+                self.enabled_alerts = list(value)
+            elif name == "phones":
+                self.phones = list(value)
+            else:
+                self.options[name] = value
+        self.pool.configure(self.cam_id, {k: list(v) if isinstance(v, tuple) else v for k, v in changes.items()})
+
+    def get_stats(self):
+        return self.pool.camera_stats(self.cam_id)
+
+    def deliver(self, frame):
+        self.camera_event.emit(self.cam_id, frame)
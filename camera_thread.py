@@ -1,79 +1,325 @@
 import cv2
 from PyQt5.QtCore import QThread, pyqtSignal
+import threading
 import time
-import os
 import datetime
+import uuid
 
-from ultralytics import YOLO
-from twilio_messages import send_warning
+from model_registry import get_server
+from alert_aggregator import get_alert_aggregator
+from event_store import get_event_store
 from config import CFG
-from s3 import upload_and_get_temporary_url
+from frame_buffer import FrameRingBuffer
+from detections import Detections, class_ids_for, draw_detections
+from tracker import BoxTracker
+from motion_gate import MotionGate
+from tiling import TiledDetector
+from capture_source import CaptureSource
+import metrics
+
+# Everything about a running camera that can change without restarting it.
+# Instances are never modified: CameraThread.reconfigure builds a new one and
+# swaps the reference, and the detection loop takes the reference once per
+# frame, so a frame is always handled with one consistent set of settings.
+class CameraSettings:
+    FIELDS = ("enabled_alerts", "phones", "interval", "confidence", "motion_sensitivity", "tile_size", "tile_overlap")
+
+    def __init__(self, enabled_alerts=(), phones=(), interval=1.0, confidence=CFG.CONFIDENCE,
+                 motion_sensitivity=CFG.MOTION_SENSITIVITY, tile_size=None, tile_overlap=CFG.TILE_OVERLAP):
+        self.enabled_alerts = tuple(enabled_alerts)
+        self.phones = tuple(phones)
+        self.interval = float(interval)
+        self.confidence = float(confidence)
+        self.motion_sensitivity = motion_sensitivity
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+
+    def replace(self, **changes):
+        unknown = set(changes) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown camera settings: {', '.join(sorted(unknown))}")
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values.update(changes)
+        return CameraSettings(**values)
+
 
 class CameraThread(QThread):
-    camera_event = pyqtSignal(int, object)
+    camera_event = pyqtSignal(object, object)
 
-    def __init__(self, cam_id, enabled_alerts=None, phones=None, parent=None):
+    def __init__(self, cam_id, enabled_alerts=None, phones=None, parent=None,
+                 motion_sensitivity=CFG.MOTION_SENSITIVITY, tile_size=None, tile_overlap=CFG.TILE_OVERLAP,
+                 source=None, max_width=None, max_fps=None, interval=1.0, confidence=CFG.CONFIDENCE):
         super().__init__(parent)
         self.cam_id = cam_id
+        # Network cameras are identified by cam_id and read from their URL.
+        self.capture = CaptureSource(cam_id if source is None else source, f"camera {cam_id}", max_width, max_fps)
         self.stop_flag = False
-        self.interval = 1.0
-        self.enabled_alerts = enabled_alerts or []
-        self.phones = phones or []
-        self.last_save_time = {}
+        self.settings = CameraSettings(enabled_alerts or [], phones or [], interval, confidence,
+                                       motion_sensitivity, tile_size, tile_overlap)
+        self._settings_lock = threading.Lock()
+        # Settings the detection loop has set up for (class ids, motion gate, tiling).
+        self._applied = None
+        self._active = self.settings
+        self._alert_ids = None
+        self.buffer = FrameRingBuffer(CFG.CAPTURE_BUFFER_SIZE)
+        self.frames_analyzed = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self.alerts = None
+        self.events = None
+        self.tracker = BoxTracker() if CFG.TRACKING_ENABLED else None
+        # Stored with every event so track ids of this tracker are not
+        # confused with the same ids from an earlier run of the camera.
+        self.run_id = uuid.uuid4().hex
+        self.alerted_tracks = set()
+        self.seen_tracks = set()
+        self.last_detections = None
+        self.names = None
+        self.motion_gate = MotionGate(motion_sensitivity) if CFG.MOTION_GATE_ENABLED else None
+        self.tiled_detector = None
+        # Preview frames for the camera grid; off until set_preview is called.
+        self.preview_interval = None
+        self.preview_width = CFG.GRID_THUMBNAIL_WIDTH
+        self._last_preview = 0.0
+        source = self.metrics_source = f"camera{cam_id}"
+        self._m_captured = metrics.FRAMES_CAPTURED.labels(source)
+        self._m_dropped = metrics.FRAMES_DROPPED.labels(source)
+        self._m_analyzed = metrics.FRAMES_ANALYZED.labels(source)
+        self._m_skipped = metrics.FRAMES_SKIPPED.labels(source)
+        self._m_capture = metrics.STAGE_SECONDS.labels(source, "capture")
+        self._m_inference = metrics.STAGE_SECONDS.labels(source, "inference")
+        self._m_postprocess = metrics.STAGE_SECONDS.labels(source, "postprocess")
+        self._m_annotate = metrics.STAGE_SECONDS.labels(source, "annotate")
+        self._m_alert = metrics.STAGE_SECONDS.labels(source, "alert")
+        self._m_latency = metrics.FRAME_LATENCY.labels(source)
+        self._m_connected = metrics.STREAM_CONNECTED.labels(source)
+        self._m_reconnects = metrics.STREAM_RECONNECTS.labels(source)
+        self._fps = metrics.FpsMeter(source)
+
+    # Applies any of CameraSettings.FIELDS to the running camera; the capture
+    # device, the model and the tracker stay as they are. Safe to call from
+    # any thread; the new settings take effect from the next frame.
+    def reconfigure(self, **changes):
+        with self._settings_lock:
+            self.settings = self.settings.replace(**changes)
+            return self.settings
+
+    @property
+    def enabled_alerts(self):
+        return list(self.settings.enabled_alerts)
+
+    @enabled_alerts.setter
+    def enabled_alerts(self, labels):
+        self.reconfigure(enabled_alerts=labels)
+
+    @property
+    def phones(self):
+        return list(self.settings.phones)
+
+    @property
+    def interval(self):
+        return self.settings.interval
+
+    @interval.setter
+    def interval(self, seconds):
+        self.reconfigure(interval=seconds)
+
+    def _apply_settings(self, server, settings):
+        previous = self._applied
+        if previous is None or previous.enabled_alerts != settings.enabled_alerts:
+            self._alert_ids = class_ids_for(server.names, settings.enabled_alerts)
+        if self.motion_gate:
+            self.motion_gate.sensitivity = float(min(max(settings.motion_sensitivity, 0.0), 1.0))
+        if previous is None or (previous.tile_size, previous.tile_overlap) != (settings.tile_size,
+                                                                                settings.tile_overlap):
+            # Tiling shares the camera's inference server, so switching it loads nothing.
+            self.tiled_detector = (TiledDetector(server, settings.tile_size, settings.tile_overlap)
+                                   if settings.tile_size else None)
+        self._applied = settings
 
     def run(self):
-        cap = cv2.VideoCapture(self.cam_id)
-        if not cap.isOpened():
-            print(f"Could not open camera {self.cam_id}")
-            return
-        model = YOLO(CFG.WEIGHTS)
-        save_dir = "saved_frames"
-        os.makedirs(save_dir, exist_ok=True)
+        self._m_captured.set_function(lambda: self.buffer.captured)
+        self._m_dropped.set_function(lambda: self.buffer.dropped)
+        self._m_connected.set_function(lambda: float(self.capture.state == "live"))
+        self._m_reconnects.set_function(lambda: self.capture.reconnects)
+        capture_thread = threading.Thread(
+            target=self._capture_loop, name=f"Capture-{self.cam_id}", daemon=True
+        )
+        capture_thread.start()
+        server = get_server()
+        self.alerts = get_alert_aggregator()
+        self.events = get_event_store() if CFG.EVENT_STORE_ENABLED else None
+
+        while not self.stop_flag:
+            item = self.buffer.get_latest(timeout=1.0)
+            if item is None:
+                continue
+            _, captured_at, frame = item
+            started = time.monotonic()
+            settings = self._active = self.settings
+            if settings is not self._applied:
+                try:
+                    self._apply_settings(server, settings)
+                except Exception as e:
+                    print(f"[CameraThread] Could not apply settings for camera {self.cam_id}: {e}")
+                    time.sleep(settings.interval)
+                    continue
+            if self.motion_gate and not self.motion_gate.check(frame, started):
+                self._m_skipped.inc()
+                self._sleep_rest(started)
+                continue
+            try:
+                names = self.names = server.names
+                with self._m_inference.time():
+                    if self.tiled_detector:
+                        detections = self.tiled_detector.detect(frame, settings.confidence, self._alert_ids,
+                                                                 self.metrics_source)
+                    else:
+                        detections = server.predict(frame, settings.confidence, self._alert_ids, source=self.metrics_source)
+            except Exception as e:
+                print(f"[CameraThread] Inference failed for camera {self.cam_id}: {e}")
+                time.sleep(settings.interval)
+                continue
+            if self.tracker:
+                # Frames between inferences are skipped, so boxes are moved by
+                # the tracks' velocity before matching.
+                with self._m_postprocess.time():
+                    self.tracker.predict()
+                    detections = self.tracker.update(detections)
+                    live_ids = self.tracker.ids.tolist()
+                    self.alerted_tracks.intersection_update(live_ids)
+                    self.seen_tracks.intersection_update(live_ids)
+            self.last_detections = detections
+            ids = detections.ids if detections.ids is not None else [None] * len(detections)
+            with self._m_alert.time():
+                for xyxy, conf, cls_id, track_id in zip(detections.xyxy, detections.conf, detections.cls, ids):
+                    self.check_and_save(frame, xyxy, names[cls_id], float(conf), track_id)
+            self._record_latency(time.monotonic() - captured_at)
+            self._sleep_rest(started)
 
+        self.buffer.close()
+        self.capture.close()
+        capture_thread.join()
+        self.capture.release()
+        self._m_captured.set_function(None)
+        self._m_dropped.set_function(None)
+        self._m_connected.set_function(None)
+        self._m_reconnects.set_function(None)
+        self._m_captured.set(self.buffer.captured)
+        self._m_dropped.set(self.buffer.dropped)
+        self._m_connected.set(0)
+        self._m_reconnects.set(self.capture.reconnects)
+        stats = self.get_stats()
+        print(
+            f"[CameraThread] Camera {self.cam_id} finished: {stats['analyzed']} analyzed, "
+            f"{stats['dropped']} dropped, {stats['skip_ratio']:.0%} skipped as static, "
+            f"avg latency {stats['avg_latency'] * 1000:.0f} ms, {stats['reconnects']} reconnects."
+        )
+        if self.tiled_detector:
+            print(f"[CameraThread] Camera {self.cam_id} tiled inference: "
+                  f"{stats['tiles_per_second']:.1f} tiles/s.")
+
+    def _sleep_rest(self, started):
+        # The capture stage keeps running while we wait, so the next
+        # iteration still picks up the newest frame.
+        remaining = self._active.interval - (time.monotonic() - started)
+        if remaining > 0 and not self.stop_flag:
+            time.sleep(remaining)
+
+    # Reconnection, frame-rate limiting and file pacing are handled by
+    # CaptureSource; read() returns None while there is no frame to pass on.
+    def _capture_loop(self):
         while not self.stop_flag:
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                print(f"[CameraThread] Camera {self.cam_id} returned an empty frame.")
-                time.sleep(self.interval)
+            started = time.monotonic()
+            frame = self.capture.read()
+            if frame is None:
                 continue
-            results = list(model(frame, CFG.CONFIDENCE))
-            if len(results) > 0:
-                boxes = results[0].boxes
-                for box in boxes:
-                    cls_id = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    label = model.names[cls_id]
-                    if label in self.enabled_alerts:
-                        self.check_and_save(frame, box, label, conf, save_dir)
-            self.camera_event.emit(self.cam_id, frame)
-            time.sleep(self.interval)
-
-        cap.release()
-        print(f"[CameraThread] Camera {self.cam_id} finished.")
-
-    def check_and_save(self, frame, box, label, conf, save_dir):
-        cooldown = 600
+            now = time.monotonic()
+            self._m_capture.observe(now - started)
+            self.buffer.put(frame, now)
+            self._emit_preview(frame, now)
+
+    def set_preview(self, fps, full_resolution=False):
+        self.preview_interval = 1.0 / fps if fps and fps > 0 else None
+        self.preview_width = None if full_resolution else CFG.GRID_THUMBNAIL_WIDTH
+
+    # camera_event carries a thumbnail (or, for the focused camera, the full
+    # frame) at most once per preview_interval, straight from the capture
+    # stage, so the grid does not wait for inference. The boxes of the last
+    # analyzed frame are drawn on it here, so previews from worker processes
+    # arrive with their boxes and the GUI needs no class names.
+    def _emit_preview(self, frame, now):
+        interval = self.preview_interval
+        if interval is None or now - self._last_preview < interval:
+            return
+        self._last_preview = now
+        width = self.preview_width
+        h, w = frame.shape[:2]
+        if width and w > width:
+            preview = cv2.resize(frame, (width, max(1, h * width // w)), interpolation=cv2.INTER_AREA)
+        else:
+            preview = frame
+        detections = self.last_detections
+        if detections is not None and len(detections) and self.names is not None:
+            with self._m_annotate.time():
+                if preview is frame:
+                    # The captured frame is still waiting for inference in the buffer.
+                    preview = frame.copy()
+                scale = preview.shape[1] / w
+                if scale != 1.0:
+                    detections = Detections(detections.xyxy * scale, detections.conf, detections.cls,
+                                            detections.ids)
+                draw_detections(preview, detections, self.names, (0, 0, 255), thickness=1, text_offset=4)
+        self.camera_event.emit(self.cam_id, preview)
+
+    def _record_latency(self, latency):
+        self.frames_analyzed += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_latency += latency
+        self._m_analyzed.inc()
+        self._m_latency.observe(latency)
+        self._fps.tick()
+
+    def get_stats(self):
+        analyzed = self.frames_analyzed
+        return {
+            "captured": self.buffer.captured,
+            "analyzed": analyzed,
+            "dropped": self.buffer.dropped,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "avg_latency": self.total_latency / analyzed if analyzed else 0.0,
+            "skipped": self.motion_gate.frames_skipped if self.motion_gate else 0,
+            "skip_ratio": self.motion_gate.skip_ratio() if self.motion_gate else 0.0,
+            "tiles_per_second": self.tiled_detector.tiles_per_second() if self.tiled_detector else 0.0,
+            "connected": self.capture.state == "live",
+            "reconnects": self.capture.reconnects,
+            "stream_fps": self.capture.fps,
+        }
+
+    # Every alert, and every new track that did not alert, is recorded in the
+    # event store; the dispatcher later updates the alert's outcome. Cooldowns,
+    # batching into digests and recording the alerts are up to the shared
+    # AlertAggregator.
+    def check_and_save(self, frame, xyxy, label, conf, track_id=None):
+        new_track = track_id is None or int(track_id) not in self.seen_tracks
+        if track_id is not None:
+            self.seen_tracks.add(int(track_id))
+        if CFG.ALERT_ONCE_PER_TRACK and track_id is not None and track_id in self.alerted_tracks:
+            return
         now = datetime.datetime.now()
-        last_time = self.last_save_time.get(label)
-        if last_time is None or (now - last_time).total_seconds() >= cooldown:
-            self.last_save_time[label] = now
-            print(f"[CameraThread] Saving frame for \"{label}\" (>=10 minutes passed).")
-            x1, y1, x2, y2 = box.xyxy[0]
-            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (255, 0, 0), 2)
-            cv2.putText(
-                frame, f"{label} {conf:.2f}",
-                (int(x1), int(y1) - 5),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1
-            )
-            filename = f"{label}_{now.strftime('%Y-%m-%d-%H-%M-%S')}.jpg"
-            file_path = os.path.join(save_dir, filename)
-            cv2.imwrite(file_path, frame)
-            print(f"[CameraThread] Image saved: {file_path}")
-            bucket_name = "diplomamodelstorage"
-            url, s3_key = upload_and_get_temporary_url(file_path, bucket_name, 86400)
-            print("Temporary link:", url)
-            for phone in self.phones:
-                send_warning(url, phone, label)
+        alert_id = self.alerts.offer(self.cam_id, label, conf, frame, xyxy, self._active.phones, now,
+                                     track_id, self.run_id)
+        if alert_id is not None:
+            if track_id is not None:
+                self.alerted_tracks.add(int(track_id))
+            print(f"[CameraThread] Queueing alert for \"{label}\" (cooldown passed).")
+        elif new_track and self.events:
+            self.events.record(self.cam_id, label, conf, xyxy, track_id, "none", detected_at=now, run_id=self.run_id)
 
     def stop(self):
-        self.stop_flag = True
\ No newline at end of file
+        self.stop_flag = True
+        self.buffer.close()
+        self.capture.close()
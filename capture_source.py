@@ -0,0 +1,260 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import cv2
+
+from config import CFG
+
+_ffmpeg_env_lock = threading.Lock()
+
+
+def is_stream_url(source):
+    return isinstance(source, str) and "://" in source
+
+
+# The source as it may appear in logs: a stream URL's password is replaced
+# with "***" (RTSP cameras usually carry their credentials in the URL).
+def redact_url(source):
+    if not is_stream_url(source):
+        return str(source)
+    parts = urlsplit(source)
+    if parts.password is None:
+        return source
+    userinfo, _, host = parts.netloc.rpartition("@")
+    return urlunsplit(parts._replace(netloc=f"{userinfo.partition(':')[0]}:***@{host}"))
+
+
+def _is_file(source):
+    return isinstance(source, str) and not is_stream_url(source) and os.path.isfile(source)
+
+
+def _device_index(source):
+    # Device indices read back from config.json may be strings.
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+# One camera input, kept open for as long as the camera runs:
+#   - a device index: opened with a one-frame driver buffer;
+#   - an RTSP/HTTP URL: opened through FFmpeg with STREAM_FFMPEG_OPTIONS
+#     (TCP, no input buffering) and open/read timeouts, so a dead stream
+#     fails a read instead of hanging;
+#   - a video file: read at its own frame rate and looped, as a stand-in
+#     for a camera in tests and benchmarks.
+# After STREAM_MAX_READ_FAILURES failed reads in a row the source is closed
+# and reopened, waiting STREAM_RECONNECT_BACKOFF * 2^attempt seconds (capped)
+# between attempts; the first good frame resets the backoff. `max_width`
+# downscales every frame (devices are also asked for that width), and
+# `max_fps` skips frames with grab(), which keeps reading the stream but
+# never converts the skipped frames to images.
+class CaptureSource:
+    def __init__(self, source, name=None, max_width=None, max_fps=None):
+        self.source = _device_index(source)
+        self.name = name if name is not None else redact_url(source)
+        self.max_width = int(max_width) if max_width else None
+        self.min_period = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        self.is_stream = is_stream_url(self.source)
+        self.is_file = _is_file(self.source)
+        self.state = "connecting"
+        self.connects = 0
+        self.reconnects = 0
+        self.frames = 0
+        self.frames_skipped = 0
+        self.read_failures = 0
+        self.last_error = None
+        self.last_frame_at = None
+        self.connected_since = None
+        self.resolution = None
+        self.fps = 0.0
+        self._fps_from = None
+        self._cap = None
+        self._attempt = 0
+        self._retry_at = 0.0
+        self._failures_in_row = 0
+        self._file_period = None
+        self._next_due = 0.0
+        self._last_retrieved = 0.0
+        self._closed = threading.Event()
+
+    # Returns the next frame, or None when there is none this time (the
+    # frame was skipped by max_fps, the read failed, or the source is
+    # waiting to reconnect). Blocks for at most the stream's read timeout
+    # or the remaining backoff delay.
+    def read(self):
+        if self._cap is None and not self._reopen():
+            return None
+        if self._file_period:
+            self._next_due += self._file_period
+            delay = self._next_due - time.monotonic()
+            if delay > 0:
+                self._closed.wait(delay)
+        if not self._cap.grab():
+            if self.is_file and self.frames:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                self._next_due = time.monotonic()
+                return None
+            return self._failed("read failed")
+        now = time.monotonic()
+        if self.min_period and now - self._last_retrieved < self.min_period:
+            self.frames_skipped += 1
+            return None
+        ret, frame = self._cap.retrieve()
+        if not ret or frame is None:
+            return self._failed("empty frame")
+        self._last_retrieved = now
+        self._failures_in_row = 0
+        self._attempt = 0
+        if self.state != "live":
+            self.state = "live"
+            self.connected_since = time.time()
+        if self._fps_from is not None:
+            # Smoothed delivery rate over roughly the last ten frames.
+            interval = max(now - self._fps_from, 1e-6)
+            self.fps = 0.9 * self.fps + 0.1 / interval if self.fps else 1.0 / interval
+        self._fps_from = self.last_frame_at = now
+        self.frames += 1
+        h, w = frame.shape[:2]
+        self.resolution = (w, h)
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, max(1, h * self.max_width // w)),
+                               interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _failed(self, reason):
+        self.read_failures += 1
+        self._failures_in_row += 1
+        self.last_error = reason
+        if self._failures_in_row >= CFG.STREAM_MAX_READ_FAILURES:
+            print(f"[CaptureSource] {self.name}: {reason} {self._failures_in_row} times in a row, reconnecting.")
+            self._release()
+            self._schedule_retry()
+        return None
+
+    def _schedule_retry(self):
+        delay = min(CFG.STREAM_MAX_RECONNECT_BACKOFF, CFG.STREAM_RECONNECT_BACKOFF * 2 ** self._attempt)
+        self._attempt += 1
+        self._retry_at = time.monotonic() + delay
+        self.state = "reconnecting" if self.connects else "connecting"
+
+    def _reopen(self):
+        delay = self._retry_at - time.monotonic()
+        if delay > 0 and self._closed.wait(delay):
+            return False
+        if self._closed.is_set():
+            return False
+        cap = self._open()
+        if cap is None or not cap.isOpened():
+            if cap is not None:
+                cap.release()
+            self.last_error = "could not open"
+            self._schedule_retry()
+            print(f"[CaptureSource] Could not open {self.name}; next attempt in "
+                  f"{self._retry_at - time.monotonic():.0f} s.")
+            return False
+        self._cap = cap
+        self._failures_in_row = 0
+        if self.connects:
+            self.reconnects += 1
+        self.connects += 1
+        if self.is_file:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            self._file_period = 1.0 / fps if fps and fps > 0 else None
+            self._next_due = time.monotonic()
+        return True
+
+    def _open(self):
+        if not self.is_stream:
+            cap = cv2.VideoCapture(self.source)
+            if not self.is_file:
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                if self.max_width:
+                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.max_width)
+                if self.min_period:
+                    cap.set(cv2.CAP_PROP_FPS, 1.0 / self.min_period)
+            return cap
+        params = []
+        if hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+            params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, CFG.STREAM_OPEN_TIMEOUT_MS,
+                      cv2.CAP_PROP_READ_TIMEOUT_MSEC, CFG.STREAM_READ_TIMEOUT_MS]
+        # FFmpeg reads its options from the environment when the stream opens.
+        with _ffmpeg_env_lock:
+            previous = os.environ.get("OPENCV_FFMPEG_CAPTURE_OPTIONS")
+            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = CFG.STREAM_FFMPEG_OPTIONS
+            try:
+                cap = cv2.VideoCapture(self.source, cv2.CAP_FFMPEG, params)
+            finally:
+                if previous is None:
+                    del os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"]
+                else:
+                    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = previous
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self.connected_since = None
+        self.fps = 0.0
+        self._fps_from = None
+
+    # Interrupts a pending backoff wait; the source cannot be reopened after this.
+    def close(self):
+        self._closed.set()
+        self.state = "closed"
+
+    def release(self):
+        self.close()
+        self._release()
+
+    def health(self):
+        age = time.monotonic() - self.last_frame_at if self.last_frame_at is not None else None
+        return {
+            "state": self.state,
+            "connected": self.state == "live",
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "frames": self.frames,
+            "frames_skipped": self.frames_skipped,
+            "read_failures": self.read_failures,
+            "fps": self.fps,
+            "last_frame_age": age,
+            "resolution": self.resolution,
+            "last_error": self.last_error,
+        }
+
+
+# Prints a source's health once a second, e.g. against stream_stub.py:
+#
+#   python capture_source.py http://127.0.0.1:8554/stream.mjpg --max-fps 5
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read a camera source and print its health.")
+    parser.add_argument("source")
+    parser.add_argument("--max-width", type=int)
+    parser.add_argument("--max-fps", type=float)
+    parser.add_argument("--duration", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    capture = CaptureSource(args.source, max_width=args.max_width, max_fps=args.max_fps)
+    deadline = time.monotonic() + args.duration
+    next_report = time.monotonic() + 1.0
+    try:
+        while time.monotonic() < deadline:
+            capture.read()
+            if time.monotonic() >= next_report:
+                next_report += 1.0
+                h = capture.health()
+                print(f"{h['state']:<12} {h['fps']:6.1f} fps  {h['frames']:>7} frames  "
+                      f"{h['frames_skipped']:>7} skipped  {h['reconnects']} reconnects  {h['resolution']}")
+    finally:
+        capture.release()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
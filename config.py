@@ -1,6 +1,194 @@
+import os
 import numpy as np
 
 class CFG:
     WEIGHTS = 'runs/detect/train/weights/best.pt'
     CONFIDENCE = 0.40
-    CONFIDENCE_INT = int(round(CONFIDENCE * 100, 0))
\ No newline at end of file
+    CONFIDENCE_INT = int(round(CONFIDENCE * 100, 0))
+
+    # Shared inference server: frames from all cameras and the player are
+    # grouped into batches of up to INFERENCE_MAX_BATCH, waiting at most
+    # INFERENCE_MAX_WAIT_MS for the batch to fill. The tiles of one frame are
+    # a single request and always share a batch, even a larger one.
+    INFERENCE_MAX_BATCH = 8
+    INFERENCE_MAX_WAIT_MS = 15
+
+    # Frames kept between the capture and inference stages of a camera.
+    # Older frames are overwritten so inference always sees the newest one.
+    CAPTURE_BUFFER_SIZE = 2
+
+    # Camera sources (capture_source.py). Network streams (RTSP/HTTP URLs)
+    # are opened with FFmpeg's low-latency flags and reconnected with
+    # exponential backoff after STREAM_MAX_READ_FAILURES failed reads in a
+    # row; STREAM_READ_TIMEOUT_MS bounds how long a dead stream can block.
+    STREAM_FFMPEG_OPTIONS = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay|max_delay;500000"
+    STREAM_OPEN_TIMEOUT_MS = 5000
+    STREAM_READ_TIMEOUT_MS = 5000
+    STREAM_MAX_READ_FAILURES = 3
+    STREAM_RECONNECT_BACKOFF = 1.0
+    STREAM_MAX_RECONNECT_BACKOFF = 60.0
+
+    # Alert side effects (snapshot, S3 upload, WhatsApp messages) run on a
+    # background dispatcher. ALERT_QUEUE_POLICY decides what happens when the
+    # queue is full: "drop_new", "drop_oldest" or "block".
+    ALERT_COOLDOWN = 600
+    ALERT_WORKERS = 2
+    ALERT_QUEUE_SIZE = 32
+    ALERT_QUEUE_POLICY = "drop_oldest"
+    ALERT_BLOCK_TIMEOUT = 1.0
+    ALERT_MAX_RETRIES = 3
+    ALERT_RETRY_BACKOFF = 1.0
+
+    # Alerts from all cameras go through one aggregator (alert_aggregator.py).
+    # ALERT_COOLDOWN applies per camera and class and is kept in
+    # ALERT_STATE_PATH, so restarts do not reset it. Alerts arriving within
+    # ALERT_DIGEST_WINDOW seconds of the first one are sent together: one
+    # contact sheet of up to ALERT_DIGEST_MAX_TILES snapshots, one upload and
+    # one message per phone. A window of 0 sends every alert on its own.
+    # The state, snapshot and event paths can be moved with environment
+    # variables, which camera worker processes inherit (e.g. for benchmarks).
+    ALERT_STATE_PATH = os.environ.get("DETECTION_ALERT_STATE", 'alert_state.json')
+    ALERT_DIGEST_WINDOW = 10.0
+    ALERT_DIGEST_MAX_TILES = 9
+    ALERT_DIGEST_TILE_WIDTH = 480
+
+    S3_BUCKET = "diplomamodelstorage"
+    S3_URL_EXPIRATION = 86400
+    # Point these at local stand-ins (see stub_endpoints.py) to test alerts offline.
+    S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+    TWILIO_API_URL = os.environ.get("TWILIO_API_URL")
+
+    # Alert snapshots are JPEG-encoded in memory and uploaded straight from
+    # memory; local copies (SNAPSHOT_TIERS below) are only kept when
+    # SAVE_LOCAL_FRAMES is on.
+    ALERT_JPEG_QUALITY = 90
+    SAVE_LOCAL_FRAMES = True
+    S3_MAX_POOL_CONNECTIONS = 10
+
+    # Local snapshots (snapshot_store.py), encoded by a background worker into
+    # saved_frames/<tier>/<date>/<alert id>.<format>. Each tier has its own
+    # format, quality, maximum width and disk quota; when a tier is over its
+    # quota the oldest files are deleted. "crop" is the detected box plus
+    # `padding` of its size on every side (single alerts only).
+    SNAPSHOT_DIR = os.environ.get("DETECTION_SNAPSHOT_DIR", 'saved_frames')
+    SNAPSHOT_TIERS = {
+        "full": {"format": "jpg", "quality": 90, "max_width": 1920, "quota_mb": 2048},
+        "crop": {"format": "jpg", "quality": 90, "max_width": 640, "padding": 0.25, "quota_mb": 512},
+        "thumb": {"format": "webp", "quality": 70, "max_width": 320, "quota_mb": 128},
+    }
+    SNAPSHOT_QUEUE_SIZE = 64
+
+    # Headless batch mode (batch_process.py): long videos are split into
+    # ranges of this many frames, each handled by a separate worker process.
+    BATCH_CHUNK_FRAMES = 1500
+
+    # Boxes shown in the video player need a higher confidence than alerts.
+    DISPLAY_CONFIDENCE = 0.50
+
+    # Tracking between detection keyframes. Boxes follow objects with sparse
+    # optical flow (computed at TRACK_FLOW_SCALE) and keep their ids across
+    # frames. The keyframe interval adapts to motion: objects may drift at most
+    # TRACK_MAX_DRIFT_PX between keyframes.
+    TRACKING_ENABLED = True
+    TRACK_IOU_THRESHOLD = 0.3
+    TRACK_MAX_MISSES = 2
+    TRACK_FLOW_SCALE = 0.5
+    TRACK_MAX_DRIFT_PX = 60
+    KEYFRAME_MIN_INTERVAL = 5
+    KEYFRAME_MAX_INTERVAL = 45
+    # Do not alert again on a track that already triggered an alert.
+    ALERT_ONCE_PER_TRACK = True
+
+    # Motion gate in front of camera inference. Per-camera sensitivity is read
+    # from "motion_sensitivity" in config.json (0 = least, 1 = most sensitive).
+    MOTION_GATE_ENABLED = True
+    MOTION_SENSITIVITY = 0.5
+    MOTION_MIN_INFERENCE_INTERVAL = 30.0
+    MOTION_GATE_WIDTH = 160
+
+    # Tiled inference for small, distant targets. Enabled per camera with
+    # "tile_size" (pixels) and optionally "tile_overlap" (fraction) in
+    # config.json. TILE_INCLUDE_FULL_FRAME also runs the whole frame in the
+    # same batch, so large objects that span tiles are still found.
+    TILE_OVERLAP = 0.2
+    TILE_INCLUDE_FULL_FRAME = True
+    TILE_NMS_IOU = 0.5
+    TILE_NMS_IOS = 0.8
+
+    # Inference backend: "pytorch" (best.pt), "onnx" (ONNX Runtime) or "int8"
+    # (dynamically quantized ONNX). Exports are cached in EXPORT_CACHE_DIR,
+    # keyed by a hash of the weights; see backends.py for the parity check.
+    BACKEND = os.environ.get("DETECTION_BACKEND", "pytorch")
+    EXPORT_CACHE_DIR = 'runs/export_cache'
+    IMGSZ = 640
+
+    # Per-stage timing, counters and histograms (metrics.py). Off by default;
+    # when enabled they are served in Prometheus text format on
+    # http://METRICS_HOST:METRICS_PORT/metrics, and METRICS_OVERLAY draws a
+    # summary on the video.
+    METRICS_ENABLED = os.environ.get("DETECTION_METRICS", "0") == "1"
+    METRICS_HOST = "127.0.0.1"
+    METRICS_PORT = int(os.environ.get("DETECTION_METRICS_PORT", "9464"))
+    METRICS_OVERLAY = os.environ.get("DETECTION_METRICS_OVERLAY", "0") == "1"
+
+    # Playback speeds offered for video files. Files are paced by their own
+    # timestamps; the detection interval scales with the speed.
+    PLAYBACK_SPEEDS = (0.5, 1.0, 2.0, 4.0, 8.0)
+
+    # Camera grid view. Cameras send GRID_THUMBNAIL_WIDTH-wide thumbnails at
+    # the rate chosen in the grid toolbar; the focused camera sends full
+    # resolution at GRID_FOCUS_FPS. The GUI spends at most
+    # GRID_RENDER_BUDGET_MS painting tiles every GRID_RENDER_INTERVAL_MS.
+    GRID_FPS = 2.0
+    GRID_FPS_CHOICES = (0.5, 1.0, 2.0, 5.0, 10.0)
+    GRID_FOCUS_FPS = 15.0
+    GRID_THUMBNAIL_WIDTH = 320
+    GRID_RENDER_INTERVAL_MS = 40
+    GRID_RENDER_BUDGET_MS = 12
+
+    # "thread" runs every camera pipeline as a CameraThread in the GUI
+    # process; "process" runs them in worker processes (camera_process.py),
+    # CAMERAS_PER_PROCESS to a process, sending previews (with their boxes drawn)
+    # back through shared-memory rings. Crashed or hung workers (no heartbeat for
+    # WORKER_HANG_TIMEOUT seconds) are restarted with exponential backoff.
+    CAMERA_MODE = os.environ.get("CAMERA_MODE", "thread")
+    CAMERAS_PER_PROCESS = 1
+    SHM_RING_SLOTS = 3
+    SHM_MAX_FRAME_HEIGHT = 1080
+    SHM_MAX_FRAME_WIDTH = 1920
+    SHM_POLL_INTERVAL_MS = 20
+    WORKER_HEARTBEAT_INTERVAL = 0.5
+    WORKER_HANG_TIMEOUT = 30.0
+    WORKER_RESTART_BACKOFF = 1.0
+    WORKER_MAX_RESTART_BACKOFF = 30.0
+
+    # Detection/alert event store (event_store.py): SQLite in WAL mode,
+    # written in batches by a background thread.
+    EVENT_STORE_ENABLED = True
+    EVENT_DB_PATH = os.environ.get("DETECTION_EVENT_DB", 'events.db')
+    EVENT_BATCH_SIZE = 500
+    EVENT_FLUSH_INTERVAL = 1.0
+    EVENT_QUEUE_SIZE = 10000
+
+    # Seeking in video files. The slider shows PREVIEW_WIDTH-wide previews
+    # (at most PREVIEW_MAX_FRAMES per file, sampled in the background) while
+    # dragging and seeks exactly once it has been still for SEEK_DEBOUNCE_MS.
+    SEEK_DEBOUNCE_MS = 150
+    SEEK_MAX_GRAB_FORWARD = 90
+    PREVIEW_WIDTH = 240
+    PREVIEW_MAX_FRAMES = 600
+    PREVIEW_PROBE_TIMEOUT = 120
+
+    # Per-frame detections of video files, cached in a "<video>.detcache"
+    # sidecar (or under DETECTION_CACHE_DIR when the video's folder is not
+    # writable). Sidecars of all videos together are kept under
+    # DETECTION_CACHE_MAX_MB by evicting the least recently played.
+    DETECTION_CACHE_ENABLED = True
+    DETECTION_CACHE_DIR = 'runs/detection_cache'
+    DETECTION_CACHE_MAX_MB = 512
+    DETECTION_CACHE_FLUSH_FRAMES = 64
+
+    # config.json is saved CONFIG_SAVE_DEBOUNCE seconds after the last change,
+    # and checked for edits made outside the app every CONFIG_WATCH_INTERVAL_MS.
+    CONFIG_SAVE_DEBOUNCE = 0.5
+    CONFIG_WATCH_INTERVAL_MS = 1000
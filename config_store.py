@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+
+from config import CFG
+
+DEFAULT_CONFIG = {
+    "cameras": [],
+    "phones": []
+}
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+# config.json, written off the GUI thread. `save` only serializes the config
+# (so later edits of the dict do not leak into the write) and schedules it;
+# a writer thread waits until no save came in for `debounce` seconds and then
+# replaces the file atomically (temporary file, fsync, os.replace), so a
+# burst of menu clicks is one write and a crash never leaves half a file.
+# `poll` reports edits made to the file by anything else; the GUI calls it
+# from a timer.
+class ConfigStore:
+    def __init__(self, path="config.json", debounce=CFG.CONFIG_SAVE_DEBOUNCE):
+        self.path = path
+        self.debounce = debounce
+        self.writes = 0
+        self._pending = None
+        self._stamp = None
+        self._writing = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._write_loop, name="ConfigWriter", daemon=True)
+        self._writer.start()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            self._write(json.dumps(DEFAULT_CONFIG, ensure_ascii=False, indent=2))
+        with open(self.path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        with self._cond:
+            self._stamp = _stamp(self.path)
+        return config
+
+    def save(self, config):
+        text = json.dumps(config, ensure_ascii=False, indent=2)
+        with self._cond:
+            self._pending = text
+            self._cond.notify()
+
+    # Returns the new config if the file was changed by someone else since it
+    # was last loaded or written here, otherwise None. Unparseable edits (a
+    # half-saved file in an editor, a typo) are reported and skipped.
+    def poll(self):
+        stamp = _stamp(self.path)
+        with self._cond:
+            if self._pending is not None or self._writing or stamp is None or stamp == self._stamp:
+                return None
+            self._stamp = stamp
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[ConfigStore] Ignoring edit of {self.path}: {e}")
+            return None
+        if not isinstance(config, dict):
+            print(f"[ConfigStore] Ignoring edit of {self.path}: not a JSON object")
+            return None
+        print(f"[ConfigStore] {self.path} changed on disk, applying it.")
+        return config
+
+    # Writes anything still pending and stops the writer.
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                # Debounce: wait until saves stop coming in.
+                while self._pending is not None and not self._closed:
+                    text = self._pending
+                    self._cond.wait(self.debounce)
+                    if self._pending is text:
+                        break
+                text, self._pending = self._pending, None
+                closed = self._closed
+            if text is not None:
+                self._write(text)
+            if closed:
+                return
+
+    def _write(self, text):
+        with self._cond:
+            self._writing = True
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            written = True
+        except OSError as e:
+            print(f"[ConfigStore] Could not save {self.path}: {e}")
+            written = False
+        with self._cond:
+            # Our own write must not come back from poll() as an outside edit.
+            if written:
+                self._stamp = _stamp(self.path)
+                self.writes += 1
+            self._writing = False
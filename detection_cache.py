@@ -0,0 +1,196 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from backends import weights_hash
+from config import CFG
+from detections import Detections
+
+_SIDECAR_SUFFIX = ".detcache"
+_SAMPLE_SIZE = 1 << 20
+
+_SIDECAR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS frames (frame INTEGER PRIMARY KEY, data BLOB NOT NULL);
+"""
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS caches (path TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL);
+"""
+
+
+# Hash of the file size and three 1 MiB samples (start, middle, end), so
+# multi-gigabyte videos are identified without reading them in full.
+def video_hash(path):
+    digest = hashlib.sha256()
+    size = os.path.getsize(path)
+    digest.update(str(size).encode())
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - _SAMPLE_SIZE // 2), max(0, size - _SAMPLE_SIZE)}):
+            f.seek(offset)
+            digest.update(f.read(_SAMPLE_SIZE))
+    return digest.hexdigest()[:16]
+
+
+def cache_key(video_path, weights=CFG.WEIGHTS, backend=CFG.BACKEND, conf=CFG.DISPLAY_CONFIDENCE, imgsz=CFG.IMGSZ):
+    return f"{video_hash(video_path)}:{weights_hash(weights)}:{backend}:{conf:.3f}:{imgsz}"
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+# Raw model output (all classes, before tracking) per frame of one video,
+# kept in a SQLite sidecar next to it. The sidecar records the key it was
+# built for (video content, weights, backend, confidence, image size); a
+# sidecar with any other key is emptied on open. Frames are added as the
+# player detects them and committed every DETECTION_CACHE_FLUSH_FRAMES, so
+# repeated plays and seeks fill in the gaps instead of starting over. Used
+# from the VideoWorker thread only.
+class DetectionCache:
+    def __init__(self, video_path, key, cache_dir=CFG.DETECTION_CACHE_DIR,
+                 max_bytes=CFG.DETECTION_CACHE_MAX_MB * 1024 * 1024, flush_frames=CFG.DETECTION_CACHE_FLUSH_FRAMES):
+        self.video_path = video_path
+        self.key = key
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.flush_frames = flush_frames
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path, self._conn = self._open_sidecar()
+        self._frames = {row[0] for row in self._conn.execute("SELECT frame FROM frames")}
+        _touch(cache_dir, self.path)
+        evict(cache_dir, max_bytes, keep=self.path)
+
+    @classmethod
+    def open(cls, video_path, weights=CFG.WEIGHTS, backend=CFG.BACKEND, **kwargs):
+        return cls(video_path, cache_key(video_path, weights, backend), **kwargs)
+
+    def _open_sidecar(self):
+        fallback = os.path.join(
+            self.cache_dir, f"{os.path.basename(self.video_path)}.{self.key.split(':')[0]}{_SIDECAR_SUFFIX}"
+        )
+        for path in (self.video_path + _SIDECAR_SUFFIX, fallback):
+            conn = None
+            try:
+                conn = _connect(path)
+                conn.executescript(_SIDECAR_SCHEMA)
+                row = conn.execute("SELECT value FROM meta WHERE key = 'cache_key'").fetchone()
+                if row is None or row[0] != self.key:
+                    with conn:
+                        conn.execute("DELETE FROM frames")
+                        conn.execute("INSERT OR REPLACE INTO meta VALUES ('cache_key', ?)", (self.key,))
+            except sqlite3.Error:
+                if conn is not None:
+                    conn.close()
+                continue
+            return path, conn
+        raise OSError(f"No writable location for the detection cache of {self.video_path}")
+
+    def __contains__(self, frame_num):
+        return frame_num in self._frames
+
+    # Cached detections of `frame_num`, or None if it has not been detected yet.
+    def get(self, frame_num):
+        if frame_num not in self._frames:
+            return None
+        self.hits += 1
+        data = self._pending.get(frame_num)
+        if data is None:
+            data = self._conn.execute("SELECT data FROM frames WHERE frame = ?", (frame_num,)).fetchone()[0]
+        rows = np.frombuffer(data, np.float32).reshape(-1, 6)
+        return Detections(rows[:, :4].copy(), rows[:, 4].copy(), rows[:, 5].astype(int))
+
+    def put(self, frame_num, detections):
+        rows = np.empty((len(detections), 6), np.float32)
+        rows[:, :4] = detections.xyxy
+        rows[:, 4] = detections.conf
+        rows[:, 5] = detections.cls
+        self._pending[frame_num] = rows.tobytes()
+        self.misses += 1
+        self._frames.add(frame_num)
+        if len(self._pending) >= self.flush_frames:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        try:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO frames VALUES (?, ?)", self._pending.items())
+        except sqlite3.Error as e:
+            print(f"[DetectionCache] Failed to write {self.path}: {e}")
+            self._frames.difference_update(self._pending)
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        # Folds the WAL back into the sidecar so its size on disk is final.
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.close()
+        _touch(self.cache_dir, self.path)
+        evict(self.cache_dir, self.max_bytes, keep=self.path)
+
+
+_index_lock = threading.Lock()
+
+
+def _index(cache_dir):
+    conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), timeout=5.0)
+    conn.executescript(_INDEX_SCHEMA)
+    return conn
+
+
+def _sidecar_size(path):
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def _touch(cache_dir, path):
+    with _index_lock:
+        conn = _index(cache_dir)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO caches VALUES (?, ?, ?)",
+                         (os.path.abspath(path), _sidecar_size(path), time.time()))
+        conn.close()
+
+
+# Deletes the least recently used sidecars until all of them together fit in
+# `max_bytes`. Sizes come from the index, updated whenever a cache is opened
+# or closed, so no directories are scanned.
+def evict(cache_dir=CFG.DETECTION_CACHE_DIR, max_bytes=CFG.DETECTION_CACHE_MAX_MB * 1024 * 1024, keep=None):
+    keep = os.path.abspath(keep) if keep else None
+    with _index_lock:
+        conn = _index(cache_dir)
+        rows = conn.execute("SELECT path, size FROM caches ORDER BY last_used ASC").fetchall()
+        total = sum(size for _, size in rows)
+        removed = []
+        for path, size in rows:
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            for p in (path, path + "-wal", path + "-shm"):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"[DetectionCache] Could not evict {p}: {e}")
+            removed.append(path)
+            total -= size
+        with conn:
+            conn.executemany("DELETE FROM caches WHERE path = ?", [(p,) for p in removed])
+        conn.close()
+    return removed
@@ -0,0 +1,117 @@
+import cv2
+import numpy as np
+
+
+# Detections of one frame as plain arrays: boxes (N, 4) in xyxy pixels,
+# confidences (N,), class ids (N,) and, once tracked, track ids (N,).
+# Filtering is done with boolean masks, so callers never touch per-box tensors.
+class Detections:
+    def __init__(self, xyxy, conf, cls, ids=None):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+        self.ids = ids
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int))
+
+    @classmethod
+    def from_result(cls, result):
+        # boxes.data is (N, 6) [x1, y1, x2, y2, conf, cls], or (N, 7) with a
+        # track id before conf, so conf and cls are always the last two columns.
+        data = result.boxes.data.cpu().numpy()
+        return cls(data[:, :4], data[:, -2], data[:, -1].astype(int))
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, index):
+        ids = self.ids[index] if self.ids is not None else None
+        return Detections(self.xyxy[index], self.conf[index], self.cls[index], ids)
+
+    def class_mask(self, class_ids):
+        return np.isin(self.cls, class_ids)
+
+    def select(self, class_ids=None, min_conf=None):
+        mask = np.ones(len(self), bool)
+        if class_ids is not None:
+            mask &= self.class_mask(class_ids)
+        if min_conf is not None:
+            mask &= self.conf >= min_conf
+        return self if mask.all() else self[mask]
+
+
+def _intersection(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter, area_a[:, None], area_b[None, :]
+
+
+def box_iou(a, b):
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), np.float32)
+    inter, area_a, area_b = _intersection(a, b)
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def box_ios(a, b):
+    # Intersection over the smaller box: a box cut off at a tile border lies
+    # almost entirely inside the full box, even though their IoU is low.
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), np.float32)
+    inter, area_a, area_b = _intersection(a, b)
+    return inter / np.maximum(np.minimum(area_a, area_b), 1e-6)
+
+
+def concat_detections(parts):
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return Detections.empty()
+    return Detections(
+        np.concatenate([p.xyxy for p in parts]).astype(np.float32),
+        np.concatenate([p.conf for p in parts]),
+        np.concatenate([p.cls for p in parts])
+    )
+
+
+def nms(detections, iou_threshold=0.5, ios_threshold=None):
+    if len(detections) < 2:
+        return detections
+    order = np.argsort(-detections.conf)
+    boxes = detections.xyxy[order]
+    cls = detections.cls[order]
+    overlap = box_iou(boxes, boxes) > iou_threshold
+    if ios_threshold is not None:
+        overlap |= box_ios(boxes, boxes) > ios_threshold
+    overlap &= cls[:, None] == cls[None, :]
+    keep = np.ones(len(boxes), bool)
+    for i in range(len(boxes)):
+        if keep[i]:
+            suppressed = overlap[i].copy()
+            suppressed[:i + 1] = False
+            keep &= ~suppressed
+    return detections[order[keep]]
+
+
+def class_ids_for(names, labels):
+    wanted = set(labels)
+    return np.array(sorted(i for i, name in names.items() if name in wanted), dtype=int)
+
+
+def draw_detections(frame, detections, names, color, thickness=2, text_offset=10):
+    ids = detections.ids if detections.ids is not None else [None] * len(detections)
+    for (x1, y1, x2, y2), conf, cls_id, track_id in zip(
+            detections.xyxy.astype(int), detections.conf, detections.cls, ids):
+        label = names[cls_id] if track_id is None else f"{names[cls_id]} #{track_id}"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness=thickness)
+        cv2.putText(
+            frame, f"{label} {conf:.2f}",
+            (x1, y1 - text_offset),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, thickness=1
+        )
@@ -0,0 +1,299 @@
+import argparse
+import datetime
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from config import CFG
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    camera TEXT NOT NULL,
+    label TEXT NOT NULL,
+    conf REAL NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    track_id INTEGER,
+    run_id TEXT,
+    alert_state TEXT NOT NULL,
+    alert_id TEXT,
+    file_path TEXT,
+    s3_key TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events(ts);
+CREATE INDEX IF NOT EXISTS events_camera_ts ON events(camera, ts);
+CREATE INDEX IF NOT EXISTS events_label_ts ON events(label, ts);
+CREATE INDEX IF NOT EXISTS events_camera_label_ts ON events(camera, label, ts);
+CREATE INDEX IF NOT EXISTS events_alert_id ON events(alert_id) WHERE alert_id IS NOT NULL;
+"""
+
+_INSERT = """
+INSERT INTO events (ts, camera, label, conf, x1, y1, x2, y2, track_id, run_id, alert_state, alert_id, file_path, s3_key)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPDATE_ALERT = "UPDATE events SET alert_state = ?, file_path = ?, s3_key = ? WHERE alert_id = ?"
+
+COLUMNS = ("id", "ts", "camera", "label", "conf", "x1", "y1", "x2", "y2",
+           "track_id", "run_id", "alert_state", "alert_id", "file_path", "s3_key")
+
+# alert_state values: "none" (seen, no alert: cooldown or already alerted
+# track), "queued", "sent", "failed", "dropped" (alert queue was full).
+# Track ids restart at 1 with every tracker, so run_id names the tracker
+# (one per camera pipeline run) that assigned the event's track_id.
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return value.timestamp()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# Detection and alert events in SQLite (WAL mode). Cameras call `record` and
+# `update_alert` from their hot paths; both only enqueue, and one writer
+# thread commits whatever is queued every `flush_interval` seconds (or every
+# `batch_size` rows) in a single transaction. If the writer falls behind and
+# the queue fills up, new rows are dropped and counted rather than blocking
+# a camera. Reads go through their own per-thread connections, which WAL lets
+# run concurrently with the writer, and every query filter is covered by an
+# index on (camera, label, ts).
+class EventStore:
+    def __init__(self, path=CFG.EVENT_DB_PATH, batch_size=CFG.EVENT_BATCH_SIZE,
+                 flush_interval=CFG.EVENT_FLUSH_INTERVAL, queue_size=CFG.EVENT_QUEUE_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = _connect(path)
+        conn.executescript(_SCHEMA)
+        # Databases created before run_id existed get the column; their
+        # events keep a NULL run_id.
+        if "run_id" not in {row[1] for row in conn.execute("PRAGMA table_info(events)")}:
+            conn.execute("ALTER TABLE events ADD COLUMN run_id TEXT")
+        conn.close()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self._stop_event = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="EventStoreWriter", daemon=True)
+        self._writer.start()
+
+    def record(self, camera, label, conf, xyxy, track_id=None, alert_state="none", alert_id=None,
+               detected_at=None, file_path=None, s3_key=None, run_id=None):
+        x1, y1, x2, y2 = (float(v) for v in xyxy)
+        ts = _timestamp(detected_at) if detected_at is not None else time.time()
+        row = (ts, str(camera), label, float(conf), x1, y1, x2, y2,
+               None if track_id is None else int(track_id), run_id, alert_state, alert_id, file_path, s3_key)
+        self._put((_INSERT, row))
+
+    def update_alert(self, alert_id, state, file_path=None, s3_key=None):
+        self._put((_UPDATE_ALERT, (state, file_path, s3_key, alert_id)))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    # Blocks until everything queued so far is committed.
+    def flush(self):
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait()
+
+    def close(self):
+        self._stop_event.set()
+        self._writer.join()
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    if self._stop_event.is_set():
+                        break
+                    continue
+                batch = [first]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                self._commit(conn, batch)
+        finally:
+            # Whatever is still queued at shutdown is written before closing.
+            remaining = []
+            while True:
+                try:
+                    remaining.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(conn, remaining)
+            conn.close()
+
+    def _commit(self, conn, batch):
+        waiters = [item[1] for item in batch if item[0] == "flush"]
+        statements = [item for item in batch if item[0] != "flush"]
+        if statements:
+            try:
+                with conn:
+                    # Consecutive rows with the same statement go through one executemany.
+                    start = 0
+                    for i in range(1, len(statements) + 1):
+                        if i == len(statements) or statements[i][0] != statements[start][0]:
+                            conn.executemany(statements[start][0], [s[1] for s in statements[start:i]])
+                            start = i
+                self.written += len(statements)
+                self.batches += 1
+            except sqlite3.Error as e:
+                self.dropped += len(statements)
+                print(f"[EventStore] Failed to write {len(statements)} events: {e}")
+        for waiter in waiters:
+            waiter.set()
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _where(start, end, camera, label):
+        clauses, params = [], []
+        if camera is not None:
+            clauses.append("camera = ?")
+            params.append(str(camera))
+        if label is not None:
+            clauses.append("label = ?")
+            params.append(label)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(_timestamp(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(_timestamp(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, start=None, end=None, camera=None, label=None, limit=1000, offset=0, newest_first=True):
+        where, params = self._where(start, end, camera, label)
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT {', '.join(COLUMNS)} FROM events{where} ORDER BY ts {order} LIMIT ? OFFSET ?"
+        rows = self._reader().execute(sql, params + [int(limit), int(offset)]).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    # With distinct_tracks, a vehicle followed by the tracker counts once
+    # however many events it produced; untracked events count one each. The
+    # same track id from two runs of a camera is two vehicles.
+    def count(self, start=None, end=None, camera=None, label=None, distinct_tracks=False):
+        where, params = self._where(start, end, camera, label)
+        if distinct_tracks:
+            sql = (f"SELECT COUNT(DISTINCT camera || ':' || COALESCE(run_id, '') || ':' || track_id) + "
+                   f"SUM(track_id IS NULL) FROM events{where}")
+        else:
+            sql = f"SELECT COUNT(*) FROM events{where}"
+        return int(self._reader().execute(sql, params).fetchone()[0] or 0)
+
+    def counts_by_label(self, start=None, end=None, camera=None):
+        where, params = self._where(start, end, camera, None)
+        sql = f"SELECT label, COUNT(*) FROM events{where} GROUP BY label ORDER BY COUNT(*) DESC"
+        return dict(self._reader().execute(sql, params).fetchall())
+
+    def get_stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
+
+
+# Imports JPEGs saved by older versions as "{label}_{%Y-%m-%d-%H-%M-%S}.jpg".
+# The camera is not part of those names, so it is recorded as "unknown".
+def import_saved_frames(store, directory="saved_frames"):
+    imported = 0
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        label, _, stamp = stem.rpartition("_")
+        if ext.lower() != ".jpg" or not label:
+            continue
+        try:
+            detected_at = datetime.datetime.strptime(stamp, "%Y-%m-%d-%H-%M-%S")
+        except ValueError:
+            continue
+        store.record("unknown", label, 0.0, (0, 0, 0, 0), alert_state="sent", detected_at=detected_at,
+                     file_path=os.path.join(directory, name))
+        imported += 1
+    store.flush()
+    return imported
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_event_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore()
+        return _store
+
+
+def shutdown_event_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the detection event store.")
+    parser.add_argument("--db", default=CFG.EVENT_DB_PATH)
+    parser.add_argument("--camera")
+    parser.add_argument("--label")
+    parser.add_argument("--days", type=float, help="Only events from the last N days")
+    parser.add_argument("--count", action="store_true", help="Print counts instead of events")
+    parser.add_argument("--tracks", action="store_true", help="Count each tracked object once")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--import-saved-frames", metavar="DIR", help="Index JPEGs saved by older versions")
+    args = parser.parse_args(argv)
+
+    store = EventStore(args.db)
+    if args.import_saved_frames:
+        print(f"Imported {import_saved_frames(store, args.import_saved_frames)} saved frames.")
+    start = time.time() - args.days * 86400 if args.days else None
+    if args.count:
+        if args.label:
+            print(store.count(start, None, args.camera, args.label, args.tracks))
+        else:
+            for label, n in store.counts_by_label(start, None, args.camera).items():
+                print(f"{label:<20}{n:>10}")
+    else:
+        for event in store.query(start, None, args.camera, args.label, args.limit):
+            stamp = datetime.datetime.fromtimestamp(event["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{stamp}  camera {event['camera']:<6} {event['label']:<16} {event['conf']:.2f}  "
+                  f"{event['alert_state']:<8} {event['s3_key'] or event['file_path'] or ''}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
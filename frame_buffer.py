@@ -0,0 +1,42 @@
+import threading
+import time
+from collections import deque
+
+
+# The capture side never blocks: when the buffer is full the oldest frame is
+# overwritten. The consumer always takes the newest frame and discards the rest.
+# Every frame that never reached the consumer is counted in `dropped`.
+class FrameRingBuffer:
+    def __init__(self, capacity=2):
+        self._frames = deque(maxlen=max(1, int(capacity)))
+        self._cond = threading.Condition()
+        self._next_index = 0
+        self.captured = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, frame, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append((self._next_index, timestamp, frame))
+            self._next_index += 1
+            self.captured += 1
+            self._cond.notify_all()
+
+    def get_latest(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self._frames or self.closed, timeout)
+            if not self._frames:
+                return None
+            item = self._frames.pop()
+            self.dropped += len(self._frames)
+            self._frames.clear()
+            return item
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
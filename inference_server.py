@@ -0,0 +1,174 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from backends import load_model
+from config import CFG
+from detections import Detections
+import metrics
+
+
+class InferenceServer:
+    def __init__(self, weights=CFG.WEIGHTS, backend=CFG.BACKEND, max_batch_size=CFG.INFERENCE_MAX_BATCH,
+                 max_wait_ms=CFG.INFERENCE_MAX_WAIT_MS):
+        self.weights = weights
+        self.backend = backend
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.model = None
+        self.load_error = None
+        self.ready = threading.Event()
+        self.stop_flag = False
+        self.batches_run = 0
+        self.frames_run = 0
+        self._requests = queue.Queue()
+        # A group that did not fit into the last batch opens the next one.
+        self._carry = None
+        self._thread = threading.Thread(target=self._run, name=f"InferenceServer-{backend}", daemon=True)
+        self._thread.start()
+
+    @property
+    def names(self):
+        self.wait_ready()
+        return self.model.names
+
+    def wait_ready(self, timeout=None):
+        self.ready.wait(timeout)
+        if self.load_error is not None:
+            raise RuntimeError(f"Could not load model {self.weights}") from self.load_error
+
+    # `conf` and `classes` are pushed down into the predictor. A batch runs
+    # with the lowest threshold and the union of the classes requested in it,
+    # and each caller then gets only the boxes matching its own request.
+    # The model's preprocessing time for the caller's frames is recorded in
+    # the "preprocess" stage of the metrics `source`, when one is given.
+    def submit(self, frame, conf=CFG.CONFIDENCE, classes=None, source=None):
+        return self._submit([frame], conf, classes, False, source)
+
+    # The frames are one request: they always run in the same batch, which
+    # may exceed max_batch_size when the group alone is larger than that.
+    # The future's result is a list with the detections of every frame.
+    def submit_many(self, frames, conf=CFG.CONFIDENCE, classes=None, source=None):
+        return self._submit(list(frames), conf, classes, True, source)
+
+    def predict(self, frame, conf=CFG.CONFIDENCE, classes=None, timeout=None, source=None):
+        return self.submit(frame, conf, classes, source).result(timeout)
+
+    def predict_many(self, frames, conf=CFG.CONFIDENCE, classes=None, timeout=None, source=None):
+        return self.submit_many(frames, conf, classes, source).result(timeout)
+
+    def _submit(self, frames, conf, classes, many, source):
+        future = Future()
+        if self.stop_flag:
+            future.set_exception(RuntimeError("Inference server is stopped"))
+            return future
+        if classes is not None:
+            classes = np.asarray(classes, dtype=int)
+            if classes.size == 0:
+                empty = Detections.empty()
+                future.set_result([empty] * len(frames) if many else empty)
+                return future
+        if many and not frames:
+            future.set_result([])
+            return future
+        self._requests.put((frames, conf, classes, future, many, source))
+        return future
+
+    def average_batch_size(self):
+        return self.frames_run / self.batches_run if self.batches_run else 0.0
+
+    def stop(self):
+        self.stop_flag = True
+        self._requests.put(None)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            self.model = load_model(self.weights, self.backend)
+        except Exception as e:
+            self.load_error = e
+            print(f"[InferenceServer] Could not load weights {self.weights} ({self.backend}): {e}")
+        self.ready.set()
+
+        while not self.stop_flag:
+            batch = self._collect_batch()
+            if batch:
+                self._run_batch(batch)
+        self._fail_pending(RuntimeError("Inference server is stopped"))
+        print("[InferenceServer] Finished.")
+
+    # Requests are never split: one that would push the batch past
+    # max_batch_size is carried over to start the next batch.
+    def _collect_batch(self):
+        first, self._carry = self._carry, None
+        if first is None:
+            first = self._requests.get()
+        if first is None:
+            return []
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.stop_flag = True
+                break
+            if size + len(item[0]) > self.max_batch_size:
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run_batch(self, batch):
+        batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        if self.load_error is not None:
+            for item in batch:
+                item[3].set_exception(RuntimeError(f"Could not load model {self.weights}"))
+            return
+        frames = [frame for item in batch for frame in item[0]]
+        conf = min(item[1] for item in batch)
+        if any(item[2] is None for item in batch):
+            classes = None
+        else:
+            classes = np.unique(np.concatenate([item[2] for item in batch])).tolist()
+        try:
+            results = self.model(frames, conf=conf, classes=classes, verbose=False)
+        except Exception as e:
+            for item in batch:
+                item[3].set_exception(e)
+            return
+        self.batches_run += 1
+        self.frames_run += len(frames)
+        # Ultralytics reports preprocessing time per image (ms) for the batch.
+        preprocess = results[0].speed.get("preprocess") if results else None
+        start = 0
+        for item_frames, item_conf, item_classes, future, many, source in batch:
+            if source is not None and preprocess is not None:
+                metrics.STAGE_SECONDS.labels(source, "preprocess").observe(preprocess * len(item_frames) / 1000.0)
+            detections = [
+                Detections.from_result(result).select(item_classes, item_conf if item_conf > conf else None)
+                for result in results[start:start + len(item_frames)]
+            ]
+            start += len(item_frames)
+            future.set_result(detections if many else detections[0])
+
+    def _fail_pending(self, error):
+        pending, self._carry = [self._carry], None
+        while True:
+            try:
+                pending.append(self._requests.get_nowait())
+            except queue.Empty:
+                break
+        for item in pending:
+            if item is not None and item[3].set_running_or_notify_cancel():
+                item[3].set_exception(error)
@@ -1,22 +1,33 @@
 import sys
 import os
-import cv2
-import json
+
+from startup_timeline import TIMELINE
+
 import re
+import threading
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QPushButton,
     QFileDialog, QVBoxLayout, QHBoxLayout, QSlider, QFrame, QComboBox,
-    QMessageBox, QDialog, QListWidget, QInputDialog, QToolButton, QMenu, QAction
+    QMessageBox, QDialog, QListWidget, QInputDialog, QToolButton, QMenu, QAction,
+    QTabWidget
 )
 from PyQt5.QtCore import QTimer, Qt, pyqtSlot
 from PyQt5.QtGui import QPixmap, QImage, QPalette, QColor, QIcon
 
-from pygrabber.dshow_graph import FilterGraph
-from ultralytics import YOLO
-
 from config import CFG
 from camera_thread import CameraThread
+from model_registry import get_server, shutdown_servers
+from alert_aggregator import shutdown_alert_aggregator
+from alert_dispatcher import shutdown_alert_dispatcher
+from event_store import shutdown_event_store
+from video_worker import VideoWorker
+from camera_grid import CameraGridWidget
+from camera_process import CameraProcessPool, CameraProcessProxy
+from config_store import ConfigStore
+import metrics
+
+TIMELINE.mark("imports")
 
 
 class VideoPlayerWidget(QWidget):
@@ -27,64 +38,79 @@ class VideoPlayerWidget(QWidget):
         self.label.setStyleSheet("color: #ffffff; font-size: 16px;")
         self.enabled_objects = []
         self.enabled_alerts = []
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.cap = None
-        self.is_paused = False
-        self.total_frames = 0
-        self.current_frame = 0
-        self.model = YOLO(CFG.WEIGHTS)
+        self.worker = None
+        self.speed = 1.0
+        self._pixmap = None
+        self.scrubbing = False
+        self._m_display = metrics.STAGE_SECONDS.labels("player", "display")
         layout = QVBoxLayout()
         layout.addWidget(self.label)
         self.setLayout(layout)
-        self.detection_interval = 15
-        self.last_detection_result = None
 
     def start_camera(self, camera_index=0):
         self.stop_video()
         os.environ["OPENCV_VIDEOIO_DEBUG"] = "1"
         os.environ["OPENCV_VIDEOIO_PRIORITY_MSMF"] = "0"
-        self.cap = cv2.VideoCapture(camera_index)
-        if self.cap.isOpened():
-            self.total_frames = 0
-            self.current_frame = 0
-            self.is_paused = False
-            self.timer.start(100)
-        else:
-            print("Could not open camera")
+        self._start_worker(camera_index, 0.1)
 
     def open_video(self, video_path):
         self.stop_video()
-        try:
-            self.cap = cv2.VideoCapture(video_path)
-            if not self.cap.isOpened():
-                raise IOError(f"Error opening video: {video_path}")
-            self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            self.current_frame = 0
-            self.is_paused = False
-            self.timer.start(30)
-        except Exception as e:
-            print(f"Error opening video: {e}")
+        self._start_worker(video_path, 0.03)
+
+    def _start_worker(self, source, frame_interval):
+        self.worker = VideoWorker(source, frame_interval, self.enabled_objects, self.enabled_alerts, self)
+        self.worker.set_speed(self.speed)
+        self.worker.set_display_size(self.label.width(), self.label.height())
+        self.worker.frame_ready.connect(self.update_frame)
+        worker = self.worker
+        self.worker.playback_finished.connect(lambda: self._on_playback_finished(worker))
+        self.worker.start()
+
+    def _on_playback_finished(self, worker):
+        # Сигнал від уже зупиненого потоку може прийти після запуску нового
+        if worker is self.worker:
+            self.stop_video()
+
+    def is_active(self):
+        return self.worker is not None
+
+    def set_speed(self, speed):
+        self.speed = speed
+        if self.worker:
+            self.worker.set_speed(speed)
 
     def pause_video(self):
-        self.is_paused = not self.is_paused
+        if self.worker:
+            self.worker.pause()
 
     def stop_video(self):
-        self.timer.stop()
-        if self.cap:
-            self.cap.release()
-        self.cap = None
-        self.is_paused = False
-        self.current_frame = 0
-        self.total_frames = 0
+        if self.worker:
+            self.worker.stop()
+            self.worker.wait()
+            self.worker = None
 
     def seek_frame(self, frame_num):
-        if self.cap and self.cap.isOpened() and frame_num < self.total_frames:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-            self.current_frame = frame_num
+        if self.worker and frame_num < self.worker.total_frames:
+            self.worker.seek(frame_num)
+
+    def set_scrubbing(self, scrubbing):
+        self.scrubbing = scrubbing
+
+    # Під час перетягування повзунка — найближчий зменшений кадр з індексу
+    def show_preview(self, frame_num):
+        index = self.worker.index if self.worker else None
+        preview = index.preview(frame_num) if index else None
+        if preview is None:
+            return
+        h, w = preview.shape[:2]
+        qt_image = QImage(preview.data, w, h, preview.strides[0], QImage.Format_BGR888)
+        pixmap = QPixmap.fromImage(qt_image)
+        self.label.setPixmap(pixmap.scaled(self.label.size(), Qt.KeepAspectRatio, Qt.FastTransformation))
 
     def update_detections_config(self, enabled_objects):
         self.enabled_objects = enabled_objects
+        if self.worker:
+            self.worker.update_config(self.enabled_objects, self.enabled_alerts)
         print(f"Updated object list: {self.enabled_objects}")
 
     def get_detections_config(self):
@@ -92,77 +118,52 @@ class VideoPlayerWidget(QWidget):
 
     def update_alerts_config(self, enabled_alerts):
         self.enabled_alerts = enabled_alerts
+        if self.worker:
+            self.worker.update_config(self.enabled_objects, self.enabled_alerts)
         print(f"Updated alerts list: {self.enabled_alerts}")
 
     def get_alerts_config(self):
         return self.enabled_alerts
 
     def update_frame(self):
-        if not self.is_paused and self.cap:
-            ret, frame = self.cap.read()
-            if not ret:
-                self.stop_video()
-                return
-
-            self.current_frame += 1
+        # Кадри вже оброблені у VideoWorker; якщо GUI відстає, беремо лише найновіший
+        # Немає нового кадру (наприклад, пауза) — не перемальовуємо
+        frame = self.worker.take_frame() if self.worker else None
+        if frame is None or self.scrubbing:
+            return
 
-            # Виконуємо детекцію кожні `detection_interval` кадрів
-            if (self.current_frame % self.detection_interval == 0) or (self.last_detection_result is None):
-                results = list(self.model(frame, CFG.CONFIDENCE))
-                self.last_detection_result = results
-            else:
-                results = self.last_detection_result
-
-            alert_triggered = False
-
-            # Якщо є детекція на кадрі, накладаємо рамки та підписи
-            if len(results) > 0:
-                boxes = results[0].boxes
-                for box in boxes:
-                    cls_id = int(box.cls[0])  # Ідентифікатор класу
-                    conf = float(box.conf[0])  # Впевненість детекції
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    label = self.model.names[cls_id]
-
-                    # Фільтруємо об'єкти залежно від порогу conf
-                    if conf < 0.5:
-                        continue
-
-                    # Накладання рамок і підписів
-                    if label in self.enabled_objects:
-                        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), thickness=2)
-                        cv2.putText(
-                            frame, f"{label} {conf:.2f}",
-                            (int(x1), int(y1) - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), thickness=1
-                        )
-
-                    # Тривога (якщо клас у списку сигналізацій)
-                    if label in self.enabled_alerts:
-                        alert_triggered = True
-
-            # Якщо є тривога, виділяємо межі червоним
-            if alert_triggered:
-                h, w, _ = frame.shape
-                cv2.rectangle(frame, (0, 0), (w - 1, h - 1), (0, 0, 255), thickness=20)
-
-            # Конвертуємо кадр для відображення
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            h, w, ch = frame.shape
-            bytes_per_line = ch * w
-            qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
+        # Кадр уже зменшений до розміру мітки у VideoWorker; BGR888 дозволяє
+        # обійтися без cvtColor, QPixmap.fromImage робить єдину копію
+        with self._m_display.time():
+            h, w = frame.shape[:2]
+            qt_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
             pixmap = QPixmap.fromImage(qt_image)
-            scaled = pixmap.scaled(self.label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.label.setPixmap(scaled)
+            if w > self.label.width() or h > self.label.height():
+                pixmap = pixmap.scaled(self.label.size(), Qt.KeepAspectRatio, Qt.FastTransformation)
+            self._pixmap = pixmap
+            self.label.setPixmap(pixmap)
+        self.worker.recycle(frame)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.worker:
+            self.worker.set_display_size(self.label.width(), self.label.height())
+        if self._pixmap is not None:
+            self.label.setPixmap(self._pixmap.scaled(self.label.size(), Qt.KeepAspectRatio, Qt.FastTransformation))
 
     def get_current_position(self):
-        return self.current_frame
+        return self.worker.current_frame if self.worker else 0
 
     def get_total_frames(self):
-        return self.total_frames
+        return self.worker.total_frames if self.worker else 0
 
 
 def _get_camera_list():
+    # pygrabber (DirectShow) is only needed when the user adds a camera
+    try:
+        from pygrabber.dshow_graph import FilterGraph
+    except ImportError:
+        return _probe_camera_list()
     graph = FilterGraph()
     devices = graph.get_input_devices()
     camera_list = []
@@ -171,19 +172,32 @@ def _get_camera_list():
     return camera_list
 
 
+# Without DirectShow (Linux, macOS) the first few device indices are tried.
+def _probe_camera_list(max_devices=5):
+    import cv2
+    camera_list = []
+    for i in range(max_devices):
+        cap = cv2.VideoCapture(i)
+        if cap.isOpened():
+            camera_list.append((f"Camera {i}", i))
+        cap.release()
+    return camera_list
+
+
+def _source_options(camera):
+    return camera.get("url"), camera.get("max_width"), camera.get("max_fps")
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.config_file = "config.json"
-        if not os.path.exists(self.config_file):
-            default_config = {
-                "cameras": [],
-                "phones": []
-            }
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(default_config, f, ensure_ascii=False, indent=2)
-        with open(self.config_file, "r", encoding="utf-8") as f:
-            self.config = json.load(f)
+        self.config_store = ConfigStore(self.config_file)
+        self.config = self.config_store.load()
+        # Правки config.json ззовні застосовуються до запущених камер
+        self.config_watch_timer = QTimer(self)
+        self.config_watch_timer.timeout.connect(self._poll_config_file)
+        self.config_watch_timer.start(CFG.CONFIG_WATCH_INTERVAL_MS)
         self.setWindowIcon(QIcon("icon.png"))
         self.setWindowTitle("Military Equipment Detection System")
         self.resize(1200, 700)
@@ -195,14 +209,32 @@ class MainWindow(QMainWindow):
         self.vehicle_actions = {}
         self.alert_actions = {}
         self.camera_threads = {}
+        # Джерело, з яким запущено кожну камеру: його зміна потребує перезапуску
+        self.camera_sources = {}
+        self.camera_pool = None
+        if CFG.CAMERA_MODE == "process":
+            # Кадри з процесів камер читаються зі спільної пам'яті за таймером
+            self.camera_pool = CameraProcessPool()
+            self.camera_pool_timer = QTimer(self)
+            self.camera_pool_timer.timeout.connect(self._poll_camera_pool)
+            self.camera_pool_timer.start(CFG.SHM_POLL_INTERVAL_MS)
         main_widget = QWidget(self)
         self.setCentralWidget(main_widget)
         self.video_player = VideoPlayerWidget(self)
+        self.camera_grid = CameraGridWidget(self)
+        self.camera_grid.focus_changed.connect(self._apply_previews)
+        self.camera_grid.rate_changed.connect(self._apply_previews)
+        self.view_tabs = QTabWidget()
+        self.view_tabs.addTab(self.video_player, "Player")
+        self.view_tabs.addTab(self.camera_grid, "Cameras")
+        self.view_tabs.currentChanged.connect(self._apply_previews)
         self.camera_combo = QComboBox()
         self.camera_combo.currentIndexChanged.connect(self.on_camera_combo_changed)
         self._populate_main_camera_combo()
         self.btn_add_camera = QPushButton("Add camera")
         self.btn_add_camera.clicked.connect(self.add_camera_clicked)
+        self.btn_add_network_camera = QPushButton("Add network camera")
+        self.btn_add_network_camera.clicked.connect(self.add_network_camera_clicked)
         self.btn_remove_camera = QPushButton("Remove camera")
         self.btn_remove_camera.clicked.connect(self.remove_camera_clicked)
         self.btn_open_camera = QPushButton("Show camera")
@@ -214,6 +246,13 @@ class MainWindow(QMainWindow):
         self.btn_play_pause = QPushButton("Pause/Resume")
         self.btn_play_pause.clicked.connect(self.video_player.pause_video)
         self.btn_stop = QPushButton("Stop/Close")
+        self.speed_combo = QComboBox()
+        for speed in CFG.PLAYBACK_SPEEDS:
+            self.speed_combo.addItem(f"{speed:g}x", speed)
+        self.speed_combo.setCurrentIndex(self.speed_combo.findData(1.0))
+        self.speed_combo.currentIndexChanged.connect(
+            lambda _: self.video_player.set_speed(self.speed_combo.currentData())
+        )
         self.btn_stop.clicked.connect(self.stop_video_clicked)
         self.btn_phones = QPushButton("Phones")
         self.btn_phones.clicked.connect(self.show_phones_dialog)
@@ -232,6 +271,14 @@ class MainWindow(QMainWindow):
         self.slider_video = QSlider(Qt.Horizontal)
         self.slider_video.setMinimum(0)
         self.slider_video.valueChanged.connect(self.on_slider_value_changed)
+        self.slider_video.sliderPressed.connect(lambda: self.video_player.set_scrubbing(True))
+        self.slider_video.sliderReleased.connect(lambda: self.video_player.set_scrubbing(False))
+        self.slider_video.sliderReleased.connect(self._commit_seek)
+        # Точний пошук лише коли повзунок зупинився; проміжні значення зливаються
+        self._pending_seek = None
+        self.seek_timer = QTimer(self)
+        self.seek_timer.setSingleShot(True)
+        self.seek_timer.timeout.connect(self._commit_seek)
         self.slider_update_timer = QTimer()
         self.slider_update_timer.timeout.connect(self.update_slider)
         self.slider_update_timer.start(100)
@@ -240,6 +287,7 @@ class MainWindow(QMainWindow):
         left_panel.addWidget(lbl_select_camera)
         left_panel.addWidget(self.camera_combo)
         left_panel.addWidget(self.btn_add_camera)
+        left_panel.addWidget(self.btn_add_network_camera)
         left_panel.addWidget(self.btn_remove_camera)
         left_panel.addWidget(self.btn_open_camera)
         left_panel.addWidget(self.btn_stop_demo)
@@ -249,12 +297,13 @@ class MainWindow(QMainWindow):
         right_panel.addWidget(self.btn_open_video)
         right_panel.addWidget(self.btn_play_pause)
         right_panel.addWidget(self.btn_stop)
+        right_panel.addWidget(self.speed_combo)
         right_panel.addWidget(self.btn_objects_menu)
         right_panel.addWidget(self.btn_alerts_menu)
         right_panel.addStretch(1)
         top_layout = QHBoxLayout()
         top_layout.addLayout(left_panel)
-        top_layout.addWidget(self.video_player, stretch=3)
+        top_layout.addWidget(self.view_tabs, stretch=3)
         top_layout.addLayout(right_panel)
         main_layout = QVBoxLayout()
         main_layout.addLayout(top_layout)
@@ -269,18 +318,70 @@ class MainWindow(QMainWindow):
             if cam_id not in self.camera_threads:
                 alerts_dict = camera_obj.get("alerts", {})
                 alerts_for_new_camera = [k for k, v in alerts_dict.items() if v is True]
-                phones_list = self.config.get("phones", [])
-                worker = CameraThread(cam_id, alerts_for_new_camera, phones_list)
-                worker.camera_event.connect(self.on_camera_event)
-                self.camera_threads[cam_id] = worker
-                worker.start()
+                self._start_camera_thread(cam_id, alerts_for_new_camera)
                 print(f"[MainWindow] Auto-start camera thread: {cam_name} (ID={cam_id})")
 
-    def on_camera_event(self, cam_id, frame):
-        pass
+    def _start_camera_thread(self, cam_id, enabled_alerts):
+        camera = self.getCamera(cam_id) or {}
+        phones_list = self.config.get("phones", [])
+        options = dict(
+            motion_sensitivity=camera.get("motion_sensitivity", CFG.MOTION_SENSITIVITY),
+            tile_size=camera.get("tile_size"),
+            tile_overlap=camera.get("tile_overlap", CFG.TILE_OVERLAP),
+            interval=camera.get("interval", 1.0),
+            confidence=camera.get("confidence", CFG.CONFIDENCE),
+            source=camera.get("url"),
+            max_width=camera.get("max_width"),
+            max_fps=camera.get("max_fps")
+        )
+        if self.camera_pool is not None:
+            worker = CameraProcessProxy(self.camera_pool, cam_id, enabled_alerts, phones_list, self, **options)
+        else:
+            worker = CameraThread(cam_id, enabled_alerts, phones_list, self, **options)
+        worker.camera_event.connect(self.camera_grid.on_camera_event)
+        self.camera_threads[cam_id] = worker
+        self.camera_sources[cam_id] = _source_options(camera)
+        self.camera_grid.add_camera(cam_id, camera.get("name", str(cam_id)))
+        self._apply_preview(worker)
+        worker.start()
+        return worker
+
+    # Cameras send previews only while the grid tab is shown; the focused one
+    # sends full-resolution frames, the rest thumbnails at the grid's rate.
+    def _apply_preview(self, worker):
+        if self.view_tabs.currentWidget() is not self.camera_grid:
+            worker.set_preview(0)
+        elif worker.cam_id == self.camera_grid.focused:
+            worker.set_preview(CFG.GRID_FOCUS_FPS, full_resolution=True)
+        else:
+            worker.set_preview(self.camera_grid.thumbnail_fps())
+
+    def _poll_camera_pool(self):
+        for cam_id, frame in self.camera_pool.poll():
+            worker = self.camera_threads.get(cam_id)
+            if isinstance(worker, CameraProcessProxy):
+                worker.deliver(frame)
+
+    def _apply_previews(self, *_):
+        for worker in self.camera_threads.values():
+            self._apply_preview(worker)
 
     def closeEvent(self, event):
+        self.config_watch_timer.stop()
+        self.config_store.close()
         self.video_player.stop_video()
+        for worker in self.camera_threads.values():
+            worker.stop()
+        for worker in self.camera_threads.values():
+            worker.wait()
+        if self.camera_pool is not None:
+            self.camera_pool.shutdown()
+        shutdown_servers()
+        shutdown_alert_aggregator()
+        # Delivers the digest the aggregator has just flushed, and anything
+        # else still queued, before the app exits.
+        shutdown_alert_dispatcher(drain=True)
+        shutdown_event_store()
         super().closeEvent(event)
 
     def _create_vehicle_actions(self):
@@ -361,14 +462,46 @@ class MainWindow(QMainWindow):
             print(f"Added camera: {selected_name} (ID={selected_id})")
             self.camera_combo.setCurrentIndex(self.camera_combo.count() - 1)
             if selected_id not in self.camera_threads:
-                phones_list = self.config.get("phones", [])
-                worker = CameraThread(selected_id, [], phones_list, self)
-                worker.camera_event.connect(self.on_camera_event)
-                self.camera_threads[selected_id] = worker
-                worker.start()
+                self._start_camera_thread(selected_id, [])
         else:
             print("Canceled adding camera")
 
+    # RTSP/HTTP cameras are stored with a generated id ("net1", "net2", ...)
+    # and their URL, so credentials in the URL stay out of logs and events.
+    # Optional "max_width" and "max_fps" can be added to the entry in config.json.
+    def add_network_camera_clicked(self):
+        url, ok = QInputDialog.getText(self, "Add network camera", "Stream URL (rtsp://, http://):")
+        url = url.strip()
+        if not ok or not url:
+            return
+        if "://" not in url:
+            QMessageBox.warning(self, "Warning", "Enter a full stream URL, e.g. rtsp://host:554/stream")
+            return
+        existing_ids = {c["id"] for c in self.config.get("cameras", [])}
+        n = 1
+        while f"net{n}" in existing_ids:
+            n += 1
+        cam_id = f"net{n}"
+        name, ok = QInputDialog.getText(self, "Add network camera", "Camera name:", text=f"Network camera {n}")
+        if not ok:
+            return
+        name = name.strip() or cam_id
+        if self.camera_combo.count() == 1 and self.camera_combo.itemData(0) == -1:
+            self.camera_combo.clear()
+        self.camera_combo.addItem(name, cam_id)
+        self.camera_combo.setEnabled(True)
+        self.config["cameras"].append({
+            "name": name,
+            "id": cam_id,
+            "url": url,
+            "detected_objects": {},
+            "alerts": {}
+        })
+        self.save_config()
+        print(f"Added network camera: {name} (ID={cam_id})")
+        self.camera_combo.setCurrentIndex(self.camera_combo.count() - 1)
+        self._start_camera_thread(cam_id, [])
+
     def remove_camera_clicked(self):
         idx = self.camera_combo.currentIndex()
         if idx >= 0:
@@ -380,6 +513,8 @@ class MainWindow(QMainWindow):
                     worker.stop()
                     worker.wait()
                     del self.camera_threads[camera_id]
+                    self.camera_sources.pop(camera_id, None)
+                self.camera_grid.remove_camera(camera_id)
                 self.camera_combo.removeItem(idx)
                 if "cameras" in self.config:
                     self.config["cameras"] = [
@@ -402,7 +537,8 @@ class MainWindow(QMainWindow):
             enabled_alerts = self.get_checked_alert_actions()
             self.video_player.update_detections_config(enabled_objects)
             self.video_player.update_alerts_config(enabled_alerts)
-            self.video_player.start_camera(camera_index)
+            camera = self.getCamera(camera_index) or {}
+            self.video_player.start_camera(camera.get("url", camera_index))
             self.set_video_controls_visible(False)
         else:
             QMessageBox.warning(self, "Warning", "No available cameras to open!")
@@ -423,25 +559,30 @@ class MainWindow(QMainWindow):
         self.set_video_controls_visible(False)
         camera_id = self.camera_combo.currentData()
         if camera_id in self.camera_threads:
-            worker = self.camera_threads[camera_id]
-            worker.stop()
-            worker.wait()
-            enabled_alerts = self.get_checked_alert_actions()
-            phones_list = self.config.get("phones", [])
-            new_worker = CameraThread(camera_id, enabled_alerts, phones_list, self)
-            new_worker.camera_event.connect(self.on_camera_event)
-            self.camera_threads[camera_id] = new_worker
-            new_worker.start()
+            self.camera_threads[camera_id].reconfigure(enabled_alerts=self.get_checked_alert_actions())
 
     def on_slider_value_changed(self, value):
-        if self.video_player.cap and self.video_player.cap.isOpened():
+        if self.video_player.is_active():
             total_frames = self.video_player.get_total_frames()
             if total_frames > 0:
-                self.video_player.seek_frame(value)
+                self.video_player.show_preview(value)
+                self._pending_seek = value
+                self.seek_timer.start(CFG.SEEK_DEBOUNCE_MS)
+
+    def _commit_seek(self):
+        self.seek_timer.stop()
+        if self._pending_seek is not None:
+            self.video_player.seek_frame(self._pending_seek)
+            self._pending_seek = None
 
     def update_slider(self):
-        if self.video_player.cap and self.video_player.cap.isOpened():
+        # Поки пошук не виконано, повзунок лишається там, куди його поставили
+        if self._pending_seek is not None:
+            return
+        if self.video_player.is_active():
             total_frames = self.video_player.get_total_frames()
+            # Програмні зміни не повинні викликати пошук
+            self.slider_video.blockSignals(True)
             if total_frames > 0:
                 current_pos = self.video_player.get_current_position()
                 self.slider_video.setRange(0, total_frames - 1)
@@ -449,6 +590,7 @@ class MainWindow(QMainWindow):
                     self.slider_video.setValue(current_pos)
             else:
                 self.slider_video.setRange(0, 0)
+            self.slider_video.blockSignals(False)
 
     def show_phones_dialog(self):
         phones_list = self.config.get("phones", [])
@@ -457,6 +599,8 @@ class MainWindow(QMainWindow):
             updated_phones = dialog.get_phones()
             self.config["phones"] = updated_phones
             self.save_config()
+            for worker in self.camera_threads.values():
+                worker.reconfigure(phones=updated_phones)
             print("Updated phone list:", updated_phones)
         else:
             print("Canceled phone changes")
@@ -464,6 +608,7 @@ class MainWindow(QMainWindow):
     def set_video_controls_visible(self, visible: bool):
         self.btn_play_pause.setVisible(visible)
         self.btn_stop.setVisible(visible)
+        self.speed_combo.setVisible(visible)
         self.slider_video.setVisible(visible)
 
     def getCamera(self, camera_id):
@@ -488,12 +633,51 @@ class MainWindow(QMainWindow):
         self.video_player.update_detections_config(self.get_checked_vehicle_actions())
         self.video_player.update_alerts_config(self.get_checked_alert_actions())
         if camera_id in self.camera_threads:
-            worker = self.camera_threads[camera_id]
-            worker.enabled_alerts = self.get_checked_alert_actions()
+            self.camera_threads[camera_id].reconfigure(enabled_alerts=self.get_checked_alert_actions())
 
+    # Written by the config store's thread after a short debounce.
     def save_config(self):
-        with open(self.config_file, "w", encoding="utf-8") as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
+        self.config_store.save(self.config)
+
+    def _poll_config_file(self):
+        config = self.config_store.poll()
+        if config is not None:
+            self._apply_config(config)
+
+    # Brings the running cameras in line with an edited config: removed
+    # cameras stop, new ones start, a changed source restarts its camera, and
+    # everything else is applied to the running thread without a restart.
+    def _apply_config(self, config):
+        self.config = config
+        cameras = {cam["id"]: cam for cam in config.get("cameras", [])}
+        phones = config.get("phones", [])
+        for cam_id in list(self.camera_threads):
+            camera = cameras.get(cam_id)
+            worker = self.camera_threads[cam_id]
+            if camera is None or _source_options(camera) != self.camera_sources.get(cam_id):
+                worker.stop()
+                worker.wait()
+                del self.camera_threads[cam_id]
+                self.camera_sources.pop(cam_id, None)
+                self.camera_grid.remove_camera(cam_id)
+                continue
+            worker.reconfigure(
+                enabled_alerts=[k for k, v in camera.get("alerts", {}).items() if v is True],
+                phones=phones,
+                interval=camera.get("interval", 1.0),
+                confidence=camera.get("confidence", CFG.CONFIDENCE),
+                motion_sensitivity=camera.get("motion_sensitivity", CFG.MOTION_SENSITIVITY),
+                tile_size=camera.get("tile_size"),
+                tile_overlap=camera.get("tile_overlap", CFG.TILE_OVERLAP)
+            )
+        self._auto_start_cameras_from_config()
+        selected = self.camera_combo.currentData()
+        self.camera_combo.blockSignals(True)
+        self._populate_main_camera_combo()
+        index = self.camera_combo.findData(selected)
+        self.camera_combo.setCurrentIndex(max(index, 0))
+        self.camera_combo.blockSignals(False)
+        self.on_camera_combo_changed(self.camera_combo.currentIndex())
 
     def _populate_main_camera_combo(self):
         self.camera_combo.clear()
@@ -732,10 +916,32 @@ class PhoneManagerDialog(QDialog):
         return self.phones
 
 
+def _report_startup(server, window_ready):
+    server.ready.wait()
+    TIMELINE.mark(f"model ready ({server.backend})")
+    window_ready.wait()
+    TIMELINE.report()
+
+
+def _on_first_event_loop_pass(window_ready):
+    TIMELINE.mark("first event loop pass")
+    window_ready.set()
+
+
 def main():
     app = QApplication(sys.argv)
+    TIMELINE.mark("QApplication")
+    # Start loading the weights right away; the window does not wait for them.
+    server = get_server()
+    window_ready = threading.Event()
+    threading.Thread(target=_report_startup, args=(server, window_ready), daemon=True).start()
+    if CFG.METRICS_ENABLED:
+        metrics.start_metrics_server()
     w = MainWindow()
+    TIMELINE.mark("main window built")
     w.show()
+    TIMELINE.mark("window shown")
+    QTimer.singleShot(0, lambda: _on_first_event_loop_pass(window_ready))
     sys.exit(app.exec_())
 
 
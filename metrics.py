@@ -0,0 +1,318 @@
+import bisect
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from config import CFG
+
+# Counters, gauges and histograms for the hot paths, exported in Prometheus
+# text format. With METRICS_ENABLED off, `labels()` returns a shared no-op
+# child, so instrumented code costs one attribute lookup and a call per use.
+ENABLED = CFG.METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_TIMER = nullcontext()
+
+
+class _NoopChild:
+    def inc(self, amount=1.0):
+        pass
+
+    def set(self, value):
+        pass
+
+    def set_function(self, fn):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return _NULL_TIMER
+
+    def get(self):
+        return 0.0
+
+
+_NOOP = _NoopChild()
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self._fn = None
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = float(value)
+
+    # The value is read from `fn` at scrape time, e.g. a queue depth or a
+    # counter another component already keeps.
+    def set_function(self, fn):
+        self._fn = fn
+
+    def get(self):
+        return float(self._fn()) if self._fn is not None else self.value
+
+    def state(self):
+        return self.get()
+
+    def restore(self, state):
+        self.value = float(state)
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.last = 0.0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            self.last = value
+
+    def time(self):
+        return _Timer(self)
+
+    def get(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def state(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count, self.last
+
+    def restore(self, state):
+        counts, total, count, last = state
+        with self._lock:
+            self.counts, self.sum, self.count, self.last = list(counts), total, count, last
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        if not ENABLED:
+            return _NOOP
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, key, extra=None):
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{self._label_text(key)} {child.get():g}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def _render_child(self, key, child):
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{self.name}_bucket{self._label_text(key, ('le', le))} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {total:g}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+
+REGISTRY = []
+
+FRAMES_CAPTURED = Counter("detector_frames_captured_total", "Frames read from the source.", ("source",))
+FRAMES_DROPPED = Counter("detector_frames_dropped_total", "Frames discarded before analysis or display.",
+                         ("source",))
+FRAMES_ANALYZED = Counter("detector_frames_analyzed_total", "Frames that went through the pipeline.", ("source",))
+FRAMES_SKIPPED = Counter("detector_frames_skipped_total", "Frames skipped by the motion gate.", ("source",))
+FPS = Gauge("detector_fps", "Frames analyzed per second over the last second.", ("source",))
+STAGE_SECONDS = Histogram("detector_stage_seconds", "Time spent in each pipeline stage.", ("source", "stage"))
+FRAME_LATENCY = Histogram("detector_frame_latency_seconds", "Capture to end of processing, per frame.",
+                          ("source",))
+STREAM_CONNECTED = Gauge("detector_stream_connected", "1 while the camera source is delivering frames.",
+                         ("source",))
+STREAM_RECONNECTS = Counter("detector_stream_reconnects_total", "Times the camera source was reopened.", ("source",))
+PLAYBACK_BEHIND = Gauge("detector_playback_behind_seconds", "How far playback trails real time.", ("source",))
+ALERT_QUEUE_DEPTH = Gauge("detector_alert_queue_depth", "Alerts waiting for a dispatcher worker.")
+ALERTS = Counter("detector_alerts_total", "Alerts by outcome.", ("result",))
+ALERT_DIGESTS = Counter("detector_alert_digests_total", "Alert digests handed to the dispatcher.")
+ALERT_IO_SAVED = Counter("detector_alert_io_saved_total", "Uploads and messages saved by digests.", ("kind",))
+ALERT_LATENCY = Histogram("detector_alert_latency_seconds", "Enqueue to delivery, per alert.")
+UPLOAD_SECONDS = Histogram("detector_upload_seconds", "Snapshot upload time.")
+
+
+# Updates an FPS gauge at most once per second from a frame count.
+class FpsMeter:
+    def __init__(self, source):
+        self.gauge = FPS.labels(source)
+        self.frames = 0
+        self.started = time.monotonic()
+        self.value = 0.0
+
+    def tick(self):
+        if not ENABLED:
+            return
+        self.frames += 1
+        now = time.monotonic()
+        if now - self.started >= 1.0:
+            self.value = self.frames / (now - self.started)
+            self.gauge.set(self.value)
+            self.frames = 0
+            self.started = now
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Every child labelled with one of `sources` (the first label), as sent by a
+# camera worker process to the GUI process, which `merge`s it into its own
+# metrics: the worker's values replace the GUI's for those sources.
+def snapshot(sources):
+    sources = {str(source) for source in sources}
+    state = []
+    for metric in REGISTRY:
+        with metric._lock:
+            children = list(metric._children.items())
+        for key, child in children:
+            if key and key[0] in sources:
+                state.append((metric.name, key, child.state()))
+    return state
+
+
+def merge(state):
+    by_name = {metric.name: metric for metric in REGISTRY}
+    for name, key, value in state:
+        metric = by_name.get(name)
+        if metric is not None:
+            metric.labels(*key).restore(value)
+
+
+def overlay_lines(source):
+    if not ENABLED:
+        return []
+    inference = STAGE_SECONDS.labels(source, "inference")
+    return [
+        f"{FPS.labels(source).get():.1f} fps",
+        f"inference {inference.last * 1000:.0f} ms (avg {inference.get() * 1000:.0f})",
+        f"dropped {FRAMES_DROPPED.labels(source).get():.0f}",
+        f"behind {PLAYBACK_BEHIND.labels(source).get():.2f} s",
+        f"alert queue {ALERT_QUEUE_DEPTH.labels().get():.0f}",
+    ]
+
+
+def draw_overlay(frame, lines, origin=(10, 25), line_height=22):
+    x, y = origin
+    for line in lines:
+        cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
+        cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        y += line_height
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host=CFG.METRICS_HOST, port=CFG.METRICS_PORT):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    print(f"[Metrics] Serving on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,42 @@
+import os
+import threading
+
+from config import CFG
+from inference_server import InferenceServer
+
+
+# One InferenceServer per (weights, backend) pair for the whole process.
+# Creating a server only starts its loader thread, so `get` never blocks; the
+# weights are loaded in the background and callers wait on `ready` (or on
+# their first prediction) only when they actually need the model.
+class ModelRegistry:
+    def __init__(self):
+        self._servers = {}
+        self._lock = threading.Lock()
+
+    def get(self, weights=CFG.WEIGHTS, backend=CFG.BACKEND):
+        key = (os.path.abspath(weights), backend)
+        with self._lock:
+            server = self._servers.get(key)
+            if server is None:
+                server = InferenceServer(weights, backend)
+                self._servers[key] = server
+            return server
+
+    def shutdown(self):
+        with self._lock:
+            servers = list(self._servers.values())
+            self._servers.clear()
+        for server in servers:
+            server.stop()
+
+
+_registry = ModelRegistry()
+
+
+def get_server(weights=CFG.WEIGHTS, backend=CFG.BACKEND):
+    return _registry.get(weights, backend)
+
+
+def shutdown_servers():
+    _registry.shutdown()
@@ -0,0 +1,71 @@
+import time
+
+import cv2
+import numpy as np
+
+from config import CFG
+
+
+# Cheap change detector in front of the model. Frames are shrunk to `width`
+# pixels, blurred and compared to the frame of the last inference; inference
+# runs only when enough pixels changed, or when `min_interval` seconds passed
+# since the last one (so a missed change is never hidden for long).
+class MotionGate:
+    def __init__(self, sensitivity=CFG.MOTION_SENSITIVITY, min_interval=CFG.MOTION_MIN_INFERENCE_INTERVAL,
+                 width=CFG.MOTION_GATE_WIDTH, pixel_threshold=25):
+        self.sensitivity = float(np.clip(sensitivity, 0.0, 1.0))
+        self.min_interval = min_interval
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.forced = 0
+        self.last_change = 0.0
+        self._reference = None
+        self._last_inference = None
+
+    # Fraction of changed pixels that triggers inference: 2% at sensitivity 0,
+    # 1% at 0.5 and 0.01% at 1.
+    @property
+    def change_threshold(self):
+        return 0.02 * (1.0 - self.sensitivity) + 0.0001
+
+    def check(self, frame, now=None):
+        now = time.monotonic() if now is None else now
+        self.frames_seen += 1
+        small = self._prepare(frame)
+        if self._reference is None or self._reference.shape != small.shape:
+            return self._accept(small, now)
+        diff = cv2.absdiff(small, self._reference)
+        self.last_change = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        if self.last_change >= self.change_threshold:
+            return self._accept(small, now)
+        if now - self._last_inference >= self.min_interval:
+            self.forced += 1
+            return self._accept(small, now)
+        self.frames_skipped += 1
+        return False
+
+    def skip_ratio(self):
+        return self.frames_skipped / self.frames_seen if self.frames_seen else 0.0
+
+    def get_stats(self):
+        return {
+            "frames_seen": self.frames_seen,
+            "frames_skipped": self.frames_skipped,
+            "forced": self.forced,
+            "skip_ratio": self.skip_ratio(),
+        }
+
+    def _accept(self, small, now):
+        self._reference = small
+        self._last_inference = now
+        return True
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        scale = self.width / float(w)
+        small = cv2.resize(frame, (self.width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
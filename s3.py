@@ -1,21 +1,57 @@
 import boto3
+from botocore.config import Config
+import threading
 import uuid
 import os
 
-def upload_and_get_temporary_url(file_path: str, bucket_name: str, expiration_in_seconds: int = 3600):
+from config import CFG
 
-    s3 = boto3.client("s3")
-    file_extension = os.path.splitext(file_path)[1]
-    unique_key = str(uuid.uuid4()) + file_extension
+_client = None
+_client_lock = threading.Lock()
 
-    s3.upload_file(file_path, bucket_name, unique_key, ExtraArgs={"ContentType": "image/jpeg"})
 
-    presigned_url = s3.generate_presigned_url(
+def get_s3_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            if CFG.S3_ENDPOINT_URL:
+                config = Config(max_pool_connections=CFG.S3_MAX_POOL_CONNECTIONS, s3={"addressing_style": "path"})
+            else:
+                config = Config(max_pool_connections=CFG.S3_MAX_POOL_CONNECTIONS)
+            _client = boto3.client("s3", endpoint_url=CFG.S3_ENDPOINT_URL, config=config)
+        return _client
+
+
+def _temporary_url(s3, bucket_name: str, key: str, expiration_in_seconds: int):
+    return s3.generate_presigned_url(
         ClientMethod="get_object",
         Params={
             "Bucket": bucket_name,
-            "Key": unique_key
+            "Key": key
         },
         ExpiresIn=expiration_in_seconds
     )
-    return presigned_url, unique_key
\ No newline at end of file
+
+
+def upload_and_get_temporary_url(file_path: str, bucket_name: str, expiration_in_seconds: int = 3600):
+
+    s3 = get_s3_client()
+    file_extension = os.path.splitext(file_path)[1]
+    unique_key = str(uuid.uuid4()) + file_extension
+
+    s3.upload_file(file_path, bucket_name, unique_key, ExtraArgs={"ContentType": "image/jpeg"})
+
+    presigned_url = _temporary_url(s3, bucket_name, unique_key, expiration_in_seconds)
+    return presigned_url, unique_key
+
+
+def upload_bytes_and_get_temporary_url(data: bytes, bucket_name: str, expiration_in_seconds: int = 3600,
+                                       extension: str = ".jpg", content_type: str = "image/jpeg"):
+
+    s3 = get_s3_client()
+    unique_key = str(uuid.uuid4()) + extension
+
+    s3.put_object(Bucket=bucket_name, Key=unique_key, Body=data, ContentType=content_type)
+
+    presigned_url = _temporary_url(s3, bucket_name, unique_key, expiration_in_seconds)
+    return presigned_url, unique_key
@@ -0,0 +1,124 @@
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from config import CFG
+
+_HEADER_FIELDS = 8
+_SLOT_FIELDS = 5
+# Worker-side counters published next to the frames; see FrameRing.stats.
+STATS_FIELDS = ("captured", "analyzed", "dropped", "avg_latency", "connected", "reconnects", "heartbeat")
+
+
+# Latest-frames ring in shared memory, written by one camera worker process
+# and read by the GUI without pickling. Every slot holds a preview frame (the
+# camera has already drawn its boxes on it) and a sequence number used as a
+# seqlock: the writer marks the slot -1 while writing and stores the new
+# sequence number when done, and a reader retries if the number changed while
+# it copied the slot. The segment is created by the GUI process so it
+# outlives worker restarts.
+#
+# Layout: int64 header [write_seq, slots, max_h, max_w, channels, 0, 0, 0]
+#         int64 slot table [slots, (seq, h, w, src_h, src_w)]
+#         float64 stats, float64 timestamps [slots]
+#         uint8 frames [slots, max_h, max_w, channels]
+class FrameRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.name = shm.name
+        header = np.ndarray((_HEADER_FIELDS,), np.int64, shm.buf, 0)
+        slots, max_h, max_w, channels = (int(v) for v in header[1:5])
+        self.slots = slots
+        self.max_shape = (max_h, max_w, channels)
+        self._header = header
+        offset = header.nbytes
+        self._table = np.ndarray((slots, _SLOT_FIELDS), np.int64, shm.buf, offset)
+        offset += self._table.nbytes
+        self.stats = np.ndarray((len(STATS_FIELDS),), np.float64, shm.buf, offset)
+        offset += self.stats.nbytes
+        self._timestamps = np.ndarray((slots,), np.float64, shm.buf, offset)
+        offset += self._timestamps.nbytes
+        self._frames = np.ndarray((slots,) + self.max_shape, np.uint8, shm.buf, offset)
+        self._last_read = 0
+        self.reads_retried = 0
+
+    @staticmethod
+    def _size(slots, max_h, max_w, channels):
+        return (8 * (_HEADER_FIELDS + slots * _SLOT_FIELDS + len(STATS_FIELDS) + slots)
+                + slots * max_h * max_w * channels)
+
+    @classmethod
+    def create(cls, slots=CFG.SHM_RING_SLOTS, max_height=CFG.SHM_MAX_FRAME_HEIGHT,
+               max_width=CFG.SHM_MAX_FRAME_WIDTH, channels=3):
+        size = cls._size(slots, max_height, max_width, channels)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray((_HEADER_FIELDS,), np.int64, shm.buf, 0)
+        header[:] = 0
+        header[1:5] = (slots, max_height, max_width, channels)
+        ring = cls(shm, owner=True)
+        ring._table[:] = 0
+        ring.stats[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    def write(self, frame, timestamp=None):
+        max_h, max_w, channels = self.max_shape
+        src_h, src_w = frame.shape[:2]
+        scale = 1.0
+        if src_h > max_h or src_w > max_w:
+            scale = min(max_h / src_h, max_w / src_w)
+            frame = cv2.resize(frame, (max(1, int(src_w * scale)), max(1, int(src_h * scale))),
+                               interpolation=cv2.INTER_AREA)
+        h, w = frame.shape[:2]
+        seq = int(self._header[0]) + 1
+        slot = seq % self.slots
+        row = self._table[slot]
+        row[0] = -1
+        self._frames[slot, :h, :w] = frame.reshape(h, w, channels)
+        self._timestamps[slot] = time.monotonic() if timestamp is None else timestamp
+        row[1:] = (h, w, src_h, src_w)
+        row[0] = seq
+        self._header[0] = seq
+        return seq
+
+    # Returns (seq, timestamp, frame) for the newest frame not
+    # read yet, or None. The frame is copied out of the slot.
+    def read_latest(self, retries=3):
+        for _ in range(retries):
+            seq = int(self._header[0])
+            if seq == self._last_read or seq == 0:
+                return None
+            slot = seq % self.slots
+            row = self._table[slot]
+            if int(row[0]) != seq:
+                self.reads_retried += 1
+                continue
+            h, w = int(row[1]), int(row[2])
+            frame = self._frames[slot, :h, :w].copy()
+            timestamp = float(self._timestamps[slot])
+            if int(row[0]) != seq:
+                self.reads_retried += 1
+                continue
+            self._last_read = seq
+            return seq, timestamp, frame
+        return None
+
+    def stats_dict(self):
+        return dict(zip(STATS_FIELDS, (float(v) for v in self.stats)))
+
+    def close(self):
+        # Views into the buffer must be released before the mapping closes.
+        self._header = self._table = self.stats = self._timestamps = None
+        self._frames = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,181 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import cv2
+
+from config import CFG
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    path TEXT PRIMARY KEY,
+    tier TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_tier_ts ON snapshots(tier, ts);
+"""
+
+_ENCODE_PARAMS = {
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+}
+
+
+def encode(frame, format, quality):
+    ok, encoded = cv2.imencode(f".{format}", frame, [_ENCODE_PARAMS[format], int(quality)])
+    if not ok:
+        raise IOError(f"Could not encode snapshot as {format}")
+    return encoded.tobytes()
+
+
+def _fit_width(frame, max_width):
+    h, w = frame.shape[:2]
+    if not max_width or w <= max_width:
+        return frame
+    return cv2.resize(frame, (max_width, max(1, h * max_width // w)), interpolation=cv2.INTER_AREA)
+
+
+def _crop(frame, xyxy, padding):
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = xyxy
+    pad_x, pad_y = (x2 - x1) * padding, (y2 - y1) * padding
+    x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+    x2, y2 = min(w, int(x2 + pad_x)), min(h, int(y2 + pad_y))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return frame[y1:y2, x1:x2]
+
+
+# Local copies of alert snapshots in retention tiers (SNAPSHOT_TIERS): the
+# full frame, a crop around the detected box and a thumbnail, each with its
+# own format, quality, width and disk quota. `save` only queues the frame;
+# one worker thread encodes the tiers, writes the files and deletes the
+# oldest files of any tier that went over its quota. What is on disk is
+# tracked in index.db in the root, so the folders are never listed. The new
+# files are indexed and the quotas checked against the totals in index.db in
+# one write transaction: every store on the same root (another process, or a
+# second instance of the app) counts the files of all of them, and only one
+# store at a time evicts.
+class SnapshotStore:
+    def __init__(self, root=CFG.SNAPSHOT_DIR, tiers=CFG.SNAPSHOT_TIERS, queue_size=CFG.SNAPSHOT_QUEUE_SIZE):
+        self.root = root
+        self.tiers = tiers
+        self.saved = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.failed = 0
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.db"), timeout=30.0, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        # Files and bytes per tier in index.db, as of the last write.
+        self._totals = dict.fromkeys(tiers, (0, 0))
+        for tier, files, size in self._db.execute("SELECT tier, COUNT(*), SUM(size) FROM snapshots GROUP BY tier"):
+            if tier in self._totals:
+                self._totals[tier] = (files, size)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._worker = threading.Thread(target=self._work, name="SnapshotStore", daemon=True)
+        self._worker.start()
+
+    def path_for(self, tier, alert_id, detected_at):
+        spec = self.tiers[tier]
+        return os.path.join(self.root, tier, detected_at.strftime("%Y-%m-%d"), f"{alert_id}.{spec['format']}")
+
+    # Queues `frame` for all tiers and returns the path the full-frame tier
+    # will be written to. `xyxy` (the detected box) is needed for the crop
+    # tier. `jpeg`, if given, is the frame already encoded at `jpeg_quality`
+    # and is written as is when it matches the full tier's settings.
+    def save(self, alert_id, detected_at, frame, xyxy=None, jpeg=None, jpeg_quality=None):
+        try:
+            self._queue.put_nowait((alert_id, detected_at, frame, xyxy, jpeg, jpeg_quality))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            print(f"[SnapshotStore] Queue full, snapshot {alert_id} not saved.")
+            return None
+        return self.path_for("full", alert_id, detected_at) if "full" in self.tiers else None
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+        self._db.close()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "saved": self.saved,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "evicted": self.evicted,
+                "files": {tier: files for tier, (files, _) in self._totals.items()},
+                "bytes": {tier: size for tier, (_, size) in self._totals.items()},
+            }
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"[SnapshotStore] Failed to save snapshot {item[0]}: {e}")
+
+    def _write(self, alert_id, detected_at, frame, xyxy, jpeg, jpeg_quality):
+        written = []
+        for tier, spec in self.tiers.items():
+            if tier == "crop":
+                image = _crop(frame, xyxy, spec.get("padding", 0.0)) if xyxy is not None else None
+                if image is None:
+                    continue
+            else:
+                image = frame
+            resized = _fit_width(image, spec.get("max_width"))
+            if (jpeg is not None and image is frame and resized is frame
+                    and spec["format"] == "jpg" and spec["quality"] == jpeg_quality):
+                data = jpeg
+            else:
+                data = encode(resized, spec["format"], spec["quality"])
+            path = self.path_for(tier, alert_id, detected_at)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            written.append((path, tier, len(data), time.time()))
+        evicted = []
+        totals = {}
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)", written)
+            for tier, spec in self.tiers.items():
+                files, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM snapshots WHERE tier = ?", (tier,)
+                ).fetchone()
+                quota = spec.get("quota_mb")
+                if quota is not None and size > quota * 1024 * 1024:
+                    oldest = self._db.execute("SELECT path, size FROM snapshots WHERE tier = ? ORDER BY ts", (tier,))
+                    for path, file_size in oldest:
+                        if size <= quota * 1024 * 1024 or files <= 1:
+                            break
+                        evicted.append(path)
+                        files -= 1
+                        size -= file_size
+                    oldest.close()
+                totals[tier] = (files, size)
+            self._db.executemany("DELETE FROM snapshots WHERE path = ?", [(p,) for p in evicted])
+        with self._lock:
+            self._totals = totals
+            self.saved += 1
+            self.evicted += len(evicted)
+        for path in evicted:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[SnapshotStore] Could not delete {path}: {e}")
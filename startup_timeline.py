@@ -0,0 +1,27 @@
+import threading
+import time
+
+
+# Wall-clock marks for each startup phase, relative to the moment this module
+# was first imported (main.py imports it before anything heavy).
+class StartupTimeline:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        with self._lock:
+            self.marks.append((phase, time.perf_counter() - self.start))
+
+    def report(self):
+        with self._lock:
+            marks = sorted(self.marks, key=lambda mark: mark[1])
+        print("[Startup] Timeline:")
+        previous = 0.0
+        for phase, at in marks:
+            print(f"  {phase:<32} +{(at - previous) * 1000:7.0f} ms  (at {at * 1000:7.0f} ms)")
+            previous = at
+
+
+TIMELINE = StartupTimeline()
@@ -0,0 +1,144 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+# Local stand-in for a network camera: serves a video file (or a moving test
+# pattern) as an MJPEG stream over HTTP, looping at the file's frame rate.
+# Connections can be cut on demand or every `drop_every` seconds, to exercise
+# reconnection:
+#
+#   python stream_stub.py footage.mp4 --port 8554 --drop-every 20
+#
+# and add http://127.0.0.1:8554/stream.mjpg as a network camera.
+
+_BOUNDARY = "frame"
+
+
+class StreamState:
+    def __init__(self, video=None, fps=15.0, width=640, height=360, drop_every=None):
+        self.video = video
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.drop_every = drop_every
+        self.lock = threading.Lock()
+        self.clients = 0
+        self.connections = 0
+        self.frames_sent = 0
+        # Set to cut every open connection once.
+        self.drop = threading.Event()
+        # While set, new connections are refused with 503 (camera offline).
+        self.offline = threading.Event()
+
+
+def _frames(state):
+    if state.video:
+        cap = cv2.VideoCapture(state.video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or state.fps
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    ret, frame = cap.read()
+                    if not ret:
+                        return
+                yield fps, frame
+        finally:
+            cap.release()
+    n = 0
+    while True:
+        frame = np.full((state.height, state.width, 3), 40, np.uint8)
+        x = (n * 8) % state.width
+        cv2.rectangle(frame, (x, state.height // 3), (x + 60, state.height // 3 + 40), (0, 200, 255), -1)
+        cv2.putText(frame, str(n), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        n += 1
+        yield state.fps, frame
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def do_GET(self):
+        state = self.state
+        if state.offline.is_set():
+            self.send_error(503, "Camera offline")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={_BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        with state.lock:
+            state.clients += 1
+            state.connections += 1
+        started = time.monotonic()
+        next_due = started
+        try:
+            for fps, frame in _frames(state):
+                if state.drop.is_set() or state.offline.is_set():
+                    break
+                if state.drop_every and time.monotonic() - started >= state.drop_every:
+                    break
+                ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+                if not ok:
+                    continue
+                data = jpeg.tobytes()
+                self.wfile.write(
+                    f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+                )
+                self.wfile.write(data)
+                self.wfile.write(b"\r\n")
+                with state.lock:
+                    state.frames_sent += 1
+                next_due += 1.0 / fps
+                time.sleep(max(0.0, next_due - time.monotonic()))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with state.lock:
+                state.clients -= 1
+                if state.clients == 0:
+                    state.drop.clear()
+
+    def log_message(self, format, *args):
+        print(f"[StreamStub] {format % args}")
+
+
+def start_stream_server(video=None, host="127.0.0.1", port=0, fps=15.0, drop_every=None):
+    state = StreamState(video, fps, drop_every=drop_every)
+    handler = type("BoundStreamHandler", (StreamHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="StreamStub", daemon=True)
+    thread.start()
+    return server, state
+
+
+def stream_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/stream.mjpg"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MJPEG-over-HTTP stand-in for a network camera.")
+    parser.add_argument("video", nargs="?", help="Video file to serve (a test pattern if omitted)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8554)
+    parser.add_argument("--fps", type=float, default=15.0, help="Frame rate of the test pattern")
+    parser.add_argument("--drop-every", type=float, help="Cut each connection after this many seconds")
+    args = parser.parse_args()
+    server, _ = start_stream_server(args.video, args.host, args.port, args.fps, args.drop_every)
+    print(f"[StreamStub] Serving {stream_url(server)}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-ins for S3 and the Twilio REST API, used to exercise the alert
+# path without network access or real credentials (see tests/test_alert_dispatcher.py):
+#
+#   server, state = start_stub_server()
+#   CFG.S3_ENDPOINT_URL = CFG.TWILIO_API_URL = f"http://127.0.0.1:{server.server_address[1]}"
+#
+# with AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY and AWS_DEFAULT_REGION set to
+# any value.
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.messages = []
+        # Number of upcoming requests to answer with 503, to exercise retries.
+        self.fail_next = 0
+        # Cleared to hold every request until it is set again, to fill queues.
+        self.release = threading.Event()
+        self.release.set()
+        # Seconds every request takes, to simulate a slow network.
+        self.latency = 0.0
+        self.requests = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def _should_fail(self):
+        self.state.release.wait()
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        with self.state.lock:
+            self.state.requests += 1
+            if self.state.fail_next > 0:
+                self.state.fail_next -= 1
+                return True
+        return False
+
+    def _reply(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_PUT(self):
+        data = self._read_body()
+        if self._should_fail():
+            self._reply(503, b"<Error><Code>SlowDown</Code></Error>", "application/xml")
+            return
+        with self.state.lock:
+            self.state.objects[self.path] = data
+        self._reply(200, headers={"ETag": '"' + uuid.uuid4().hex + '"'})
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        with self.state.lock:
+            data = self.state.objects.get(path)
+        if data is None:
+            self._reply(404, b"<Error><Code>NoSuchKey</Code></Error>", "application/xml")
+        else:
+            self._reply(200, data, "image/jpeg")
+
+    def do_POST(self):
+        body = self._read_body().decode("utf-8", "replace")
+        if self._should_fail():
+            self._reply(503, json.dumps({"code": 20503, "message": "Service unavailable"}).encode())
+            return
+        if "/Messages.json" not in self.path:
+            self._reply(404, json.dumps({"code": 20404, "message": "Not found"}).encode())
+            return
+        sid = "SM" + uuid.uuid4().hex
+        with self.state.lock:
+            self.state.messages.append(body)
+        self._reply(201, json.dumps({"sid": sid, "status": "queued"}).encode())
+
+    def log_message(self, format, *args):
+        print(f"[StubEndpoints] {format % args}")
+
+
+def start_stub_server(host="127.0.0.1", port=0):
+    state = StubState()
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="StubEndpoints", daemon=True)
+    thread.start()
+    return server, state
+
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CFG  # noqa: E402
+from event_store import EventStore  # noqa: E402
+from stub_endpoints import start_stub_server  # noqa: E402
+import s3  # noqa: E402
+import twilio_messages  # noqa: E402
+
+
+# S3 and Twilio clients pointed at a local stub server, with botocore's own
+# retries off so that retries are the dispatcher's.
+@pytest.fixture
+def stub(monkeypatch):
+    server, state = start_stub_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "stub")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "stub")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_MAX_ATTEMPTS", "1")
+    monkeypatch.setattr(CFG, "S3_ENDPOINT_URL", url)
+    monkeypatch.setattr(CFG, "TWILIO_API_URL", url)
+    monkeypatch.setattr(s3, "_client", None)
+    monkeypatch.setattr(twilio_messages, "_client", None)
+    yield state
+    state.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def event_store(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"), flush_interval=0.05)
+    yield store
+    store.close()
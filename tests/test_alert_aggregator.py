@@ -0,0 +1,75 @@
+import datetime
+import queue
+
+import numpy as np
+
+from alert_aggregator import AlertAggregator
+from alert_dispatcher import AlertDispatcher
+
+
+def _aggregator(event_store, tmp_path, window):
+    dispatcher = AlertDispatcher(workers=1, queue_size=4, retry_backoff=0.01, save_local=False,
+                                 event_store=event_store)
+    aggregator = AlertAggregator(dispatcher, event_store, window=window, cooldown=60.0,
+                                 state_path=str(tmp_path / "alert_state.json"))
+    return aggregator, dispatcher
+
+
+def _offer(aggregator, cam_id, label, track_id):
+    frame = np.zeros((48, 64, 3), np.uint8)
+    return aggregator.offer(cam_id, label, 0.9, frame, (1, 2, 30, 40), ["380000000000"],
+                            datetime.datetime.now(), track_id, "run-1")
+
+
+def _stop(aggregator, dispatcher, event_store):
+    aggregator.stop()
+    dispatcher.stop(drain=True)
+    event_store.flush()
+    return event_store.query(newest_first=False)
+
+
+# Without a digest window the alert is sent from inside offer(); its
+# "queued" row must already be in the store when the outcome is written.
+def test_immediate_alert_is_recorded_before_it_is_sent(stub, event_store, tmp_path):
+    aggregator, dispatcher = _aggregator(event_store, tmp_path, window=0)
+    alert_id = _offer(aggregator, 0, "tank", 7)
+    assert alert_id is not None
+    assert _offer(aggregator, 0, "tank", 8) is None
+    events = _stop(aggregator, dispatcher, event_store)
+    assert [(e["alert_id"], e["alert_state"], e["track_id"], e["run_id"]) for e in events] == [
+        (alert_id, "sent", 7, "run-1")]
+    assert len(stub.messages) == 1
+
+
+def test_digest_records_every_alert(stub, event_store, tmp_path):
+    aggregator, dispatcher = _aggregator(event_store, tmp_path, window=60.0)
+    alert_id = _offer(aggregator, 0, "tank", 1)
+    assert _offer(aggregator, 1, "apc", 2) == alert_id
+    events = _stop(aggregator, dispatcher, event_store)
+    assert sorted((e["camera"], e["label"], e["alert_state"]) for e in events) == [
+        ("0", "tank", "sent"), ("1", "apc", "sent")]
+    assert {e["alert_id"] for e in events} == {alert_id}
+    assert len(stub.objects) == 1
+
+
+# A worker process's aggregator applies the cooldown and forwards what it
+# accepts; the GUI process's aggregator digests alerts from every worker.
+def test_forwarded_alerts_share_one_digest(stub, event_store, tmp_path):
+    aggregator, dispatcher = _aggregator(event_store, tmp_path, window=60.0)
+    forwarded = queue.Queue()
+    workers = [AlertAggregator(forward=forwarded.put, window=60.0, cooldown=60.0,
+                               state_path=str(tmp_path / f"worker{i}.json")) for i in range(2)]
+    try:
+        assert _offer(workers[0], 0, "tank", 1) is True
+        assert _offer(workers[0], 0, "tank", 2) is None
+        assert _offer(workers[1], 1, "tank", 3) is True
+    finally:
+        for worker in workers:
+            worker.stop()
+    alert_ids = {aggregator.add(forwarded.get_nowait()) for _ in range(2)}
+    assert forwarded.empty()
+    events = _stop(aggregator, dispatcher, event_store)
+    assert sorted((e["camera"], e["alert_state"]) for e in events) == [("0", "sent"), ("1", "sent")]
+    assert {e["alert_id"] for e in events} == alert_ids
+    assert len(alert_ids) == 1
+    assert len(stub.messages) == 1
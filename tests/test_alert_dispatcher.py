@@ -0,0 +1,103 @@
+import datetime
+import time
+
+import numpy as np
+import pytest
+
+from alert_dispatcher import AlertDispatcher, AlertJob
+from config import CFG
+
+
+def _job(label="tank"):
+    frame = np.zeros((48, 64, 3), np.uint8)
+    return AlertJob(0, label, 0.9, frame, ["380000000000"], datetime.datetime.now(), xyxy=(1, 2, 30, 40))
+
+
+def _dispatcher(event_store, **kwargs):
+    options = dict(workers=1, queue_size=4, retry_backoff=0.01, save_local=False, event_store=event_store)
+    options.update(kwargs)
+    return AlertDispatcher(**options)
+
+
+# Submits jobs the way the aggregator does: the "queued" row first.
+def _submit(dispatcher, event_store, job):
+    event_store.record(job.cam_id, job.label, job.conf, job.xyxy, alert_state="queued",
+                       alert_id=job.alert_id, detected_at=job.detected_at)
+    return dispatcher.submit(job)
+
+
+def _states(event_store):
+    event_store.flush()
+    return {event["alert_id"]: event["alert_state"] for event in event_store.query()}
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_sends_upload_and_message(stub, event_store):
+    dispatcher = _dispatcher(event_store)
+    job = _job()
+    assert _submit(dispatcher, event_store, job)
+    dispatcher.stop(drain=True)
+    assert len(stub.objects) == 1
+    assert len(stub.messages) == 1
+    assert "tank" in stub.messages[0]
+    assert _states(event_store) == {job.alert_id: "sent"}
+    assert event_store.query()[0]["s3_key"] == job.s3_key
+
+
+def test_retries_after_503(stub, event_store):
+    stub.fail_next = 1
+    dispatcher = _dispatcher(event_store, max_retries=2)
+    job = _job()
+    _submit(dispatcher, event_store, job)
+    dispatcher.stop(drain=True)
+    stats = dispatcher.get_stats()
+    assert stats["retries"] == 1
+    assert stats["completed"] == 1
+    assert job.attempts == 2
+    assert len(stub.objects) == 1
+    assert len(stub.messages) == 1
+    assert _states(event_store) == {job.alert_id: "sent"}
+
+
+def test_gives_up_after_max_retries(stub, event_store):
+    stub.fail_next = 100
+    dispatcher = _dispatcher(event_store, max_retries=1)
+    job = _job()
+    _submit(dispatcher, event_store, job)
+    dispatcher.stop(drain=True)
+    assert dispatcher.get_stats()["failed"] == 1
+    assert job.attempts == 2
+    assert not stub.messages
+    assert _states(event_store) == {job.alert_id: "failed"}
+
+
+# One worker held inside the stub with the first job and a one-slot queue
+# holding the second: the third job finds the queue full.
+@pytest.mark.parametrize("policy, dropped", [("drop_new", 2), ("drop_oldest", 1), ("block", 2)])
+def test_full_queue_policies(stub, event_store, monkeypatch, policy, dropped):
+    monkeypatch.setattr(CFG, "ALERT_BLOCK_TIMEOUT", 0.2)
+    dispatcher = _dispatcher(event_store, queue_size=1, policy=policy)
+    jobs = [_job(f"class{i}") for i in range(3)]
+    stub.release.clear()
+    _submit(dispatcher, event_store, jobs[0])
+    _wait_until(lambda: dispatcher.queue_depth() == 0)
+    _submit(dispatcher, event_store, jobs[1])
+    started = time.monotonic()
+    accepted = _submit(dispatcher, event_store, jobs[2])
+    waited = time.monotonic() - started
+    assert accepted == (policy == "drop_oldest")
+    if policy == "block":
+        assert waited >= 0.2
+    stub.release.set()
+    dispatcher.stop(drain=True)
+    expected = {job.alert_id: "sent" for job in jobs}
+    expected[jobs[dropped].alert_id] = "dropped"
+    assert _states(event_store) == expected
+    assert dispatcher.get_stats()["dropped"] == 1
+    assert len(stub.messages) == 2
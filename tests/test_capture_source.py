@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from capture_source import CaptureSource
+from config import CFG
+from stream_stub import start_stream_server, stream_url
+
+
+def _read_until(capture, predicate, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate(capture.read()):
+            return
+    raise AssertionError(f"timed out in state {capture.state!r}: {capture.last_error}")
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    monkeypatch.setattr(CFG, "STREAM_MAX_READ_FAILURES", 2)
+    monkeypatch.setattr(CFG, "STREAM_RECONNECT_BACKOFF", 0.2)
+    monkeypatch.setattr(CFG, "STREAM_MAX_RECONNECT_BACKOFF", 1.0)
+    monkeypatch.setattr(CFG, "STREAM_OPEN_TIMEOUT_MS", 2000)
+    monkeypatch.setattr(CFG, "STREAM_READ_TIMEOUT_MS", 2000)
+    server, state = start_stream_server(fps=30.0)
+    yield server, state
+    server.shutdown()
+    server.server_close()
+
+
+def test_dropped_stream_reconnects_after_backoff(stream):
+    server, state = stream
+    capture = CaptureSource(stream_url(server), name="stub")
+    try:
+        _read_until(capture, lambda frame: frame is not None)
+        assert capture.state == "live"
+        assert capture.reconnects == 0
+
+        # The camera goes offline: the open connection is cut and new ones
+        # are refused until it comes back.
+        state.offline.set()
+        _read_until(capture, lambda frame: capture.state == "reconnecting")
+        dropped_at = time.monotonic()
+        assert capture.health()["connected"] is False
+        _read_until(capture, lambda frame: capture.last_error == "could not open")
+        assert capture.state == "reconnecting"
+
+        state.offline.clear()
+        _read_until(capture, lambda frame: frame is not None)
+        # Two waits: the backoff before the refused attempt and the doubled
+        # one before the attempt that succeeded.
+        assert time.monotonic() - dropped_at >= 3 * CFG.STREAM_RECONNECT_BACKOFF - 0.05
+        assert capture.state == "live"
+        assert capture.reconnects == 1
+        assert capture.connects == 2
+        assert state.connections == 2
+    finally:
+        capture.release()
@@ -0,0 +1,34 @@
+import sqlite3
+
+from event_store import EventStore
+
+
+def test_distinct_tracks_are_counted_per_run(event_store):
+    box = (0, 0, 10, 10)
+    for run_id in ("run-a", "run-b"):
+        for _ in range(3):
+            event_store.record("1", "car", 0.9, box, track_id=1, run_id=run_id)
+    event_store.record("1", "car", 0.9, box)
+    event_store.flush()
+    assert event_store.count(label="car") == 7
+    assert event_store.count(label="car", distinct_tracks=True) == 3
+
+
+def test_database_without_run_id_is_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, ts REAL NOT NULL, camera TEXT NOT NULL, "
+                 "label TEXT NOT NULL, conf REAL NOT NULL, x1 REAL, y1 REAL, x2 REAL, y2 REAL, track_id INTEGER, "
+                 "alert_state TEXT NOT NULL, alert_id TEXT, file_path TEXT, s3_key TEXT)")
+    conn.execute("INSERT INTO events (ts, camera, label, conf, track_id, alert_state) "
+                 "VALUES (1.0, '1', 'car', 0.9, 1, 'none')")
+    conn.commit()
+    conn.close()
+    store = EventStore(path, flush_interval=0.05)
+    try:
+        store.record("1", "car", 0.9, (0, 0, 10, 10), track_id=1, run_id="new")
+        store.flush()
+        assert store.count(label="car", distinct_tracks=True) == 2
+        assert [event["run_id"] for event in store.query(newest_first=False)] == [None, "new"]
+    finally:
+        store.close()
@@ -0,0 +1,39 @@
+import datetime
+import os
+
+import numpy as np
+
+from snapshot_store import SnapshotStore
+
+TIERS = {"full": {"format": "jpg", "quality": 95, "quota_mb": 0.05}}
+
+
+def _frame(seed):
+    return np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+
+
+def _bytes_on_disk(root):
+    return sum(os.path.getsize(os.path.join(d, name))
+               for d, _, names in os.walk(os.path.join(root, "full")) for name in names)
+
+
+# Two stores on one folder, as two processes would have: the quota holds
+# for the files of both together.
+def test_quota_counts_files_of_every_store(tmp_path):
+    root = str(tmp_path / "snapshots")
+    stores = [SnapshotStore(root, TIERS), SnapshotStore(root, TIERS)]
+    now = datetime.datetime.now()
+    for i in range(40):
+        stores[i % 2].save(f"alert{i}", now, _frame(i))
+    for store in stores:
+        store.close()
+    quota = TIERS["full"]["quota_mb"] * 1024 * 1024
+    assert sum(store.evicted for store in stores) > 0
+    assert _bytes_on_disk(root) <= quota
+    reopened = SnapshotStore(root, TIERS)
+    try:
+        stats = reopened.get_stats()
+        assert stats["bytes"]["full"] == _bytes_on_disk(root)
+        assert stats["files"]["full"] == sum(len(names) for _, _, names in os.walk(os.path.join(root, "full")))
+    finally:
+        reopened.close()
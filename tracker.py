@@ -0,0 +1,143 @@
+import cv2
+import numpy as np
+
+from config import CFG
+from detections import Detections, box_iou
+
+
+# Keeps boxes alive between detection keyframes. On a keyframe `update`
+# matches detections to tracks by IoU (per class) and keeps their ids; in
+# between, `propagate` moves every box by the median optical flow of points
+# sampled inside it, falling back to the track's constant-velocity prediction
+# when the flow is lost.
+class BoxTracker:
+    def __init__(self, iou_threshold=CFG.TRACK_IOU_THRESHOLD, max_misses=CFG.TRACK_MAX_MISSES,
+                 flow_scale=CFG.TRACK_FLOW_SCALE, velocity_gain=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.flow_scale = flow_scale
+        self.velocity_gain = velocity_gain
+        self.reset()
+
+    def reset(self):
+        self.next_id = 1
+        self.boxes = np.zeros((0, 4), np.float32)
+        self.velocity = np.zeros((0, 4), np.float32)
+        self.conf = np.zeros(0, np.float32)
+        self.cls = np.zeros(0, int)
+        self.ids = np.zeros(0, int)
+        self.misses = np.zeros(0, int)
+        self.frames_since_update = np.zeros(0, int)
+        self._prev_gray = None
+
+    def current(self):
+        live = self.misses == 0
+        return Detections(self.boxes[live], self.conf[live], self.cls[live], self.ids[live])
+
+    # Mean speed of the live tracks, in pixels per frame.
+    def motion(self):
+        live = self.misses == 0
+        if not live.any():
+            return 0.0
+        v = self.velocity[live]
+        return float(np.mean(np.hypot((v[:, 0] + v[:, 2]) / 2, (v[:, 1] + v[:, 3]) / 2)))
+
+    def keyframe_interval(self, default_interval, min_interval=CFG.KEYFRAME_MIN_INTERVAL,
+                          max_interval=CFG.KEYFRAME_MAX_INTERVAL, max_drift=CFG.TRACK_MAX_DRIFT_PX):
+        if not (self.misses == 0).any():
+            return default_interval
+        speed = self.motion()
+        if speed <= 1e-3:
+            return max_interval
+        return int(np.clip(max_drift / speed, min_interval, max_interval))
+
+    def predict(self, steps=1):
+        self.boxes = self.boxes + self.velocity * steps
+        self.frames_since_update += steps
+        return self.current()
+
+    def propagate(self, gray):
+        small = self._downscale(gray)
+        prev, self._prev_gray = self._prev_gray, small
+        if prev is None or len(self.boxes) == 0 or prev.shape != small.shape:
+            return self.predict()
+        points, owners = self._sample_points(self.boxes * self.flow_scale, small.shape)
+        if len(points) == 0:
+            return self.predict()
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(
+            prev, small, points.reshape(-1, 1, 2), None, winSize=(15, 15), maxLevel=2
+        )
+        flow = (moved.reshape(-1, 2) - points) / self.flow_scale
+        ok = status.reshape(-1) == 1
+        for i in range(len(self.boxes)):
+            sel = ok & (owners == i)
+            if sel.sum() >= 3:
+                dx, dy = np.median(flow[sel], axis=0)
+                step = np.array([dx, dy, dx, dy], np.float32)
+                self.velocity[i] += self.velocity_gain * (step - self.velocity[i])
+            else:
+                step = self.velocity[i]
+            self.boxes[i] = self.boxes[i] + step
+        self.frames_since_update += 1
+        return self.current()
+
+    def update(self, detections, gray=None):
+        if gray is not None:
+            self._prev_gray = self._downscale(gray)
+        det_boxes = detections.xyxy.astype(np.float32)
+        iou = box_iou(self.boxes, det_boxes)
+        iou[self.cls[:, None] != detections.cls[None, :]] = 0.0
+        matched_tracks = np.zeros(len(self.boxes), bool)
+        matched_dets = np.zeros(len(det_boxes), bool)
+        for t, d in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+            if iou[t, d] < self.iou_threshold:
+                break
+            if matched_tracks[t] or matched_dets[d]:
+                continue
+            matched_tracks[t] = matched_dets[d] = True
+            dt = max(1, self.frames_since_update[t])
+            measured_velocity = (det_boxes[d] - self.boxes[t]) / dt
+            self.velocity[t] += self.velocity_gain * measured_velocity
+            self.boxes[t] = det_boxes[d]
+            self.conf[t] = detections.conf[d]
+            self.misses[t] = 0
+            self.frames_since_update[t] = 0
+
+        self.misses[~matched_tracks] += 1
+        keep = self.misses <= self.max_misses
+        new = ~matched_dets
+        count = int(new.sum())
+        self.boxes = np.concatenate([self.boxes[keep], det_boxes[new]])
+        self.velocity = np.concatenate([self.velocity[keep], np.zeros((count, 4), np.float32)])
+        self.conf = np.concatenate([self.conf[keep], detections.conf[new]])
+        self.cls = np.concatenate([self.cls[keep], detections.cls[new]])
+        self.ids = np.concatenate([self.ids[keep], np.arange(self.next_id, self.next_id + count)])
+        self.misses = np.concatenate([self.misses[keep], np.zeros(count, int)])
+        self.frames_since_update = np.concatenate([self.frames_since_update[keep], np.zeros(count, int)])
+        self.next_id += count
+        return self.current()
+
+    def _downscale(self, gray):
+        if self.flow_scale == 1.0:
+            return gray
+        return cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _sample_points(boxes, shape, grid=4):
+        h, w = shape[:2]
+        points = []
+        owners = []
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            x1, x2 = np.clip([x1, x2], 0, w - 1)
+            y1, y2 = np.clip([y1, y2], 0, h - 1)
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            # Inner grid, away from the box border where the background dominates.
+            xs = np.linspace(x1, x2, grid + 2)[1:-1]
+            ys = np.linspace(y1, y2, grid + 2)[1:-1]
+            gx, gy = np.meshgrid(xs, ys)
+            points.append(np.stack([gx.ravel(), gy.ravel()], axis=1))
+            owners.append(np.full(grid * grid, i))
+        if not points:
+            return np.zeros((0, 2), np.float32), np.zeros(0, int)
+        return np.concatenate(points).astype(np.float32), np.concatenate(owners)
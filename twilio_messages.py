@@ -1,7 +1,25 @@
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+import threading
+
+from config import CFG
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_twilio_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = Client("key", "key", http_client=TwilioHttpClient(pool_connections=True))
+            if CFG.TWILIO_API_URL:
+                _client.api.base_url = CFG.TWILIO_API_URL
+        return _client
+
 
 def send_warning(image_url: str, to: str, warning: str):
-    client = Client("key", "key")
+    client = get_twilio_client()
 
     message = client.messages.create(
         body=f"Detected equipment: {warning}.",
@@ -10,4 +28,4 @@ def send_warning(image_url: str, to: str, warning: str):
         to=f"whatsapp:+{to}"
     )
 
-    print("Created message SID:", message.sid)
\ No newline at end of file
+    print("Created message SID:", message.sid)
@@ -0,0 +1,135 @@
+import bisect
+import math
+import shutil
+import subprocess
+import threading
+
+import cv2
+
+from config import CFG
+
+
+# Built in the background when a video file opens: the keyframe positions
+# (from ffprobe, when it is installed) and low-resolution preview frames
+# decoded at keyframes or at evenly spaced positions through the file. The
+# player uses the keyframes to seek by decoding forward from the nearest
+# keyframe (or from the current position when that is closer), and the
+# previews to show something immediately while the slider is being dragged.
+class VideoIndex:
+    def __init__(self, path, max_previews=CFG.PREVIEW_MAX_FRAMES, preview_width=CFG.PREVIEW_WIDTH):
+        self.path = path
+        self.max_previews = max_previews
+        self.preview_width = preview_width
+        self.keyframes = []
+        self.keyframes_ready = threading.Event()
+        self.previews_ready = threading.Event()
+        self._preview_frames = []
+        self._previews = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._build, name="VideoIndex", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # Last keyframe at or before `frame_num`, or None if unknown.
+    def keyframe_before(self, frame_num):
+        if not self.keyframes_ready.is_set() or not self.keyframes:
+            return None
+        i = bisect.bisect_right(self.keyframes, frame_num)
+        return self.keyframes[i - 1] if i else None
+
+    # Nearest preview at or before `frame_num` (or the first one after it).
+    def preview(self, frame_num):
+        frames = self._preview_frames
+        if not frames:
+            return None
+        i = bisect.bisect_right(frames, frame_num)
+        return self._previews[frames[max(0, i - 1)]]
+
+    def _build(self):
+        try:
+            self._probe_keyframes()
+        finally:
+            self.keyframes_ready.set()
+        try:
+            self._sample_previews()
+        finally:
+            self.previews_ready.set()
+
+    def _probe_keyframes(self):
+        ffprobe = shutil.which("ffprobe")
+        if ffprobe is None:
+            return
+        cap = cv2.VideoCapture(self.path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        if not fps or fps <= 0:
+            return
+        try:
+            # Reads the stream start time and packet flags only, without
+            # decoding. Lines are "stream,<start_time>" and
+            # "packet,<pts_time>,<flags>".
+            output = subprocess.run(
+                [ffprobe, "-v", "error", "-select_streams", "v:0",
+                 "-show_entries", "stream=start_time:packet=pts_time,flags", "-of", "csv", self.path],
+                capture_output=True, text=True, timeout=CFG.PREVIEW_PROBE_TIMEOUT, check=True,
+            ).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"[VideoIndex] ffprobe failed for {self.path}: {e}")
+            return
+        # Frame numbers count from the first frame, so timestamps are taken
+        # relative to the stream's start time (often non-zero in MPEG-TS and
+        # trimmed files).
+        start = 0.0
+        packets = []
+        for line in output.splitlines():
+            fields = line.split(",")
+            try:
+                if fields[0] == "stream":
+                    start = float(fields[1])
+                elif fields[0] == "packet" and len(fields) > 2 and "K" in fields[2]:
+                    packets.append(float(fields[1]))
+            except (IndexError, ValueError):
+                continue
+        self.keyframes = sorted({max(0, int(round((pts - start) * fps))) for pts in packets})
+
+    # Up to max_previews frames: the keyframes (spread evenly when there are
+    # more), or evenly spaced positions when there is no keyframe index.
+    def _preview_positions(self, total):
+        if self.keyframes:
+            points = self.keyframes
+        elif total > 0:
+            points = range(total)
+        else:
+            return []
+        step = max(1, math.ceil(len(points) / self.max_previews))
+        return list(points[::step])
+
+    # Seeks to each sampled position and decodes one frame there, so a long
+    # file costs max_previews decodes (plus, without a keyframe index, the
+    # backend decoding forward from the keyframe before each position) rather
+    # than a pass over every frame. Consecutive positions are read without
+    # seeking.
+    def _sample_previews(self):
+        cap = cv2.VideoCapture(self.path)
+        position = 0
+        for frame_num in self._preview_positions(int(cap.get(cv2.CAP_PROP_FRAME_COUNT))):
+            if self._stop.is_set():
+                break
+            if frame_num != position and not cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num):
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            position = frame_num + 1
+            h, w = frame.shape[:2]
+            width = min(self.preview_width, w)
+            self._previews[frame_num] = cv2.resize(
+                frame, (width, max(1, h * width // w)), interpolation=cv2.INTER_AREA
+            )
+            self._preview_frames.append(frame_num)
+        cap.release()
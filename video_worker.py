@@ -0,0 +1,371 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from capture_source import CaptureSource, is_stream_url, redact_url
+from config import CFG
+from detection_cache import DetectionCache
+from detections import class_ids_for, draw_detections
+import metrics
+from model_registry import get_server
+from tracker import BoxTracker
+from video_index import VideoIndex
+
+
+# Decodes, detects and annotates frames for VideoPlayerWidget off the GUI
+# thread. Only the newest annotated frame is kept: if the GUI has not picked
+# up the previous one yet it is overwritten and counted in `frames_dropped`.
+# Video files are paced by their own timestamps at `speed`; when processing
+# falls behind, frames are skipped with grab() and counted in `frames_skipped`.
+# Published frames are already scaled to `set_display_size`; the GUI hands
+# them back with `recycle` so their buffers are reused for later frames.
+# Detections of video files are cached per frame (DetectionCache), so replays
+# and seeks back only run the model on frames it has not seen yet. Cameras
+# and stream URLs are read through a CaptureSource instead, which reconnects
+# a dropped stream; they have no index, cache or seeking.
+class VideoWorker(QThread):
+    frame_ready = pyqtSignal()
+    playback_finished = pyqtSignal()
+
+    def __init__(self, source, frame_interval, enabled_objects=None, enabled_alerts=None, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.frame_interval = frame_interval
+        self.detection_interval = 15
+        self.stop_flag = False
+        self.is_paused = False
+        self.total_frames = 0
+        self.current_frame = 0
+        self.frames_published = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self.behind_seconds = 0.0
+        self.max_behind_seconds = 0.0
+        self.speed = 1.0
+        self.index = None
+        self.cache = None
+        self.capture = None
+        self.server = get_server()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._display_size = None
+        self._display_shape = None
+        self._free_buffers = []
+        self._seek_to = None
+        self._enabled_objects = list(enabled_objects or [])
+        self._enabled_alerts = list(enabled_alerts or [])
+        self._object_ids = None
+        self._alert_ids = None
+        self._detect_ids = None
+        self._last_detections = None
+        self._frames_since_detection = 0
+        self.tracker = BoxTracker() if CFG.TRACKING_ENABLED else None
+        self._m_decode = metrics.STAGE_SECONDS.labels("player", "capture")
+        self._m_inference = metrics.STAGE_SECONDS.labels("player", "inference")
+        self._m_postprocess = metrics.STAGE_SECONDS.labels("player", "postprocess")
+        self._m_annotate = metrics.STAGE_SECONDS.labels("player", "annotate")
+        self._m_render = metrics.STAGE_SECONDS.labels("player", "render")
+        self._m_captured = metrics.FRAMES_CAPTURED.labels("player")
+        self._m_dropped = metrics.FRAMES_DROPPED.labels("player")
+        self._m_analyzed = metrics.FRAMES_ANALYZED.labels("player")
+        self._fps = metrics.FpsMeter("player")
+        self._m_behind = metrics.PLAYBACK_BEHIND.labels("player")
+        self._overlay = CFG.METRICS_OVERLAY and metrics.ENABLED
+
+    def update_config(self, enabled_objects, enabled_alerts):
+        with self._lock:
+            self._enabled_objects = list(enabled_objects)
+            self._enabled_alerts = list(enabled_alerts)
+            self._object_ids = None
+            self._last_detections = None
+
+    def set_speed(self, speed):
+        self.speed = float(np.clip(speed, min(CFG.PLAYBACK_SPEEDS), max(CFG.PLAYBACK_SPEEDS)))
+
+    def pause(self):
+        self.is_paused = not self.is_paused
+
+    def seek(self, frame_num):
+        with self._lock:
+            self._seek_to = frame_num
+
+    def set_display_size(self, width, height):
+        with self._lock:
+            self._display_size = (max(1, int(width)), max(1, int(height)))
+
+    def recycle(self, frame):
+        with self._lock:
+            if frame.shape == self._display_shape and len(self._free_buffers) < 3:
+                self._free_buffers.append(frame)
+
+    def take_frame(self):
+        with self._lock:
+            frame, self._latest = self._latest, None
+        return frame
+
+    def stop(self):
+        self.stop_flag = True
+        if self.capture is not None:
+            # Interrupts a reconnect backoff.
+            self.capture.close()
+
+    def run(self):
+        if not isinstance(self.source, str) or is_stream_url(self.source):
+            self.capture = CaptureSource(
+                self.source, max_fps=1.0 / self.frame_interval if self.frame_interval > 0 else None
+            )
+            try:
+                self._run_live()
+            finally:
+                self.capture.release()
+            return
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print(f"Error opening video: {redact_url(self.source)}")
+            self.playback_finished.emit()
+            return
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.index = VideoIndex(self.source).start()
+        self.cache = self._open_cache()
+        self._run_file(cap)
+        self.index.stop()
+        cap.release()
+        if self.cache is not None:
+            self.cache.close()
+            print(f"[VideoWorker] Detection cache: {self.cache.hits} frames reused, "
+                  f"{self.cache.misses} detected.")
+        if self.frames_skipped or self.max_behind_seconds:
+            print(f"[VideoWorker] Playback: {self.frames_skipped} frames skipped to keep up, "
+                  f"at most {self.max_behind_seconds:.2f} s behind real time.")
+
+    def _open_cache(self):
+        if not CFG.DETECTION_CACHE_ENABLED:
+            return None
+        try:
+            return DetectionCache.open(self.source, weights=self.server.weights, backend=self.server.backend)
+        except Exception as e:
+            print(f"[VideoWorker] Detection cache disabled for {self.source}: {e}")
+            return None
+
+    # The capture paces the stream to frame_interval (max_fps) and reconnects
+    # it when it drops, so there is no end of playback here. While paused the
+    # stream keeps being read, so it stays current and connected.
+    def _run_live(self):
+        while not self.stop_flag:
+            with self._m_decode.time():
+                frame = self.capture.read()
+            if frame is None or self.is_paused:
+                continue
+            self.current_frame += 1
+            self._m_captured.inc()
+            self._detect_and_draw(frame)
+            self._publish(frame)
+
+    # The playback clock is anchored at (wall time, media time, speed) and
+    # re-anchored after a pause, a seek or a speed change, so a frame with
+    # timestamp `ts` is due at wall + (ts - media) / speed.
+    def _run_file(self, cap):
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        period = 1.0 / fps if fps and fps > 0 else self.frame_interval
+        # At most one second of video is skipped between two displayed frames.
+        max_skip = max(1, int(round(1.0 / period)))
+        anchor = None
+        media_ts = 0.0
+        while not self.stop_flag:
+            if self._apply_seek(cap):
+                anchor = None
+            if self.is_paused:
+                time.sleep(0.02)
+                anchor = None
+                continue
+            speed = self.speed
+            if anchor is not None and anchor[2] != speed:
+                anchor = (time.monotonic(), media_ts, speed)
+            skipped = 0
+            while (anchor is not None and skipped < max_skip
+                   and time.monotonic() - self._due(anchor, media_ts + period) > period / speed):
+                # grab() advances without converting the frame to an image.
+                if not cap.grab():
+                    break
+                self.current_frame += 1
+                media_ts = self._timestamp(cap, period)
+                skipped += 1
+            if skipped:
+                self.frames_skipped += skipped
+                self._m_dropped.inc(skipped)
+            with self._m_decode.time():
+                ret, frame = cap.read()
+            if not ret:
+                self.playback_finished.emit()
+                break
+            self.current_frame += 1
+            self._m_captured.inc()
+            media_ts = self._timestamp(cap, period)
+            if anchor is None:
+                anchor = (time.monotonic(), media_ts, speed)
+            self._detect_and_draw(frame)
+            delay = self._due(anchor, media_ts) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # How far the shown position trails the playback clock, in video seconds.
+            self.behind_seconds = max(0.0, -delay) * speed
+            self.max_behind_seconds = max(self.max_behind_seconds, self.behind_seconds)
+            self._m_behind.set(self.behind_seconds)
+            self._publish(frame)
+
+    @staticmethod
+    def _due(anchor, ts):
+        wall, media, speed = anchor
+        return wall + (ts - media) / speed
+
+    def _timestamp(self, cap, period):
+        ts = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        # Some backends report no timestamps; fall back to the frame index.
+        if ts <= 0 and self.current_frame > 1:
+            ts = (self.current_frame - 1) * period
+        return ts
+
+    def _apply_seek(self, cap):
+        with self._lock:
+            frame_num, self._seek_to = self._seek_to, None
+        if frame_num is None:
+            return False
+        self._seek_capture(cap, frame_num)
+        self.current_frame = frame_num
+        self._last_detections = None
+        if self.is_paused:
+            # Show the exact frame now rather than on resume.
+            ret, frame = cap.read()
+            if ret:
+                self.current_frame += 1
+                self._detect_and_draw(frame)
+                self._publish(frame)
+        return True
+
+    # Decodes forward with grab() from the current position when the target
+    # is ahead and no farther than from its keyframe; otherwise jumps to the
+    # keyframe before the target first. Without a keyframe index, short
+    # forward seeks are grabbed and the rest left to the backend.
+    def _seek_capture(self, cap, target):
+        position = self.current_frame
+        keyframe = self.index.keyframe_before(target) if self.index else None
+        if keyframe is None:
+            if not 0 <= target - position <= CFG.SEEK_MAX_GRAB_FORWARD:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                return
+            start = position
+        elif keyframe <= position <= target:
+            start = position
+        else:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            start = keyframe
+        for _ in range(target - start):
+            if not cap.grab():
+                break
+
+    def _class_ids(self):
+        names = self.server.names
+        with self._lock:
+            if self._object_ids is None:
+                self._object_ids = class_ids_for(names, self._enabled_objects)
+                self._alert_ids = class_ids_for(names, self._enabled_alerts)
+                # Only classes that are drawn or alerted on are requested from the model.
+                self._detect_ids = np.union1d(self._object_ids, self._alert_ids)
+            return self._object_ids, self._alert_ids, self._detect_ids
+
+    def _detect_and_draw(self, frame):
+        try:
+            object_ids, alert_ids, detect_ids = self._class_ids()
+        except Exception as e:
+            print(f"Detection failed: {e}")
+            return
+        # Детекція лише на ключових кадрах; між ними рамки рухає трекер.
+        # Інтервал між ключовими кадрами залежить від швидкості руху об'єктів.
+        tracker = self.tracker
+        interval = tracker.keyframe_interval(self.detection_interval) if tracker else self.detection_interval
+        # Detections per second of wall time stay the same at any playback speed.
+        interval = max(1, int(round(interval * self.speed)))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if tracker else None
+        # A cached frame counts as a keyframe: its detections cost nothing.
+        frame_num = self.current_frame - 1
+        cached = self.cache.get(frame_num) if self.cache is not None else None
+        if cached is not None or self._last_detections is None or self._frames_since_detection >= interval:
+            try:
+                if cached is not None:
+                    detections = cached.select(detect_ids)
+                elif self.cache is not None:
+                    # All classes are cached, so changing the enabled classes keeps the cache valid.
+                    with self._m_inference.time():
+                        detections = self.server.predict(frame, CFG.DISPLAY_CONFIDENCE, source="player")
+                    self.cache.put(frame_num, detections)
+                    detections = detections.select(detect_ids)
+                else:
+                    with self._m_inference.time():
+                        detections = self.server.predict(frame, CFG.DISPLAY_CONFIDENCE, detect_ids, source="player")
+                if tracker:
+                    with self._m_postprocess.time():
+                        if self._last_detections is None:
+                            tracker.reset()
+                        else:
+                            tracker.propagate(gray)
+                        detections = tracker.update(detections, gray)
+                self._last_detections = detections
+                self._frames_since_detection = 0
+            except Exception as e:
+                print(f"Detection failed: {e}")
+        elif tracker:
+            with self._m_postprocess.time():
+                self._last_detections = tracker.propagate(gray)
+        self._frames_since_detection += 1
+        detections = self._last_detections
+
+        with self._m_annotate.time():
+            # Якщо є детекція на кадрі, накладаємо рамки та підписи
+            if detections is not None and len(detections) > 0:
+                draw_detections(
+                    frame, detections[detections.class_mask(object_ids)],
+                    self.server.names, (0, 255, 0)
+                )
+
+                # Тривога (якщо клас у списку сигналізацій), виділяємо межі червоним
+                if detections.class_mask(alert_ids).any():
+                    h, w, _ = frame.shape
+                    cv2.rectangle(frame, (0, 0), (w - 1, h - 1), (0, 0, 255), thickness=20)
+            if self._overlay:
+                metrics.draw_overlay(frame, metrics.overlay_lines("player"))
+
+    # Fits the annotated frame into the display size with a fast linear
+    # resize, writing into a recycled buffer when one of the right shape is free.
+    def _to_display(self, frame):
+        with self._lock:
+            size = self._display_size
+        if size is None:
+            return frame
+        h, w = frame.shape[:2]
+        scale = min(size[0] / w, size[1] / h)
+        target = (max(1, int(w * scale)), max(1, int(h * scale)))
+        shape = (target[1], target[0]) + frame.shape[2:]
+        with self._lock:
+            if shape != self._display_shape:
+                self._display_shape = shape
+                self._free_buffers.clear()
+            buffer = self._free_buffers.pop() if self._free_buffers else None
+        return cv2.resize(frame, target, dst=buffer, interpolation=cv2.INTER_LINEAR)
+
+    def _publish(self, frame):
+        with self._m_render.time():
+            frame = self._to_display(frame)
+        with self._lock:
+            if self._latest is not None:
+                self.frames_dropped += 1
+                self._m_dropped.inc()
+                if self._latest.shape == self._display_shape and len(self._free_buffers) < 3:
+                    self._free_buffers.append(self._latest)
+            self._latest = frame
+        self.frames_published += 1
+        self._m_analyzed.inc()
+        self._fps.tick()
+        self.frame_ready.emit()